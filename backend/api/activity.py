@@ -0,0 +1,145 @@
+"""
+Buffered ActivityLog writes.
+
+log_activity() hands entries to the process-wide activity_writer instead of
+inserting them in the request. An entry joins the buffer only once the
+caller's transaction commits (entries of rolled-back work are dropped), and a
+daemon thread writes the buffer with one bulk_create when it reaches
+ACTIVITY_LOG_BATCH_SIZE entries or ACTIVITY_LOG_FLUSH_INTERVAL seconds after
+the oldest entry arrived. Whatever is still buffered is written at
+interpreter exit.
+
+Entries therefore show up in the activity feed up to a flush interval late,
+and a hard crash loses at most one interval's worth. With
+ACTIVITY_LOG_MODE = 'sync' entries are inserted on commit in the calling
+thread instead, which is convenient in tests; otherwise call
+activity_writer.flush() before asserting on ActivityLog rows.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction, close_old_connections
+
+from .models import ActivityLog
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityLogWriter:
+    def __init__(self, batch_size=None, interval=None):
+        self.batch_size = batch_size or getattr(settings, 'ACTIVITY_LOG_BATCH_SIZE', 200)
+        self.interval = interval or getattr(settings, 'ACTIVITY_LOG_FLUSH_INTERVAL', 1.0)
+        self.buffer = []
+        self.oldest = None
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.pid = None
+        self.counters = {'written': 0, 'failed': 0}
+
+    # --- Producer side ---
+
+    def add(self, logs):
+        """
+        Buffer unsaved ActivityLog entries once the current transaction commits
+        """
+        logs = list(logs)
+        if logs:
+            transaction.on_commit(lambda: self.append(logs))
+
+    def append(self, logs):
+        if getattr(settings, 'ACTIVITY_LOG_MODE', 'buffered') == 'sync':
+            self.write(logs)
+            return
+        self.ensure_started()
+        with self.lock:
+            if not self.buffer:
+                self.oldest = time.monotonic()
+            self.buffer.extend(logs)
+            full = len(self.buffer) >= self.batch_size
+        if full:
+            self.wakeup.set()
+
+    def ensure_started(self):
+        with self.lock:
+            if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+                return
+            # First use, or a forked child that didn't inherit the thread (or its buffer)
+            if self.pid != os.getpid():
+                self.buffer = []
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self.run, name='activity-log-writer', daemon=True)
+            self.thread.start()
+
+    def flush(self):
+        """
+        Write everything buffered so far. Returns the number of entries written.
+        """
+        with self.lock:
+            logs, self.buffer, self.oldest = self.buffer, [], None
+        return self.write(logs)
+
+    def stats(self):
+        with self.lock:
+            return {'buffered': len(self.buffer), **self.counters}
+
+    # --- Writer thread ---
+
+    def run(self):
+        while True:
+            with self.lock:
+                timeout = self.interval if self.oldest is None else self.oldest + self.interval - time.monotonic()
+            self.wakeup.wait(max(timeout, 0.01))
+            self.wakeup.clear()
+            with self.lock:
+                due = self.buffer and (
+                    len(self.buffer) >= self.batch_size or time.monotonic() - self.oldest >= self.interval
+                )
+            if not due:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Activity log flush failed")
+            finally:
+                close_old_connections()
+
+    def write(self, logs):
+        if not logs:
+            return 0
+        with self.write_lock:
+            try:
+                ActivityLog.objects.bulk_create(logs, batch_size=self.batch_size)
+            except Exception as e:
+                # One bad entry (e.g. its project was deleted meanwhile) shouldn't lose the batch
+                logger.warning(f"Bulk activity log write failed ({e}); writing {len(logs)} entries one by one")
+                written = 0
+                for log in logs:
+                    log.pk = None
+                    try:
+                        log.save(force_insert=True)
+                        written += 1
+                    except Exception:
+                        logger.exception(f"Dropping activity log entry {log.action} {log.content_type} {log.object_id}")
+                        self.counters['failed'] += 1
+                self.counters['written'] += written
+                return written
+            self.counters['written'] += len(logs)
+            return len(logs)
+
+
+activity_writer = ActivityLogWriter()
+
+
+@atexit.register
+def _flush_at_exit():
+    if activity_writer.buffer and activity_writer.pid == os.getpid():
+        try:
+            activity_writer.flush()
+        except Exception:
+            logger.exception("Failed to write buffered activity log entries at exit")
@@ -3,7 +3,7 @@ from django.contrib import admin
 from .models import (
     Workspace, WorkspaceMember, Project, Sprint, 
     Task, Bug, Retrospective, Bookmark, Invitation,
-    UserProfile, Notification, ActivityLog, OTP
+    UserProfile, Notification, NotificationEvent, ActivityLog, OTP
 )
 
 @admin.register(Workspace)
@@ -49,4 +49,5 @@ admin.site.register(Retrospective)
 admin.site.register(Bookmark)
 admin.site.register(Invitation)
 admin.site.register(UserProfile)
-admin.site.register(OTP)
\ No newline at end of file
+admin.site.register(OTP)
+admin.site.register(NotificationEvent)
\ No newline at end of file
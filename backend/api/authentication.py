@@ -0,0 +1,90 @@
+"""
+Token authentication backed by a token -> user cache.
+
+DRF's TokenAuthentication loads the Token and its User on every request,
+and so did the websocket middleware on every connect. Both now go through
+get_token_user(), which keeps (user, token created, time checked) per token
+key in a TieredCache (see api.cache): a short-TTL per-process LRU in front of
+the shared Django cache, so an authenticated request costs no queries once the
+token is warm. Unknown keys are never cached.
+
+Token save/delete (e.g. verify_otp replacing a user's token) and User
+changes invalidate the entries through signals. Signals only reach the
+shared tier, which other processes may not share (the default LocMemCache
+is per-process), so an entry loaded more than TOKEN_CACHE_LOCAL_TTL seconds
+ago is re-checked against the Token table (one indexed query per token and
+process every TOKEN_CACHE_LOCAL_TTL seconds). A revoked token or
+deactivated user is therefore rejected everywhere within that window.
+
+Tokens older than TOKEN_EXPIRY_DAYS (0 = never) are rejected.
+"""
+import copy
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import TieredCache
+
+token_cache = TieredCache(
+    'auth-tokens',
+    maxsize=getattr(settings, 'TOKEN_CACHE_SIZE', 4096),
+    local_ttl=getattr(settings, 'TOKEN_CACHE_LOCAL_TTL', 5.0),
+    shared_ttl=getattr(settings, 'TOKEN_CACHE_TTL', 60),
+)
+
+
+def token_expired(created):
+    days = getattr(settings, 'TOKEN_EXPIRY_DAYS', 0)
+    return bool(days) and created < timezone.now() - timedelta(days=days)
+
+
+def get_token_user(key):
+    """
+    Return (user, token created) for a token key, or None if there is no
+    such token. The user is a private copy, safe to modify.
+    """
+    def load():
+        token = Token.objects.select_related('user').filter(key=key).first()
+        return (token.user, token.created, time.time()) if token else None
+
+    found = token_cache.get(key, load, cacheable=lambda value: value is not None)
+    if found is None:
+        return None
+    user, created, checked = found
+    if time.time() - checked > token_cache.local.ttl:
+        # Possibly revoked in a process whose invalidation didn't reach us
+        current = Token.objects.filter(key=key).values_list('user_id', 'user__is_active').first()
+        if current is None or current[0] != user.pk:
+            invalidate_token(key)
+            return None
+        if current[1] != user.is_active:
+            user = copy.copy(user)
+            user.is_active = current[1]
+        token_cache.local.set(key, (user, created, time.time()))
+    return copy.copy(user), created
+
+
+def invalidate_token(key):
+    token_cache.invalidate(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication served from token_cache, with optional expiry
+    """
+    def authenticate_credentials(self, key):
+        found = get_token_user(key)
+        if found is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        user, created = found
+        if token_expired(created):
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return user, Token(key=key, user=user, created=created)
@@ -0,0 +1,136 @@
+"""
+Small caching helpers shared by the api app.
+
+LRUCache is a thread-safe, per-process LRU map with a TTL. TieredCache puts
+one in front of a Django cache backend (settings.CACHES) so hot keys are
+served from process memory, while the shared tier keeps processes roughly
+in step. Invalidation bumps a per-key version in the shared tier, so a
+reader that loaded stale data concurrently can never overwrite the fresh
+entry; other processes may serve their local copy for up to `local_ttl`.
+A version missing from the shared tier (never bumped, or evicted) is seeded
+with the current time in nanoseconds rather than 0, so losing it can never
+make entries stored under an older version reachable again.
+
+With a per-process backend (LocMemCache, the default) invalidations never
+reach the other processes, so shared entries are kept no longer than local
+ones: every process then reloads a key at least every `local_ttl` seconds.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize=1024, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            self.data[key] = (expires, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+
+class TieredCache:
+    def __init__(self, prefix, maxsize=1024, local_ttl=5.0, shared_ttl=300, alias='default'):
+        self.prefix = prefix
+        self.local = LRUCache(maxsize, local_ttl)
+        self.shared_ttl = shared_ttl
+        self.alias = alias
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    @property
+    def process_local(self):
+        """
+        Whether the shared tier is really private to this process
+        """
+        return isinstance(self.shared, (LocMemCache, DummyCache))
+
+    def shared_timeout(self):
+        return min(self.shared_ttl, self.local.ttl) if self.process_local else self.shared_ttl
+
+    def version_key(self, key):
+        return f'{self.prefix}:v:{key}'
+
+    def get_version(self, version_key):
+        """
+        Current value of a version counter, seeding a missing one
+        """
+        version = self.shared.get(version_key)
+        if version is None:
+            self.shared.add(version_key, time.time_ns(), None)
+            version = self.shared.get(version_key)
+        return version
+
+    def bump_version(self, version_key):
+        try:
+            self.shared.incr(version_key)
+        except ValueError:
+            # Missing: a fresh seed is newer than anything it replaces
+            if not self.shared.add(version_key, time.time_ns(), None):
+                self.shared.incr(version_key)
+
+    def get(self, key, loader, cacheable=None):
+        """
+        Return the cached value for key, calling loader() to compute it on a
+        miss in both tiers. Loaded values failing cacheable(value) are
+        returned without being stored.
+        """
+        value = self.local.get(key)
+        if value is not MISSING:
+            return value
+
+        version = self.get_version(self.version_key(key))
+        shared_key = f'{self.prefix}:{key}:{version}'
+        value = self.shared.get(shared_key, MISSING)
+        if value is MISSING:
+            value = loader()
+            if cacheable is not None and not cacheable(value):
+                return value
+            self.shared.set(shared_key, value, self.shared_timeout())
+        self.local.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        self.local.delete(key)
+        self.bump_version(self.version_key(key))
+
+    def clear_local(self):
+        self.local.clear()
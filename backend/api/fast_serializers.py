@@ -0,0 +1,193 @@
+"""
+Read-only fast path for large list responses.
+
+A FastListSerializer is compiled once from a ModelSerializer: every readable
+field becomes a (key, converter) step run against values() rows, so
+listing N objects builds no model instances and no nested serializers. Users
+nested through UserSerializer are filled from a user-summary map loaded with
+one query per page (and kept briefly in a per-process LRU), many-to-many
+primary keys with one query on the through table.
+
+The output is meant to be byte-identical to the ModelSerializer's once
+rendered; `manage.py benchmark_serializers --check` verifies that. Fields the
+compiler doesn't understand raise ImproperlyConfigured at import time rather
+than silently diverging.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+
+from .cache import LRUCache, MISSING
+from .serializers import (
+    UserSerializer, TaskSerializer, BugSerializer,
+    RetrospectiveSerializer, ActivityLogSerializer
+)
+
+user_summary_cache = LRUCache(
+    maxsize=getattr(settings, 'USER_SUMMARY_CACHE_SIZE', 4096),
+    ttl=getattr(settings, 'USER_SUMMARY_CACHE_TTL', 60.0),
+)
+
+
+def _value_step(field, column):
+    def convert(row, context):
+        value = row[column]
+        return None if value is None else field.to_representation(value)
+    return column, convert
+
+
+def _datetime_step(field, column):
+    """
+    DateTimeField.to_representation with its per-call settings and timezone
+    lookups hoisted out: the output format is checked once here and the
+    current timezone once per serialize() call.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if not isinstance(output_format, str) or output_format.lower() != ISO_8601 or hasattr(field, 'timezone'):
+        return _value_step(field, column)[1]
+
+    def convert(row, context):
+        value = row[column]
+        if not value:
+            return None
+        if context['timezone'] is None or not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(context['timezone']).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def _column_step(column):
+    def convert(row, context):
+        return row[column]
+    return convert
+
+
+def _compile_fields(serializer, model, user_fields=(), count_fields=None):
+    """
+    Return ([columns], [(key, convert)]) for the serializer's readable fields.
+    `user_fields` names FK fields rendered as nested users by hand (e.g. in
+    to_representation); `count_fields` maps method fields that count a
+    many-to-many relation to that relation.
+    """
+    count_fields = count_fields or {}
+    columns = []
+    steps = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        source = field.source
+        if isinstance(field, UserSerializer) or name in user_fields:
+            column = model._meta.get_field(source).attname
+            steps.append((name, _user_step(column)))
+        elif isinstance(field, PrimaryKeyRelatedField):
+            column = model._meta.get_field(source).attname
+            steps.append((name, _column_step(column)))
+        elif isinstance(field, ManyRelatedField):
+            steps.append((name, _many_step(source, count=False)))
+            continue
+        elif name in count_fields:
+            steps.append((name, _many_step(count_fields[name], count=True)))
+            continue
+        elif isinstance(field, (serializers.Serializer, serializers.SerializerMethodField)) or '.' in source:
+            raise ImproperlyConfigured(f"Fast serialization can't compile {serializer.__class__.__name__}.{name}")
+        elif isinstance(field, serializers.DateTimeField):
+            column = model._meta.get_field(source).attname
+            steps.append((name, _datetime_step(field, column)))
+        else:
+            column, convert = _value_step(field, model._meta.get_field(source).attname)
+            steps.append((name, convert))
+        columns.append(column)
+    return columns, steps
+
+
+def _user_step(column):
+    def convert(row, context):
+        return context['users'].get(row[column])
+    convert.user_column = column
+    return convert
+
+
+def _many_step(source, count):
+    def convert(row, context):
+        ids = context['many'][source].get(row['id'], [])
+        return len(ids) if count else ids
+    convert.many_source = source
+    return convert
+
+
+class FastListSerializer:
+    def __init__(self, serializer_class, user_fields=(), count_fields=None):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        columns, self.steps = _compile_fields(serializer_class(), self.model, user_fields, count_fields)
+        self.columns = list(dict.fromkeys(['id'] + columns))
+        self.user_columns = [c.user_column for _, c in self.steps if hasattr(c, 'user_column')]
+        self.many_sources = list(dict.fromkeys(c.many_source for _, c in self.steps if hasattr(c, 'many_source')))
+
+    def rows(self, queryset):
+        """
+        The values() queryset to paginate and pass to serialize()
+        """
+        return queryset.select_related(None).prefetch_related(None).values(*self.columns)
+
+    def serialize(self, rows):
+        rows = list(rows)
+        context = {
+            'timezone': timezone.get_current_timezone() if settings.USE_TZ else None,
+            'users': get_user_summaries({row[column] for row in rows for column in self.user_columns}),
+            'many': {source: self.many_ids(source, rows) for source in self.many_sources},
+        }
+        return [{key: convert(row, context) for key, convert in self.steps} for row in rows]
+
+    def many_ids(self, source, rows):
+        field = self.model._meta.get_field(source)
+        through = field.remote_field.through
+        from_column = field.m2m_field_name() + '_id'
+        to_column = field.m2m_reverse_field_name() + '_id'
+        ids = {}
+        pairs = through.objects.filter(**{f'{from_column}__in': [row['id'] for row in rows]}).order_by('id')
+        for from_id, to_id in pairs.values_list(from_column, to_column):
+            ids.setdefault(from_id, []).append(to_id)
+        return ids
+
+
+_user_columns, _user_steps = _compile_fields(UserSerializer(), User)
+
+
+def get_user_summaries(user_ids):
+    """
+    Return {user_id: UserSerializer data} for the given ids, querying only
+    the ones not in the per-process cache.
+    """
+    user_ids.discard(None)
+    summaries = {}
+    missing = []
+    for user_id in user_ids:
+        summary = user_summary_cache.get(user_id)
+        if summary is MISSING:
+            missing.append(user_id)
+        else:
+            summaries[user_id] = summary
+    if missing:
+        for row in User.objects.filter(id__in=missing).values(*_user_columns):
+            summary = {key: convert(row, None) for key, convert in _user_steps}
+            user_summary_cache.set(row['id'], summary)
+            summaries[row['id']] = summary
+    return summaries
+
+
+def invalidate_user_summary(user_id):
+    user_summary_cache.delete(user_id)
+
+
+task_list_serializer = FastListSerializer(TaskSerializer)
+bug_list_serializer = FastListSerializer(BugSerializer, user_fields=['reporter'])
+retrospective_list_serializer = FastListSerializer(RetrospectiveSerializer, count_fields={'votes': 'voted_by'})
+activity_log_list_serializer = FastListSerializer(ActivityLogSerializer)
@@ -0,0 +1,141 @@
+"""
+Write-behind UserProfile.last_active tracking.
+
+update_user_activity() used to get_or_create the profile and save() it on
+every call (each login, OTP verification and profile fetch). Now it only
+records the user id with the process-wide last_active_tracker:
+
+- a user already recorded within LAST_ACTIVE_GRANULARITY seconds is ignored
+  (an in-memory LRU, so the check costs no I/O);
+- recorded ids are coalesced in a set, and a daemon thread writes them every
+  LAST_ACTIVE_FLUSH_INTERVAL seconds with one UPDATE per batch of ids, which
+  also skips profiles another process advanced within the granularity;
+- profiles that don't exist yet are created in the same flush.
+
+last_active is therefore exact to within the granularity plus one flush
+interval. Whatever is pending is written at interpreter exit; with
+LAST_ACTIVE_MODE = 'sync' the UPDATE runs in the calling thread instead.
+"""
+import atexit
+import logging
+import os
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .cache import LRUCache
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+class LastActiveTracker:
+    def __init__(self, granularity=None, interval=None, maxsize=100000):
+        self.granularity = granularity or getattr(settings, 'LAST_ACTIVE_GRANULARITY', 60.0)
+        self.interval = interval or getattr(settings, 'LAST_ACTIVE_FLUSH_INTERVAL', 10.0)
+        self.recent = LRUCache(maxsize, self.granularity)
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.pid = None
+        self.counters = {'recorded': 0, 'coalesced': 0, 'written': 0, 'flushes': 0}
+
+    def touch(self, user_id):
+        """
+        Note that the user is active now
+        """
+        if user_id is None:
+            return
+        sync = getattr(settings, 'LAST_ACTIVE_MODE', 'buffered') == 'sync'
+        if not sync:
+            self.ensure_started()
+        if self.recent.get(user_id, None) is not None:
+            self.counters['coalesced'] += 1
+            return
+        self.recent.set(user_id, True)
+        self.counters['recorded'] += 1
+        if sync:
+            self.write({user_id})
+            return
+        with self.lock:
+            self.pending.add(user_id)
+
+    def ensure_started(self):
+        with self.lock:
+            if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+                return
+            # First use, or a forked child that didn't inherit the thread
+            if self.pid != os.getpid():
+                self.pending = set()
+                self.recent.clear()
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self.run, name='last-active-writer', daemon=True)
+            self.thread.start()
+
+    def flush(self):
+        """
+        Write the pending users. Returns the number of profiles updated.
+        """
+        with self.lock:
+            user_ids, self.pending = self.pending, set()
+        return self.write(user_ids)
+
+    def stats(self):
+        with self.lock:
+            return {'pending': len(self.pending), **self.counters}
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            if not self.pending:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("last_active flush failed")
+            finally:
+                close_old_connections()
+
+    def write(self, user_ids):
+        if not user_ids:
+            return 0
+        now = timezone.now()
+        stale = now - timedelta(seconds=self.granularity)
+        user_ids = sorted(user_ids)
+        written = 0
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            batch = user_ids[start:start + BATCH_SIZE]
+            updated = UserProfile.objects.filter(user_id__in=batch, last_active__lt=stale).update(last_active=now)
+            if updated < len(batch):
+                # Either advanced elsewhere within the granularity, or no profile yet
+                existing = set(UserProfile.objects.filter(user_id__in=batch).values_list('user_id', flat=True))
+                missing = [
+                    UserProfile(user_id=user_id, last_active=now)
+                    for user_id in User.objects.filter(id__in=batch).exclude(id__in=existing).values_list('id', flat=True)
+                ]
+                UserProfile.objects.bulk_create(missing, ignore_conflicts=True)
+                updated += len(missing)
+            written += updated
+        self.counters['written'] += written
+        self.counters['flushes'] += 1
+        return written
+
+
+last_active_tracker = LastActiveTracker()
+
+
+@atexit.register
+def _flush_at_exit():
+    if last_active_tracker.pending and last_active_tracker.pid == os.getpid():
+        try:
+            last_active_tracker.flush()
+        except Exception:
+            logger.exception("Failed to write pending last_active updates at exit")
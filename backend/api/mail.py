@@ -0,0 +1,208 @@
+"""
+Background email delivery.
+
+Messages are queued in memory and sent in batches by a daemon thread that
+keeps one backend connection (get_connection()) open across batches, so a
+request never waits on the SMTP server. Failed sends are retried with exponential
+backoff; stats() reports queue depth and counters for monitoring.
+
+With EMAIL_QUEUE_ENABLED = False messages are sent inline instead, which is
+also convenient in tests; otherwise call mail_queue.flush() before asserting
+on django.core.mail.outbox.
+"""
+import heapq
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueue:
+    def __init__(self, batch_size=None, max_retries=None, retry_delay=None, idle_timeout=None):
+        self.batch_size = batch_size if batch_size is not None else getattr(settings, 'EMAIL_QUEUE_BATCH_SIZE', 50)
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, 'EMAIL_QUEUE_MAX_RETRIES', 5)
+        self.retry_delay = retry_delay if retry_delay is not None else getattr(settings, 'EMAIL_QUEUE_RETRY_DELAY', 2.0)
+        self.idle_timeout = (
+            idle_timeout if idle_timeout is not None else getattr(settings, 'EMAIL_QUEUE_IDLE_TIMEOUT', 30.0)
+        )
+
+        self.queue = queue.Queue()
+        self.retries = []  # heap of (ready_at, sequence, attempt, message)
+        self.sequence = itertools.count()
+        self.connection = None
+        self.last_used = 0.0
+        self.thread = None
+        self.pid = None
+        self.lock = threading.Lock()
+        self.idle = threading.Condition(self.lock)
+        self.pending = 0
+        self.counters = {'sent': 0, 'failed': 0, 'retried': 0}
+
+    # --- Producer side ---
+
+    def enqueue(self, message):
+        """
+        Queue an EmailMessage for delivery
+        """
+        self.ensure_started()
+        with self.lock:
+            self.pending += 1
+        self.queue.put((0, message))
+
+    def ensure_started(self):
+        with self.lock:
+            if self.thread is not None and self.pid == os.getpid() and self.thread.is_alive():
+                return
+            # First use, or we are in a forked child that didn't inherit the thread
+            self.pid = os.getpid()
+            self.connection = None
+            self.thread = threading.Thread(target=self.run, name='mail-queue', daemon=True)
+            self.thread.start()
+
+    def flush(self, timeout=None):
+        """
+        Block until every queued message was sent or given up on. Returns
+        False if the timeout expired first.
+        """
+        with self.idle:
+            return self.idle.wait_for(lambda: self.pending == 0, timeout)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'depth': self.queue.qsize(),
+                'retrying': len(self.retries),
+                'pending': self.pending,
+                **self.counters,
+            }
+
+    # --- Sender thread ---
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            if batch:
+                try:
+                    self.send_batch(batch)
+                except Exception:
+                    logger.exception(f"Sending {len(batch)} email(s) failed unexpectedly; giving up on them")
+                    self.close_connection()
+                finally:
+                    # Messages send_batch didn't settle must not keep flush() waiting
+                    for _ in batch:
+                        self.finish('failed')
+            elif self.connection is not None and time.monotonic() - self.last_used > self.idle_timeout:
+                self.close_connection()
+
+    def next_batch(self):
+        """
+        Collect up to batch_size messages whose (re)send is due, waiting for
+        the first one at most until the next retry is due.
+        """
+        batch = []
+        now = time.monotonic()
+        with self.lock:
+            while self.retries and self.retries[0][0] <= now and len(batch) < self.batch_size:
+                _, _, attempt, message = heapq.heappop(self.retries)
+                batch.append((attempt, message))
+            timeout = self.retries[0][0] - now if self.retries else 1.0
+        if not batch:
+            try:
+                batch.append(self.queue.get(timeout=max(timeout, 0.01)))
+            except queue.Empty:
+                return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def get_connection(self):
+        if self.connection is None:
+            self.connection = get_connection(fail_silently=False)
+            self.connection.open()
+        return self.connection
+
+    def close_connection(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def send_batch(self, batch):
+        """
+        Send the batch with one send_messages() call. If that raises, or
+        reports fewer messages sent than have recipients, the batch is sent
+        again one message at a time so only the failing ones are retried;
+        messages the failed call had already delivered may then go out twice.
+
+        Messages are removed from `batch` as they are sent or rescheduled, so
+        after an exception it holds the ones still unaccounted for.
+        """
+        messages = [message for _, message in batch]
+        try:
+            sent = self.get_connection().send_messages(messages)
+        except Exception as e:
+            logger.warning(f"Sending a batch of {len(batch)} emails failed ({e}); sending them one by one")
+            self.close_connection()
+        else:
+            if sent is None or sent >= sum(1 for message in messages if message.recipients()):
+                for _ in batch:
+                    self.finish('sent')
+                batch.clear()
+                self.last_used = time.monotonic()
+                return
+
+        while batch:
+            attempt, message = batch[0]
+            try:
+                self.get_connection().send_messages([message])
+            except Exception as e:
+                # Drop the connection; it is reopened for the next message
+                self.close_connection()
+                self.schedule_retry(attempt, message, e)
+            else:
+                self.finish('sent')
+            batch.pop(0)
+        self.last_used = time.monotonic()
+
+    def schedule_retry(self, attempt, message, error):
+        if attempt >= self.max_retries:
+            logger.error(f"Giving up on email to {', '.join(message.to)} after {attempt + 1} attempts: {error}")
+            self.finish('failed')
+            return
+        delay = self.retry_delay * (2 ** attempt)
+        logger.warning(f"Email to {', '.join(message.to)} failed ({error}); retrying in {delay:.1f}s")
+        with self.lock:
+            self.counters['retried'] += 1
+            heapq.heappush(self.retries, (time.monotonic() + delay, next(self.sequence), attempt + 1, message))
+
+    def finish(self, outcome):
+        with self.idle:
+            self.counters[outcome] += 1
+            self.pending -= 1
+            self.idle.notify_all()
+
+
+mail_queue = MailQueue()
+
+
+def send_email(message):
+    """
+    Deliver an EmailMessage through the background queue, or inline when
+    EMAIL_QUEUE_ENABLED is off.
+    """
+    if getattr(settings, 'EMAIL_QUEUE_ENABLED', True):
+        mail_queue.enqueue(message)
+    else:
+        message.send()
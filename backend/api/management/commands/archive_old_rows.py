@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.retention import POLICIES, archive_directory, archive_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Move ActivityLog and Notification rows older than their retention "
+        "horizon (RETENTION_*_DAYS) into compressed JSONL segments under "
+        "RETENTION_ARCHIVE_DIR and delete them, one short transaction per batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tables', nargs='*', help=f"Tables to prune: {', '.join(sorted(POLICIES))} (default: all)")
+        parser.add_argument('--days', type=int, help="Override the tables' retention horizon")
+        parser.add_argument('--batch-size', type=int, help='Rows archived and deleted per transaction')
+        parser.add_argument('--limit', type=int, help='Stop after this many rows per table')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches')
+        parser.add_argument('--directory', help='Archive directory (default: RETENTION_ARCHIVE_DIR)')
+        parser.add_argument('--no-archive', action='store_true', help='Delete without writing segments')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the expired rows')
+
+    def handle(self, *args, **options):
+        unknown = set(options['tables']) - set(POLICIES)
+        if unknown:
+            raise CommandError(f"Unknown table(s): {', '.join(sorted(unknown))}")
+        directory = options['directory'] or archive_directory()
+        for name in options['tables'] or sorted(POLICIES):
+            policy = POLICIES[name]
+            days = options['days'] if options['days'] is not None else policy.days
+            cutoff = timezone.now() - timedelta(days=days)
+
+            if options['dry_run']:
+                expired = policy.model.objects.filter(created_at__lt=cutoff).count()
+                self.stdout.write(f"{name}: {expired} row(s) older than {days} days")
+                continue
+
+            total = segments = 0
+            for rows, path in archive_expired(
+                policy, cutoff, batch_size=options['batch_size'], archive=not options['no_archive'],
+                directory=directory, pause=options['pause'], limit=options['limit'],
+            ):
+                total += rows
+                segments += path is not None
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"  {rows} row(s) -> {path or 'deleted'}")
+            destination = f" into {segments} segment(s) in {directory}" if segments else ''
+            self.stdout.write(self.style.SUCCESS(f"{name}: archived {total} row(s) older than {days} days{destination}"))
@@ -0,0 +1,92 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import override_settings
+
+from api.models import Workspace, WorkspaceMember, Project, Task
+from api.search import reindex, search_documents
+
+WORDS = (
+    'login redirect crash timeout upload invoice report export dashboard sprint '
+    'calendar search filter payment webhook token session cache layout mobile '
+    'android safari email reminder billing archive import sync latency memory '
+    'avatar profile chart burndown retro release deploy rollback migration schema'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate tasks (rolled back afterwards), index them for full-text "
+        "search and compare query latency of api.search against the old "
+        "icontains scan, e.g. --rows 1000000."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Tasks generated')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Tasks inserted and indexed per batch')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the median is reported')
+        parser.add_argument('--query', action='append', help='Query text (default: a few generated ones)')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        queries = options['query'] or ['login', 'payment webhook', 'safari crash', 'burndown chart export']
+        with override_settings(NOTIFICATION_OUTBOX_MODE='worker'), transaction.atomic():
+            user = User.objects.create(username='search-benchmark', email='search-benchmark@localhost')
+            workspace = Workspace.objects.create(name='Search benchmark', owner=user)
+            WorkspaceMember.objects.create(workspace=workspace, user=user, role='owner')
+            projects = [
+                Project.objects.create(name=f'Search benchmark {i}', workspace=workspace, created_by=user)
+                for i in range(10)
+            ]
+
+            insert_time = index_time = 0.0
+            for start in range(0, options['rows'], options['batch_size']):
+                size = min(options['batch_size'], options['rows'] - start)
+                started = time.perf_counter()
+                tasks = Task.objects.bulk_create([
+                    Task(name=' '.join(rng.choices(WORDS, k=4)),
+                         description=' '.join(rng.choices(WORDS, k=30)),
+                         project=projects[i % len(projects)], reporter=user)
+                    for i in range(size)
+                ])
+                insert_time += time.perf_counter() - started
+                started = time.perf_counter()
+                reindex('task', [task.pk for task in tasks])
+                index_time += time.perf_counter() - started
+            self.stdout.write(
+                f"{options['rows']} tasks on {connection.vendor}: insert {insert_time:.1f}s, "
+                f"index {index_time:.1f}s ({options['rows'] / max(index_time, 1e-9):.0f} docs/s)"
+            )
+
+            for text in queries:
+                def scan():
+                    terms = Q()
+                    for term in text.split():
+                        terms &= Q(name__icontains=term) | Q(description__icontains=term)
+                    return list(Task.objects.filter(terms, project__workspace=workspace)
+                                .order_by('-created_at').values_list('id', flat=True)[:20])
+
+                def indexed():
+                    return list(search_documents(user, text, item_types=['task'])[:20])
+
+                scan_ms, _ = self.median_ms(scan, options['repeat'])
+                search_ms, results = self.median_ms(indexed, options['repeat'])
+                matches = search_documents(user, text, item_types=['task']).count()
+                self.stdout.write(
+                    f"  {text!r:<26} matches {matches:>8}  icontains {scan_ms:9.1f} ms  "
+                    f"full-text {search_ms:9.1f} ms  top rank {results[0]['rank'] if results else 0:.4g}"
+                )
+            transaction.set_rollback(True)
+
+    def median_ms(self, run, repeat):
+        timings, result = [], None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), result
@@ -0,0 +1,119 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import (
+    user_summary_cache, task_list_serializer, bug_list_serializer,
+    retrospective_list_serializer, activity_log_list_serializer
+)
+from api.models import Workspace, Project, Task, Bug, Retrospective, ActivityLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the ModelSerializer list path against the values()-based fast path "
+        "on generated rows (rolled back afterwards) and compare the rendered JSON."
+    )
+
+    targets = {
+        'task': task_list_serializer,
+        'bug': bug_list_serializer,
+        'retrospective': retrospective_list_serializer,
+        'activity': activity_log_list_serializer,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows generated per model')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per path; the best is reported')
+        parser.add_argument('--model', choices=sorted(self.targets), action='append',
+                            help='Model(s) to benchmark (default: all)')
+        parser.add_argument('--check', action='store_true',
+                            help='Fail if the two paths render different JSON')
+
+    def handle(self, *args, **options):
+        mismatches = []
+        with transaction.atomic():
+            querysets = self.generate(options['rows'])
+            for name in options['model'] or sorted(self.targets):
+                if not self.run(name, querysets[name], self.targets[name], options['repeat']):
+                    mismatches.append(name)
+            transaction.set_rollback(True)
+
+        if mismatches and options['check']:
+            raise CommandError(f"Fast path output differs for: {', '.join(mismatches)}")
+
+    def generate(self, rows):
+        users = [User.objects.create(username=f'benchmark-{i}', email=f'benchmark-{i}@localhost') for i in range(20)]
+        workspace = Workspace.objects.create(name='Serializer benchmark', owner=users[0])
+        project = Project.objects.create(name='Serializer benchmark', workspace=workspace, created_by=users[0])
+
+        Task.objects.bulk_create([
+            Task(name=f'Task {i}', description='x' * 100, project=project, reporter=users[i % 20],
+                 assigned_to=users[(i + 1) % 20] if i % 3 else None)
+            for i in range(rows)
+        ])
+        Bug.objects.bulk_create([
+            Bug(summary=f'Bug {i}', description='x' * 100, project=project, reporter=users[i % 20],
+                assignee=users[(i + 1) % 20] if i % 3 else None)
+            for i in range(rows)
+        ])
+        retrospectives = Retrospective.objects.bulk_create([
+            Retrospective(feedback=f'Item {i}', project=project, created_by=users[i % 20], responsible=users[(i + 2) % 20])
+            for i in range(rows)
+        ])
+        Through = Retrospective.voted_by.through
+        Through.objects.bulk_create([
+            Through(retrospective_id=retrospective.id, user_id=users[j].id)
+            for retrospective in retrospectives for j in range(retrospective.id % 4)
+        ])
+        ActivityLog.objects.bulk_create([
+            ActivityLog(user=users[i % 20], workspace=workspace, project=project, action='update',
+                        content_type='task', object_id=i, details={'task_name': f'Task {i}'})
+            for i in range(rows)
+        ])
+
+        # The same querysets the list views build, newest first
+        ordering = ('-created_at', '-id')
+        return {
+            'task': Task.objects.filter(project=project)
+                .select_related('project', 'sprint', 'assigned_to', 'reporter').order_by(*ordering),
+            'bug': Bug.objects.filter(project=project).select_related('assignee', 'reporter').order_by(*ordering),
+            'retrospective': Retrospective.objects.filter(project=project)
+                .select_related('project', 'created_by', 'responsible').prefetch_related('voted_by').order_by(*ordering),
+            'activity': ActivityLog.objects.filter(project=project)
+                .select_related('user', 'workspace', 'project').order_by(*ordering),
+        }
+
+    def best_of(self, repeat, render):
+        best, output = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = render()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
+
+    def run(self, name, queryset, fast, repeat):
+        renderer = JSONRenderer()
+        serializer_class = fast.serializer_class
+        slow_time, slow_json = self.best_of(repeat, lambda: renderer.render(
+            serializer_class(list(queryset), many=True).data
+        ))
+
+        def render_fast():
+            # Start from a cold user-summary cache so the fast path pays for its lookups
+            user_summary_cache.clear()
+            return renderer.render(fast.serialize(fast.rows(queryset)))
+
+        fast_time, fast_json = self.best_of(repeat, render_fast)
+
+        identical = slow_json == fast_json
+        self.stdout.write(
+            f"{name:<14} {queryset.count()} rows  serializer {slow_time * 1000:8.1f} ms  "
+            f"fast {fast_time * 1000:8.1f} ms  speedup {slow_time / fast_time:5.1f}x  "
+            + (self.style.SUCCESS('identical') if identical else self.style.ERROR('DIFFERENT'))
+        )
+        return identical
@@ -0,0 +1,128 @@
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import (
+    Workspace, WorkspaceMember, Project, Sprint, Task, Bug, Retrospective,
+    Notification, Bookmark, Invitation, ActivityLog
+)
+from api.urls import router
+
+# GET endpoints outside the router that return one row per object
+EXTRA_ENDPOINTS = ['notifications/', 'notifications/by_type/', 'activities/mentions/', 'activities/bookmarks/']
+
+
+def build_fixture(rows):
+    """
+    Create a user who can see `rows` objects of every kind (each with its
+    own related users), and return that user.
+    """
+    tag = uuid.uuid4().hex[:8]
+    user = User.objects.create(username=f'budget-{tag}', email=f'budget-{tag}@localhost')
+    others = [
+        User.objects.create(username=f'budget-{tag}-{i}', email=f'budget-{tag}-{i}@localhost')
+        for i in range(rows)
+    ]
+    workspaces = []
+    for i, other in enumerate(others):
+        workspace = Workspace.objects.create(name=f'Budget {tag} {i}', owner=other)
+        WorkspaceMember.objects.create(workspace=workspace, user=user, role='member')
+        WorkspaceMember.objects.create(workspace=workspace, user=other, role='owner')
+        workspaces.append(workspace)
+
+    workspace = workspaces[0]
+    today = timezone.localdate()
+    for i, other in enumerate(others):
+        project = Project.objects.create(name=f'Budget {i}', workspace=workspace, created_by=other)
+        sprint = Sprint.objects.create(name=f'Sprint {i}', project=project, start_date=today, end_date=today,
+                                       assigned_to=other, assigned_by=user)
+        Task.objects.create(name=f'Task {i}', project=project, sprint=sprint, assigned_to=other, reporter=user)
+        Bug.objects.create(summary=f'Bug {i}', project=project, assignee=other, reporter=other)
+        retrospective = Retrospective.objects.create(feedback=f'Item {i}', project=project,
+                                                     created_by=other, responsible=other)
+        retrospective.voted_by.add(user, other)
+        Notification.objects.create(user=user, sender=other, message=f'Message {i}', item_type='task', item_id=str(i))
+        Bookmark.objects.create(user=user, item_type='task', item_id=str(i))
+        Invitation.objects.create(workspace=workspace, email=f'invitee-{tag}-{i}@localhost',
+                                  sender=other, token=uuid.uuid4().hex)
+        ActivityLog.objects.create(user=other, workspace=workspace, project=project, action='create',
+                                   content_type='task', object_id=i, details={})
+        ActivityLog.objects.create(user=other, workspace=workspace, project=project, action='mention',
+                                   content_type='task', object_id=i, details={'mentioned_user_id': user.id},
+                                   mentioned_user=user)
+    return user
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every list endpoint in api.urls for a user with a small and a "
+        "larger number of rows (generated and rolled back) and fail if the "
+        "query count grows with the row count, i.e. an N+1 crept in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--small', type=int, default=2, help='Rows per model in the first run')
+        parser.add_argument('--large', type=int, default=10, help='Rows per model in the second run')
+        parser.add_argument('--budget', type=int, help='Also fail if any endpoint needs more queries than this')
+        parser.add_argument('--show-sql', action='store_true', help='Print the queries of failing endpoints')
+
+    def endpoints(self):
+        """
+        Return [(label, url, settings overrides)]. Lists with a fast path are
+        checked through the ModelSerializer path as well.
+        """
+        endpoints = []
+        for prefix, viewset, basename in router.registry:
+            endpoints.append((f'{prefix}/', f'/api/{prefix}/', {}))
+            if getattr(viewset, 'fast_list_serializer', None) is not None:
+                endpoints.append((f'{prefix}/ (serializer)', f'/api/{prefix}/', {'API_FAST_LIST_SERIALIZERS': False}))
+        return endpoints + [(endpoint, f'/api/{endpoint}', {}) for endpoint in EXTRA_ENDPOINTS]
+
+    def measure(self, rows):
+        """
+        Return {endpoint: [sql, ...]} for a fixture of `rows` objects
+        """
+        results = {}
+        with transaction.atomic():
+            user = build_fixture(rows)
+            client = APIClient()
+            client.force_authenticate(user)
+            for label, url, overrides in self.endpoints():
+                with override_settings(**overrides):
+                    client.get(url)  # warm per-user caches (membership) so both runs compare alike
+                    with CaptureQueriesContext(connection) as queries:
+                        response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f"GET {url} returned {response.status_code}")
+                results[label] = [query['sql'] for query in queries.captured_queries]
+            transaction.set_rollback(True)
+        return results
+
+    def handle(self, *args, **options):
+        # The warm-up request would otherwise fill the response cache and hide the queries
+        with override_settings(ALLOWED_HOSTS=['testserver'], NOTIFICATION_OUTBOX_MODE='worker',
+                               RESPONSE_CACHE_ENABLED=False):
+            small = self.measure(options['small'])
+            large = self.measure(options['large'])
+
+        failures = []
+        for endpoint, url, overrides in self.endpoints():
+            before, after = len(small[endpoint]), len(large[endpoint])
+            over_budget = options['budget'] is not None and after > options['budget']
+            ok = before == after and not over_budget
+            status = self.style.SUCCESS('ok') if ok else self.style.ERROR(
+                'over budget' if before == after else 'grows with rows')
+            self.stdout.write(f"{endpoint:<36} {before:3d} -> {after:3d} queries  {status}")
+            if not ok:
+                failures.append(endpoint)
+                if options['show_sql']:
+                    for sql in large[endpoint]:
+                        self.stdout.write(f"    {sql}")
+
+        if failures:
+            raise CommandError(f"Query budget exceeded for: {', '.join(failures)}")
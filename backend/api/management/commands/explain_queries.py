@@ -0,0 +1,151 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.models import ActivityLog, Bookmark, Notification
+from api.views import (
+    TaskViewSet, BugViewSet, SprintViewSet, ProjectViewSet,
+    RetrospectiveViewSet, NotificationViewSet, ActivityLogViewSet
+)
+from chat.models import ChatMessage
+
+
+def viewset_queryset(viewset_class, user, headers=None, params=None):
+    """
+    Build the queryset a ViewSet's list action would evaluate for this user,
+    including the ordering and LIMIT applied by the paginator.
+    """
+    factory = APIRequestFactory()
+    request = Request(factory.get('/', params or {}, **(headers or {})))
+    request.user = user
+    view = viewset_class()
+    view.request = request
+    view.args = ()
+    view.kwargs = {}
+    view.action = 'list'
+    view.format_kwarg = None
+    queryset = view.filter_queryset(view.get_queryset())
+
+    paginator = view.paginator
+    if paginator is None:
+        return queryset
+    field = paginator.get_ordering_field(queryset, view)
+    ordering = ['-' + field, '-id'] if field else ['-id']
+    return queryset.order_by(*ordering)[:paginator.page_size + 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the queries behind the hot API endpoints and flag "
+        "sequential scans. Plans depend on table statistics, so run this "
+        "against a database with realistic data volumes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username or id to build the querysets for (default: first user)')
+        parser.add_argument('--workspace', help='Workspace id sent as X-Workspace-ID')
+        parser.add_argument('--project', help='Project id sent as X-Project-ID')
+        parser.add_argument('--sprint', help='Sprint id sent as X-Sprint-ID')
+        parser.add_argument('--analyze', action='store_true', help='Use EXPLAIN ANALYZE (PostgreSQL only)')
+        parser.add_argument('--strict', action='store_true', help='Exit with an error if any sequential scan is found')
+
+    def get_user(self, value):
+        users = User.objects.order_by('id')
+        if value is None:
+            user = users.first()
+        elif value.isdigit():
+            user = users.filter(id=value).first()
+        else:
+            user = users.filter(username=value).first()
+        if user is None:
+            raise CommandError("No matching user found")
+        return user
+
+    def get_queries(self, user, options):
+        headers = {}
+        if options['workspace']:
+            headers['HTTP_X_WORKSPACE_ID'] = options['workspace']
+        if options['project']:
+            headers['HTTP_X_PROJECT_ID'] = options['project']
+        if options['sprint']:
+            headers['HTTP_X_SPRINT_ID'] = options['sprint']
+
+        queries = [
+            ('GET /api/projects/', viewset_queryset(ProjectViewSet, user, headers)),
+            ('GET /api/sprints/', viewset_queryset(SprintViewSet, user, headers)),
+            ('GET /api/tasks/', viewset_queryset(TaskViewSet, user, headers)),
+            ('GET /api/tasks/?status=in_progress',
+             viewset_queryset(TaskViewSet, user, headers, {'status': 'in_progress'})),
+            ('GET /api/bugs/', viewset_queryset(BugViewSet, user, headers)),
+            ('GET /api/retrospectives/', viewset_queryset(RetrospectiveViewSet, user, headers)),
+            ('GET /api/notifications/', viewset_queryset(NotificationViewSet, user)),
+            ('GET /api/notifications/?read=false',
+             viewset_queryset(NotificationViewSet, user, params={'read': 'false'})),
+            ('GET /api/notifications/unread_count/',
+             Notification.objects.filter(user=user, read=False)),
+            ('DELETE /api/notifications/clear_all/',
+             Notification.objects.filter(user=user, read=True)),
+            ('manage.py archive_old_rows (notifications)',
+             Notification.objects.filter(created_at__lt=timezone.now()).order_by('created_at', 'id')[:1000]),
+            ('GET /api/activities/', viewset_queryset(ActivityLogViewSet, user, headers)),
+        ]
+        bookmark = Bookmark.objects.filter(user=user).values_list('item_type', flat=True).first()
+        if bookmark is not None:
+            item_ids = Bookmark.objects.filter(user=user, item_type=bookmark).values_list('item_id', flat=True)
+            queries.append((
+                'GET /api/activities/bookmarks/ (per chunk of bookmarks)',
+                ActivityLog.objects.filter(
+                    content_type=bookmark, object_id__in=list(item_ids[:ActivityLogViewSet.BOOKMARK_CHUNK_SIZE])
+                ).order_by('-created_at', '-id').values_list('created_at', 'id')[:50]
+            ))
+        if options['workspace']:
+            queries.append((
+                'GET /chat/history/<workspace_id>/messages/',
+                ChatMessage.objects.filter(room__workspace_id=options['workspace']).order_by('-timestamp')[:50]
+            ))
+        return queries
+
+    def is_sequential_scan(self, plan):
+        if connection.vendor == 'postgresql':
+            return 'Seq Scan' in plan
+        if connection.vendor == 'sqlite':
+            # "SCAN table" without an index is a full table scan; index-backed
+            # steps are reported as "SEARCH ..." or "SCAN ... USING INDEX".
+            return any(
+                line.strip(' |-`').startswith('SCAN') and 'USING' not in line
+                for line in plan.splitlines()
+            )
+        return False
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor != 'postgresql':
+                raise CommandError("--analyze is only supported on PostgreSQL")
+            explain_options['analyze'] = True
+
+        flagged = []
+        for label, queryset in self.get_queries(user, options):
+            plan = queryset.explain(**explain_options)
+            sequential = self.is_sequential_scan(plan)
+            if sequential:
+                flagged.append(label)
+                self.stdout.write(self.style.WARNING(f"{label}  [SEQUENTIAL SCAN]"))
+            else:
+                self.stdout.write(self.style.SUCCESS(label))
+            self.stdout.write(plan)
+            self.stdout.write('')
+
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            self.stdout.write(f"Sequential scan detection is not implemented for {connection.vendor}.")
+        if flagged:
+            message = f"{len(flagged)} endpoint(s) with sequential scans: {', '.join(flagged)}"
+            if options['strict']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("No sequential scans detected."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api.notifications import NotificationDispatcher, drain
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued notifications from the outbox. Runs until interrupted "
+        "unless --once is given; use with NOTIFICATION_OUTBOX_MODE=worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit')
+        parser.add_argument('--batch-size', type=int, help='Events claimed per batch')
+        parser.add_argument('--interval', type=float, help='Seconds between polls of the outbox')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            delivered = drain(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Delivered {delivered} notification event(s)."))
+            return
+
+        dispatcher = NotificationDispatcher(interval=options['interval'], batch_size=options['batch_size'])
+        dispatcher.wake()  # drain whatever is already queued before the first poll
+        self.stdout.write(f"Delivering notifications every {dispatcher.interval}s (Ctrl+C to stop)")
+        try:
+            dispatcher.run_forever()
+        except KeyboardInterrupt:
+            dispatcher.stop()
@@ -0,0 +1,60 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from backend.profiling import load_dumps, summarize, registry
+
+SORT_KEYS = {
+    'total': lambda item: item[1]['time_ms']['mean'] * item[1]['requests'],
+    'p95': lambda item: item[1]['time_ms']['p95'],
+    'queries': lambda item: item[1]['queries']['mean'],
+    'sql': lambda item: item[1]['sql_ms']['mean'],
+    'view': lambda item: item[1]['view_ms']['mean'],
+    'duplicates': lambda item: item[1]['duplicates']['mean'],
+    'size': lambda item: item[1]['size']['mean'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the per-endpoint stats collected by ProfilingMiddleware "
+        "(PROFILING_ENABLED=True), merged from every process's dump in PROFILING_DIR."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='total', help='Sort order (default: total time)')
+        parser.add_argument('--limit', type=int, default=30, help='Number of endpoints to show')
+        parser.add_argument('--json', action='store_true', help='Print the merged summaries as JSON')
+        parser.add_argument('--reset', action='store_true', help='Delete the dumps after reading them')
+
+    def handle(self, *args, **options):
+        merged = {}
+        for dump in load_dumps(registry.directory, generation=registry.current_generation()):
+            for endpoint, stats in dump.items():
+                if endpoint in merged:
+                    merged[endpoint].merge(stats)
+                else:
+                    merged[endpoint] = stats
+        summaries = sorted(summarize(merged).items(), key=SORT_KEYS[options['sort']], reverse=True)[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(dict(summaries), indent=2))
+        elif not summaries:
+            self.stdout.write(f"No profiling data in {registry.directory} (is PROFILING_ENABLED set?)")
+        else:
+            self.stdout.write(
+                f"{'endpoint':<40} {'reqs':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                f"{'queries':>8} {'dups':>6} {'sql ms':>8} {'view ms':>8} {'size':>9}"
+            )
+            for endpoint, summary in summaries:
+                self.stdout.write(
+                    f"{endpoint[:40]:<40} {summary['requests']:>6} {summary['errors']:>4} "
+                    f"{summary['time_ms']['p50']:>8} {summary['time_ms']['p95']:>8} {summary['time_ms']['p99']:>8} "
+                    f"{summary['queries']['mean']:>8} {summary['duplicates']['mean']:>6} "
+                    f"{summary['sql_ms']['mean']:>8} {summary['view_ms']['mean']:>8} {summary['size']['mean']:>9}"
+                )
+                if summary['duplicate_example']:
+                    self.stdout.write(f"    repeated: {summary['duplicate_example'][:120]}")
+
+        if options['reset']:
+            registry.reset()
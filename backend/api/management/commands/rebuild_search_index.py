@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import SearchDocument
+from api.search import SEARCHABLE, reindex
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text search documents (api.search) of tasks, bugs, "
+        "projects and retrospectives in id-ordered batches, e.g. to repair "
+        "the index (migration 0012 indexes the existing objects)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('types', nargs='*', help=f"Types to index: {', '.join(SEARCHABLE)} (default: all)")
+        parser.add_argument('--batch-size', type=int, default=2000, help='Objects indexed per batch')
+        parser.add_argument('--clear', action='store_true', help='Delete the existing documents first')
+
+    def handle(self, *args, **options):
+        unknown = set(options['types']) - set(SEARCHABLE)
+        if unknown:
+            raise CommandError(f"Unknown type(s): {', '.join(sorted(unknown))}")
+
+        for item_type in options['types'] or SEARCHABLE:
+            model = SEARCHABLE[item_type][0]
+            if options['clear']:
+                SearchDocument.objects.filter(item_type=item_type).delete()
+            total = 0
+            last_id = 0
+            while True:
+                ids = list(
+                    model.objects.filter(id__gt=last_id).order_by('id')
+                    .values_list('id', flat=True)[:options['batch_size']]
+                )
+                if not ids:
+                    break
+                total += reindex(item_type, ids)
+                last_id = ids[-1]
+            # Documents whose objects disappeared without a signal (e.g. raw deletes)
+            orphans = SearchDocument.objects.filter(item_type=item_type).exclude(
+                item_id__in=model.objects.values('id')
+            ).delete()[0]
+            self.stdout.write(self.style.SUCCESS(f"{item_type}: indexed {total}, removed {orphans} orphaned"))
@@ -0,0 +1,53 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import Sprint
+from api.sprint_stats import rebuild_sprint_stats, replay_burndown, snapshot_burndown
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain the sprint counters and burndown: --snapshot stores the "
+        "running sprints' counts for the day (run it daily, shortly before "
+        "midnight), --replay rebuilds past burndown days from ActivityLog "
+        "and --rebuild recounts the counters from the tasks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--snapshot', action='store_true', help="Snapshot the running sprints' counts")
+        parser.add_argument('--date', help='Day to snapshot as YYYY-MM-DD (default: today)')
+        parser.add_argument('--replay', action='store_true', help='Rebuild burndown history from ActivityLog')
+        parser.add_argument('--rebuild', action='store_true', help='Recount the counters from the tasks')
+        parser.add_argument('--sprint', type=int, action='append', help='Limit --replay/--rebuild to these sprints')
+
+    def handle(self, *args, **options):
+        if not (options['snapshot'] or options['replay'] or options['rebuild']):
+            raise CommandError('Pass at least one of --snapshot, --replay, --rebuild')
+        sprints = Sprint.objects.order_by('id')
+        if options['sprint']:
+            sprints = sprints.filter(id__in=options['sprint'])
+
+        if options['rebuild']:
+            sprint_ids = list(sprints.values_list('id', flat=True))
+            with transaction.atomic():
+                rebuild_sprint_stats(sprint_ids)
+            self.stdout.write(self.style.SUCCESS(f"Recounted the counters of {len(sprint_ids)} sprint(s)"))
+
+        if options['replay']:
+            days = 0
+            for sprint in sprints:
+                with transaction.atomic():
+                    days += replay_burndown(sprint)
+            self.stdout.write(self.style.SUCCESS(f"Replayed {days} burndown day(s)"))
+
+        if options['snapshot']:
+            try:
+                day = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+            except ValueError:
+                raise CommandError(f"Invalid --date: {options['date']}")
+            with transaction.atomic():
+                count = snapshot_burndown(day)
+            self.stdout.write(self.style.SUCCESS(f"Snapshotted {count} sprint(s) for {day}"))
@@ -0,0 +1,58 @@
+"""
+Cached workspace membership and role lookups.
+
+Every user's memberships are loaded with one query into a {workspace_id:
+role} map and kept in a TieredCache (see api.cache). WorkspaceMember
+post_save/post_delete signals invalidate the user's entry, so views can scope
+querysets with `workspace_id__in=...` instead of joining through
+WorkspaceMember on every request. Processes the invalidation doesn't reach
+(a per-process cache backend) reload the roles from the database within
+MEMBERSHIP_CACHE_LOCAL_TTL seconds; MEMBERSHIP_CACHE_TTL only applies with
+a shared backend.
+"""
+from django.conf import settings
+
+from .cache import TieredCache
+from .models import WorkspaceMember
+
+membership_cache = TieredCache(
+    'workspace-roles',
+    maxsize=getattr(settings, 'MEMBERSHIP_CACHE_SIZE', 4096),
+    local_ttl=getattr(settings, 'MEMBERSHIP_CACHE_LOCAL_TTL', 5.0),
+    shared_ttl=getattr(settings, 'MEMBERSHIP_CACHE_TTL', 300),
+)
+
+
+def _user_id(user):
+    return getattr(user, 'pk', user)
+
+
+def get_workspace_roles(user):
+    """
+    Return {workspace_id: role} for every workspace the user belongs to
+    """
+    user_id = _user_id(user)
+    if user_id is None:
+        return {}
+    return membership_cache.get(user_id, lambda: dict(
+        WorkspaceMember.objects.filter(user_id=user_id).values_list('workspace_id', 'role')
+    ))
+
+
+def get_workspace_ids(user):
+    return list(get_workspace_roles(user))
+
+
+def get_workspace_role(user, workspace_id):
+    try:
+        return get_workspace_roles(user).get(int(workspace_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_workspace_member(user, workspace_id):
+    return get_workspace_role(user, workspace_id) is not None
+
+
+def invalidate_membership(user):
+    membership_cache.invalidate(_user_id(user))
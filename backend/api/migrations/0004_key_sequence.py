@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 17:46
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_sequences(apps, schema_editor):
+    # Existing item_id/key values were derived from the primary key, so start
+    # each sequence after the highest id already handed out.
+    KeySequence = apps.get_model('api', 'KeySequence')
+    for name, model_name in (('task', 'Task'), ('bug', 'Bug')):
+        model = apps.get_model('api', model_name)
+        last_value = model.objects.aggregate(last=Max('id'))['last'] or 0
+        KeySequence.objects.update_or_create(name=name, defaults={'last_value': last_value})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_filter_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeySequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 17:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_key_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient_ids', models.JSONField(blank=True, default=list)),
+                ('workspace_roles', models.JSONField(blank=True, default=list)),
+                ('message', models.TextField()),
+                ('notification_type', models.CharField(choices=[('invitation', 'Invitation'), ('assignment', 'Assignment'), ('mention', 'Mention'), ('comment', 'Comment'), ('status_change', 'Status Change'), ('deadline', 'Deadline'), ('system', 'System')], default='system', max_length=20)),
+                ('item_type', models.CharField(max_length=50)),
+                ('item_id', models.CharField(max_length=20)),
+                ('url', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_by', models.CharField(blank=True, max_length=64, null=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('exclude_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('sender', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('workspace', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.workspace')),
+            ],
+        ),
+    ]
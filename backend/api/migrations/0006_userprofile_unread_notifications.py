@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 18:06
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_unread_counts(apps, schema_editor):
+    Notification = apps.get_model('api', 'Notification')
+    UserProfile = apps.get_model('api', 'UserProfile')
+    unread = (
+        Notification.objects.filter(read=False)
+        .values('user_id').annotate(count=Count('id')).values_list('user_id', 'count')
+    )
+    users_by_count = {}
+    for user_id, count in unread:
+        users_by_count.setdefault(count, []).append(user_id)
+    for count, user_ids in users_by_count.items():
+        UserProfile.objects.filter(user_id__in=user_ids).update(unread_notifications=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
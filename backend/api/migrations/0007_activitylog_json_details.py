@@ -0,0 +1,101 @@
+# Generated by Django 5.2 on 2026-10-18 18:15
+
+import json
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 2000
+
+
+def parse_details(text):
+    if not text:
+        return {}
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text  # free text from before log_activity used json.dumps
+
+
+def backfill_details(apps, schema_editor):
+    """
+    Copy the JSON text into details_data and mentioned_user, BATCH_SIZE rows
+    (and one transaction) at a time so large logs don't hold one huge lock
+    """
+    ActivityLog = apps.get_model('api', 'ActivityLog')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    last_id = 0
+    while True:
+        rows = list(
+            ActivityLog.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'details')[:BATCH_SIZE]
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        logs = [ActivityLog(id=log_id, details_data=parse_details(text)) for log_id, text in rows]
+        mentioned = {}
+        for log in logs:
+            user_id = log.details_data.get('mentioned_user_id') if isinstance(log.details_data, dict) else None
+            if isinstance(user_id, int) or (isinstance(user_id, str) and user_id.isdigit()):
+                mentioned[log.id] = int(user_id)
+        existing = set(User.objects.filter(id__in=set(mentioned.values())).values_list('id', flat=True))
+        for log in logs:
+            log.mentioned_user_id = mentioned.get(log.id) if mentioned.get(log.id) in existing else None
+        with transaction.atomic():
+            ActivityLog.objects.bulk_update(logs, ['details_data', 'mentioned_user'], batch_size=500)
+
+
+def restore_text_details(apps, schema_editor):
+    ActivityLog = apps.get_model('api', 'ActivityLog')
+    last_id = 0
+    while True:
+        rows = list(
+            ActivityLog.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'details_data')[:BATCH_SIZE]
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        logs = [
+            ActivityLog(id=log_id, details='' if data in (None, {}) else data if isinstance(data, str) else json.dumps(data))
+            for log_id, data in rows
+        ]
+        with transaction.atomic():
+            ActivityLog.objects.bulk_update(logs, ['details'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    # The backfill commits per batch
+    atomic = False
+
+    dependencies = [
+        ('api', '0006_userprofile_unread_notifications'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitylog',
+            name='details_data',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='mentioned_user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mentioned_in', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_details, restore_text_details),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='details',
+        ),
+        migrations.RenameField(
+            model_name='activitylog',
+            old_name='details_data',
+            new_name='details',
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['mentioned_user', 'created_at', 'id'], name='activity_mention_created_idx'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2 on 2026-10-18 18:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Must match api.search.SEARCH_CONFIG: the generated column bakes it in
+SEARCH_CONFIG = 'english'
+
+POSTGRES_SQL = [
+    f"""
+    ALTER TABLE api_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', title), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', body), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX searchdoc_vector_idx ON api_searchdocument USING GIN (search_vector)",
+]
+POSTGRES_REVERSE_SQL = [
+    "DROP INDEX IF EXISTS searchdoc_vector_idx",
+    "ALTER TABLE api_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+# External-content FTS5 table, kept in step with api_searchdocument by triggers
+SQLITE_SQL = [
+    """
+    CREATE VIRTUAL TABLE api_searchdocument_fts USING fts5(
+        title, body, content='api_searchdocument', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER api_searchdocument_fts_insert AFTER INSERT ON api_searchdocument BEGIN
+        INSERT INTO api_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER api_searchdocument_fts_delete AFTER DELETE ON api_searchdocument BEGIN
+        INSERT INTO api_searchdocument_fts(api_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER api_searchdocument_fts_update AFTER UPDATE ON api_searchdocument BEGIN
+        INSERT INTO api_searchdocument_fts(api_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO api_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+SQLITE_REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS api_searchdocument_fts_update",
+    "DROP TRIGGER IF EXISTS api_searchdocument_fts_delete",
+    "DROP TRIGGER IF EXISTS api_searchdocument_fts_insert",
+    "DROP TABLE IF EXISTS api_searchdocument_fts",
+]
+
+
+def run_statements(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_activitylog_object_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_type', models.CharField(max_length=20)),
+                ('item_id', models.IntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField()),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.project')),
+                ('workspace', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.workspace')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['workspace', 'item_type'], name='searchdoc_workspace_type_idx')],
+                'unique_together': {('item_type', 'item_id')},
+            },
+        ),
+        # Other backends fall back to icontains (see api.search)
+        migrations.RunPython(
+            run_statements({'postgresql': POSTGRES_SQL, 'sqlite': SQLITE_SQL}),
+            run_statements({'postgresql': POSTGRES_REVERSE_SQL, 'sqlite': SQLITE_REVERSE_SQL}),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2 on 2026-10-18 18:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_sprint_tasks(apps, schema_editor):
+    Task = apps.get_model('api', 'Task')
+    SprintStat = apps.get_model('api', 'SprintStat')
+    tasks = Task.objects.filter(sprint__isnull=False).order_by()
+    counters = []
+    for dimension, field in (('status', 'status'), ('priority', 'priority'), ('assignee', 'assigned_to_id')):
+        for row in tasks.values('sprint_id', field).annotate(count=Count('id')):
+            key = row[field]
+            counters.append(SprintStat(
+                sprint_id=row['sprint_id'], dimension=dimension,
+                key='' if key is None else str(key), count=row['count'],
+            ))
+    SprintStat.objects.bulk_create(counters, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SprintBurndown',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total', models.IntegerField()),
+                ('done', models.IntegerField()),
+                ('sprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='burndown', to='api.sprint')),
+            ],
+            options={
+                'unique_together': {('sprint', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SprintStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('status', 'Status'), ('priority', 'Priority'), ('assignee', 'Assignee')], max_length=10)),
+                ('key', models.CharField(blank=True, max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('sprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='api.sprint')),
+            ],
+            options={
+                'unique_together': {('sprint', 'dimension', 'key')},
+            },
+        ),
+        migrations.RunPython(count_sprint_tasks, migrations.RunPython.noop),
+    ]
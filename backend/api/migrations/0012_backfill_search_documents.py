@@ -0,0 +1,56 @@
+# Generated by Django 5.2 on 2026-10-18 19:40
+
+from django.db import migrations, transaction
+from django.utils import timezone
+
+BATCH_SIZE = 2000
+
+# item_type: (model, title, body, workspace, project), as built by api.search;
+# a project's document is in the project itself
+DOCUMENTS = {
+    'task': ('Task', 'name', 'description', 'project__workspace_id', 'project_id'),
+    'bug': ('Bug', 'summary', 'description', 'project__workspace_id', 'project_id'),
+    'project': ('Project', 'name', 'description', 'workspace_id', None),
+    'retrospective': ('Retrospective', 'feedback', 'description', 'project__workspace_id', 'project_id'),
+}
+
+
+def backfill_documents(apps, schema_editor):
+    """
+    Index the objects created before 0009, BATCH_SIZE rows (and one
+    transaction) at a time; documents that already exist are left alone
+    """
+    SearchDocument = apps.get_model('api', 'SearchDocument')
+    now = timezone.now()
+    for item_type, (model_name, title, body, workspace, project) in DOCUMENTS.items():
+        model = apps.get_model('api', model_name)
+        columns = ['id', title, body, workspace, project or 'id']
+        last_id = 0
+        while True:
+            rows = list(
+                model.objects.filter(id__gt=last_id).order_by('id').values(*columns)[:BATCH_SIZE]
+            )
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            with transaction.atomic():
+                SearchDocument.objects.bulk_create([
+                    SearchDocument(
+                        item_type=item_type, item_id=row['id'], title=(row[title] or '')[:255], body=row[body] or '',
+                        workspace_id=row[workspace], project_id=row[project or 'id'], updated_at=now,
+                    )
+                    for row in rows if row[workspace] is not None
+                ], batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+    # The backfill commits per batch
+    atomic = False
+
+    dependencies = [
+        ('api', '0011_drop_notification_read_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
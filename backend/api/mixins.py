@@ -1,9 +1,20 @@
 from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from rest_framework.decorators import action
 from rest_framework import status
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Max, Count
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+import hashlib
 import re
 import logging
 
+from .membership import get_workspace_ids
+from .response_cache import response_cache, response_key, get_workspace_versions
+
 logger = logging.getLogger(__name__)
 
 class HeaderIDMixin:
@@ -86,4 +97,224 @@ class HeaderIDMixin:
         if not self.kwargs.get('pk'):
             return Response({"detail": "X-Object-ID header is required for this action."},
                             status=status.HTTP_400_BAD_REQUEST)
-        return self.destroy(request, *args, **kwargs)
\ No newline at end of file
+        return self.destroy(request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified on GET list and retrieve. The validators come from
+    one aggregate over the filtered queryset - max(updated_at) and count(),
+    so deletes change them too - and a matching If-None-Match (or, without
+    one, If-Modified-Since) is answered with 304 before anything is fetched
+    or serialized. Responses are marked private/no-cache so browsers keep
+    them and revalidate every time.
+
+    Nested members and users don't touch the model's updated_at, so the
+    ETag also folds in the versions of the user's workspaces from
+    api.response_cache, which every workspace, member, project and member
+    User edit bumps. Nested data outside those is not covered unless the
+    viewset adds it through conditional_aggregates.
+
+    Place it after HeaderIDMixin so X-Object-ID lists are validated as a
+    retrieve. Disable with API_CONDITIONAL_GET = False.
+    """
+    conditional_field = 'updated_at'
+    # Extra {name: aggregate} folded into the validators
+    conditional_aggregates = {}
+    # Fold in the user's workspace versions (nested members/users)
+    conditional_workspace_versions = True
+    # Request headers that select what a URL returns
+    conditional_vary = ('Authorization', 'Cookie', 'X-Object-ID', 'X-Workspace-ID', 'X-Project-ID', 'X-Sprint-ID')
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            lambda: self.filter_queryset(self.get_queryset()), False, super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        def queryset():
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            return self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        return self.conditional_response(queryset, True, super().retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, get_queryset, single, respond, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not getattr(settings, 'API_CONDITIONAL_GET', True):
+            return respond(request, *args, **kwargs)
+        try:
+            etag, last_modified = self.get_validators(get_queryset(), single)
+        except (ValueError, TypeError, DjangoValidationError):
+            etag = None  # malformed lookup or filter: let the view report it
+        if etag is None:
+            return respond(request, *args, **kwargs)
+
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = respond(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp:
+                response['Last-Modified'] = http_date(timestamp)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, self.conditional_vary)
+        return response
+
+    def get_validators(self, queryset, single=False):
+        """
+        (weak ETag, last modified datetime) for the queryset, or (None, None)
+        when a single object is missing, so the 404 comes from the view
+        """
+        values = queryset.order_by().aggregate(
+            conditional_last_modified=Max(self.conditional_field),
+            conditional_count=Count('pk', distinct=True),
+            **self.conditional_aggregates,
+        )
+        if single and not values['conditional_count']:
+            return None, None
+        request = self.request
+        parts = [request.get_full_path(), str(request.user.pk), request.META.get('HTTP_ACCEPT', '')]
+        parts += [request.headers.get(header, '') for header in self.conditional_vary[2:]]
+        parts += [f'{name}={value}' for name, value in sorted(values.items())]
+        if self.conditional_workspace_versions and request.user.pk is not None:
+            versions = get_workspace_versions(sorted(get_workspace_ids(request.user.pk)))
+            parts += [f'workspace-{workspace_id}={version}' for workspace_id, version in sorted(versions.items())]
+        digest = hashlib.md5('|'.join(map(str, parts)).encode(), usedforsecurity=False).hexdigest()
+        return f'W/"{digest}"', values['conditional_last_modified']
+
+
+class CachedResponseMixin:
+    """
+    Serves GET list and retrieve from the versioned response cache (see
+    api.response_cache); only 200 responses are stored. Place it after
+    ConditionalGetMixin so revalidations are still answered with 304 first.
+    Enabled with RESPONSE_CACHE_ENABLED (on by default only with a shared
+    cache backend).
+    """
+    # Response headers stored along with the data
+    cached_headers = ('Link',)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, respond, request, *args, **kwargs):
+        if request.method != 'GET' or not getattr(settings, 'RESPONSE_CACHE_ENABLED', False):
+            return respond(request, *args, **kwargs)
+        key = response_key(request)
+        if key is None:
+            return respond(request, *args, **kwargs)
+
+        fresh = []
+
+        def load():
+            response = respond(request, *args, **kwargs)
+            fresh.append(response)
+            headers = {name: response[name] for name in self.cached_headers if response.has_header(name)}
+            return response.status_code, response.data, headers
+
+        status_code, data, headers = response_cache.get(key, load, cacheable=lambda value: value[0] == 200)
+        if fresh:
+            return fresh[0]
+        return Response(data, status=status_code, headers=headers)
+
+
+class FastListMixin:
+    """
+    Serves the list action from a read-only values() projection (see
+    api.fast_serializers) instead of building model instances and nested
+    serializers per row. Set `fast_list_serializer`; setting
+    API_FAST_LIST_SERIALIZERS = False falls back to serializer_class.
+    """
+    fast_list_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        return self.list_response(self.filter_queryset(self.get_queryset()))
+
+    def list_response(self, queryset, paginate=True):
+        """
+        List response for queryset, paginated unless paginate=False (for
+        actions that bound the rows themselves); also usable by extra list
+        actions
+        """
+        fast = self.fast_list_serializer
+        if fast is None or not getattr(settings, 'API_FAST_LIST_SERIALIZERS', True):
+            page = self.paginate_queryset(queryset) if paginate else None
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+            return Response(self.get_serializer(queryset, many=True).data)
+
+        rows = fast.rows(queryset)
+        page = self.paginate_queryset(rows) if paginate else None
+        if page is not None:
+            return self.get_paginated_response(fast.serialize(page))
+        return Response(fast.serialize(rows))
+
+
+class BulkWriteMixin:
+    """
+    Adds a /bulk/ endpoint that creates (POST), updates (PATCH/PUT) or
+    deletes (DELETE) many objects in one request and one transaction.
+
+    POST and PATCH/PUT take a JSON array (updates need an "id" per item);
+    DELETE takes {"ids": [...]}. Subclasses hook in through
+    perform_bulk_create, perform_bulk_update and perform_bulk_destroy.
+    """
+    # Keep numeric lookups so the router can't read "bulk" as a primary key.
+    lookup_value_regex = '[0-9]+'
+
+    def get_bulk_limit(self):
+        return getattr(settings, 'API_BULK_MAX_ITEMS', 5000)
+
+    def get_bulk_items(self, request):
+        items = request.data
+        if request.method == 'DELETE':
+            items = items.get('ids') if isinstance(items, dict) else items
+        if not isinstance(items, list) or not items:
+            raise ValidationError({"detail": "Expected a non-empty list."})
+        if len(items) > self.get_bulk_limit():
+            raise ValidationError({"detail": f"At most {self.get_bulk_limit()} items are allowed per request."})
+        return items
+
+    @action(detail=False, methods=['post', 'put', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        items = self.get_bulk_items(request)
+
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=items, many=True)
+            serializer.is_valid(raise_exception=True)
+            with transaction.atomic():
+                self.perform_bulk_create(serializer)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        if request.method in ('PUT', 'PATCH'):
+            ids = {item.get('id') for item in items if isinstance(item, dict)}
+            with transaction.atomic():
+                instances = self.get_queryset().select_for_update(of=('self',)).in_bulk(
+                    [pk for pk in ids if str(pk).isdigit()]
+                )
+                serializer = self.get_serializer(instances, data=items, many=True, partial=True)
+                serializer.is_valid(raise_exception=True)
+                self.perform_bulk_update(serializer)
+            return Response(serializer.data)
+
+        ids = [pk for pk in items if str(pk).isdigit()]
+        with transaction.atomic():
+            queryset = self.get_queryset().filter(id__in=ids)
+            # Lock the rows first, so delete signal handlers see their current values
+            list(queryset.select_for_update(of=('self',)).values_list('id', flat=True))
+            deleted = self.perform_bulk_destroy(queryset)
+        return Response({"deleted": deleted})
+
+    def perform_bulk_create(self, serializer):
+        serializer.save()
+
+    def perform_bulk_update(self, serializer):
+        serializer.save()
+
+    def perform_bulk_destroy(self, queryset):
+        deleted, _ = queryset.delete()
+        return deleted
@@ -1,10 +1,71 @@
 #api/models.py
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.utils import timezone
 import secrets
 import random
 import string
+import threading
+
+class KeySequence(models.Model):
+    """
+    Named counters used to allocate Task.item_id and Bug.key before the row is
+    inserted, so a create is a single INSERT (and a single post_save).
+
+    Values are reserved in blocks of KEY_SEQUENCE_BLOCK_SIZE and handed out
+    from memory; a process that exits leaves gaps, never duplicates. The
+    process-wide lock only guards the in-memory blocks: the UPDATE runs
+    outside it, so a thread waiting on the row lock (held by another
+    transaction until it commits) doesn't stall the process's other threads.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_value = models.BigIntegerField(default=0)
+
+    _blocks = {}
+    _lock = threading.Lock()
+
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
+
+    @classmethod
+    def reserve(cls, name, count=1):
+        """
+        Return a list of `count` unused values from the named sequence
+        """
+        if count <= 0:
+            return []
+        with cls._lock:
+            start, end = cls._blocks.get(name, (0, 0))
+            if end - start >= count:
+                cls._blocks[name] = (start + count, end)
+                return list(range(start, start + count))
+
+        # A block reserved inside an outer transaction could be rolled back
+        # after we cached it, so only keep spare values when autocommitting.
+        in_transaction = transaction.get_connection().in_atomic_block
+        block_size = getattr(settings, 'KEY_SEQUENCE_BLOCK_SIZE', 20)
+        size = count if in_transaction else max(count, block_size)
+        first = cls._allocate(name, size)
+        if size > count:
+            with cls._lock:
+                # Another thread may have cached a block meanwhile; keep the
+                # larger one (the other's values become gaps)
+                start, end = cls._blocks.get(name, (0, 0))
+                if end - start < size - count:
+                    cls._blocks[name] = (first + count, first + size)
+        return list(range(first, first + count))
+
+    @classmethod
+    def _allocate(cls, name, size):
+        with transaction.atomic():
+            updated = cls.objects.filter(name=name).update(last_value=F('last_value') + size)
+            if not updated:
+                cls.objects.get_or_create(name=name)
+                cls.objects.filter(name=name).update(last_value=F('last_value') + size)
+            last_value = cls.objects.filter(name=name).values_list('last_value', flat=True).get()
+        return last_value - size + 1
 
 class Workspace(models.Model):
     name = models.CharField(max_length=100)
@@ -69,7 +130,47 @@ class Sprint(models.Model):
     def __str__(self):
         return f"{self.name} - {self.project.name}"
 
+class SprintStat(models.Model):
+    """
+    Number of a sprint's tasks per status, priority or assignee, kept up to
+    date by api.sprint_stats so sprint progress is read from a handful of
+    rows instead of counting tasks.
+    """
+    DIMENSIONS = (
+        ('status', 'Status'),
+        ('priority', 'Priority'),
+        ('assignee', 'Assignee'),
+    )
+
+    sprint = models.ForeignKey(Sprint, on_delete=models.CASCADE, related_name='stats')
+    dimension = models.CharField(max_length=10, choices=DIMENSIONS)
+    key = models.CharField(max_length=20, blank=True)  # assignee user id, '' when unassigned
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('sprint', 'dimension', 'key')
+
+class SprintBurndown(models.Model):
+    """
+    End-of-day task totals of a sprint (see `manage.py sprint_stats`)
+    """
+    sprint = models.ForeignKey(Sprint, on_delete=models.CASCADE, related_name='burndown')
+    date = models.DateField()
+    total = models.IntegerField()
+    done = models.IntegerField()
+
+    class Meta:
+        unique_together = ('sprint', 'date')
+
+class TaskQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        Task.assign_item_ids(objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
 class Task(models.Model):
+    ITEM_ID_OFFSET = 1000000
+
     STATUS_CHOICES = (
         ('backlog', 'Backlog'),
         ('ready', 'Ready to Start'),
@@ -99,16 +200,78 @@ class Task(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     due_date = models.DateField(null=True, blank=True)
     section = models.CharField(max_length=50, default='main_sprint', blank=True)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='task_created_id_idx'),
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+            models.Index(fields=['project', 'sprint'], name='task_project_sprint_idx'),
+        ]
     
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
-        is_new = self._state.adding
-        super().save(*args, **kwargs)
-        if is_new and not self.item_id:
-            self.item_id = str(self.pk + 1000000)
-            super().save(update_fields=['item_id'])
+        if self._state.adding and not self.item_id:
+            Task.assign_item_ids([self])
+        if self.pk is None:
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            self.lock_stats_state()
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self.lock_stats_state()
+            return super().delete(*args, **kwargs)
+
+    # Fields counted by api.sprint_stats. A save or delete turns the change
+    # from their stored values into counter deltas
+    STATS_FIELDS = ('sprint_id', 'status', 'priority', 'assigned_to_id')
+
+    def lock_stats_state(self):
+        """
+        Lock the stored row until commit and take its counted fields as the
+        old state: the instance may have been loaded before a concurrent
+        save, whose change would otherwise be counted twice
+        """
+        if self.pk is not None:
+            self.loaded_stats_state = Task.objects.select_for_update().filter(pk=self.pk).values_list(
+                *self.STATS_FIELDS
+            ).first()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_stats_state = instance.stats_state()
+        return instance
+
+    def stats_state(self):
+        """
+        (sprint_id, status, priority, assigned_to_id), or None when one of
+        them is deferred
+        """
+        if any(field not in self.__dict__ for field in self.STATS_FIELDS):
+            return None
+        return tuple(self.__dict__[field] for field in self.STATS_FIELDS)
+
+    @classmethod
+    def assign_item_ids(cls, tasks):
+        """
+        Fill in item_id for tasks that don't have one yet
+        """
+        pending = [task for task in tasks if not task.item_id]
+        for task, value in zip(pending, KeySequence.reserve('task', len(pending))):
+            task.item_id = str(value + cls.ITEM_ID_OFFSET)
+
+class BugQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        Bug.assign_keys(objs)
+        return super().bulk_create(objs, *args, **kwargs)
 
 class Bug(models.Model):
     STATUS_CHOICES = (
@@ -146,16 +309,38 @@ class Bug(models.Model):
     due_date = models.DateField(null=True, blank=True)
     resolution = models.CharField(max_length=100, blank=True) 
     type = models.CharField(max_length=20, choices=TYPE_CHOICES, default='bug')
+
+    objects = BugQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='bug_created_id_idx'),
+            models.Index(fields=['project', 'status'], name='bug_project_status_idx'),
+        ]
+
     def __str__(self):
         return self.summary
 
     def save(self, *args, **kwargs):
-        is_new = self._state.adding
+        if self._state.adding and not self.key:
+            Bug.assign_keys([self])
         super().save(*args, **kwargs)
-        if is_new and not self.key:
-            project_prefix = self.project.name[:3].upper()
-            self.key = f"{project_prefix}-{self.pk}"
-            super().save(update_fields=['key'])
+
+    @classmethod
+    def assign_keys(cls, bugs):
+        """
+        Fill in key ("<PROJECT PREFIX>-<n>") for bugs that don't have one yet.
+        Project names are read from the cached relation when available and
+        otherwise fetched in a single query.
+        """
+        pending = [bug for bug in bugs if not bug.key]
+        if not pending:
+            return
+        uncached = {bug.project_id for bug in pending if not cls.project.is_cached(bug)}
+        names = dict(Project.objects.filter(id__in=uncached).values_list('id', 'name')) if uncached else {}
+        for bug, value in zip(pending, KeySequence.reserve('bug', len(pending))):
+            name = bug.project.name if cls.project.is_cached(bug) else names[bug.project_id]
+            bug.key = f"{name[:3].upper()}-{value}"
 
 class Retrospective(models.Model):
     TYPE_CHOICES = (
@@ -176,6 +361,11 @@ class Retrospective(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     voted_by = models.ManyToManyField(User, related_name='voted_retrospectives', blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='retro_created_id_idx'),
+        ]
+
     def __str__(self):
         return self.feedback
 
@@ -200,9 +390,46 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     url = models.CharField(max_length=255, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Retention (archive_old_rows) walks expired rows in this order
+            models.Index(fields=['created_at', 'id'], name='notif_created_id_idx'),
+            # A user's list, keyset pages and ?read=true
+            models.Index(fields=['user', 'created_at', 'id'], name='notif_user_created_idx'),
+            # Unread badge and ?read=false list only ever touch unread rows
+            models.Index(fields=['user', 'created_at'], condition=models.Q(read=False),
+                         name='notif_unread_user_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.message[:30]}"
 
+class NotificationEvent(models.Model):
+    """
+    Outbox row for notifications that still have to be fanned out.
+
+    Signals and views write one event per logical notification; a dispatcher
+    (see api.notifications) later expands the audience, bulk-creates the
+    Notification rows and deletes the event. The audience is either an explicit list of user ids or
+    the members of a workspace, optionally restricted to some roles.
+    """
+    recipient_ids = models.JSONField(default=list, blank=True)
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    workspace_roles = models.JSONField(default=list, blank=True)
+    exclude_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    message = models.TextField()
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES, default='system')
+    item_type = models.CharField(max_length=50)
+    item_id = models.CharField(max_length=20)
+    url = models.CharField(max_length=255, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_by = models.CharField(max_length=64, blank=True, null=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.notification_type} event: {self.message[:30]}"
+
 class Bookmark(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookmarks')
     item_type = models.CharField(max_length=50)
@@ -222,6 +449,8 @@ class UserProfile(models.Model):
     location = models.CharField(max_length=100, blank=True)
     avatar = models.ImageField(upload_to='avatars/', null=True, blank=True)
     last_active = models.DateTimeField(default=timezone.now)
+    # Denormalized count of unread notifications, maintained by api.notifications
+    unread_notifications = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.user.username
@@ -265,15 +494,53 @@ class ActivityLog(models.Model):
     action = models.CharField(max_length=20, choices=ACTION_CHOICES)
     content_type = models.CharField(max_length=50)
     object_id = models.CharField(max_length=50)
-    details = models.TextField(blank=True)
+    details = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     workspace = models.ForeignKey(Workspace, on_delete=models.SET_NULL, null=True, blank=True, related_name='activities')
     project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, blank=True, related_name='activities')
+    # details['mentioned_user_id'] as a column, so mentions are an index lookup
+    mentioned_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, db_index=False,
+                                       related_name='mentioned_in')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='activity_created_id_idx'),
+            models.Index(fields=['workspace', 'created_at'], name='activity_ws_created_idx'),
+            models.Index(fields=['project', 'created_at'], name='activity_project_created_idx'),
+            models.Index(fields=['mentioned_user', 'created_at', 'id'], name='activity_mention_created_idx'),
+            models.Index(fields=['content_type', 'object_id', 'created_at'], name='activity_object_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} {self.action} {self.content_type} at {self.created_at}"
 
 
+class SearchDocument(models.Model):
+    """
+    Searchable text of a task, bug, project or retrospective, kept in sync by
+    api.search. The full-text index lives outside the model: a generated
+    tsvector column with a GIN index on PostgreSQL, an FTS5 table fed by
+    triggers on SQLite (see migration 0009). SQLite rebuilds tables on most
+    schema changes, which drops those triggers, so a migration altering this
+    model has to recreate them.
+    """
+    item_type = models.CharField(max_length=20)
+    item_id = models.IntegerField()
+    workspace = models.ForeignKey(Workspace, on_delete=models.CASCADE, related_name='+')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('item_type', 'item_id')
+        indexes = [
+            models.Index(fields=['workspace', 'item_type'], name='searchdoc_workspace_type_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_type} {self.item_id}: {self.title[:30]}"
+
 class OTP(models.Model):
     email = models.EmailField()
     code = models.CharField(max_length=6)
@@ -0,0 +1,356 @@
+"""
+Notification outbox and fan-out.
+
+Producers call enqueue_notification(), which writes one NotificationEvent row
+in the caller's transaction no matter how many users it is addressed to. The
+rows are turned into Notification rows in batches by a dispatcher, selected
+with NOTIFICATION_OUTBOX_MODE:
+
+    'thread'  a background thread in each web process, woken on commit
+    'worker'  only `manage.py process_notifications` delivers
+    'sync'    delivered on commit in the request thread (tests/development)
+
+Each user's unread count is kept in UserProfile.unread_notifications by
+adjust_unread_counts(), which also pushes the change to the user's
+notifications websocket (chat.consumers.NotificationConsumer). Pushes from a
+separate worker process only reach browsers through a cross-process channel
+layer (CHANNEL_LAYER_BACKEND=unix or redis).
+
+The task/bug builders return the keyword arguments for create_notification,
+or None when nothing should be sent, so the post_save signal handlers and the
+bulk endpoints (which bypass signals) produce identical notifications.
+"""
+import logging
+import os
+import threading
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction, close_old_connections
+from django.db.models import Q, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Notification, NotificationEvent, UserProfile, WorkspaceMember
+
+logger = logging.getLogger(__name__)
+
+
+def build_task_assignment(task):
+    if not task.assigned_to:
+        return None
+    project_name = task.project.name if task.project else "a project"
+    return dict(
+        user=task.assigned_to,
+        sender=task.reporter,  # Use reporter as sender
+        message=f"You've been assigned to task '{task.name}' in {project_name}",
+        item_type='task',
+        item_id=str(task.id),
+        notification_type='assignment',
+        url=f"/projects/{task.project_id or ''}/tasks/{task.id}"
+    )
+
+
+def build_task_status_change(task):
+    if not task.assigned_to or task.assigned_to == task.reporter:
+        return None
+    return dict(
+        user=task.assigned_to,
+        sender=task.reporter,
+        message=f"Task '{task.name}' status changed to {task.status}",
+        item_type='task',
+        item_id=str(task.id),
+        notification_type='status_change',
+        url=f"/projects/{task.project_id or ''}/tasks/{task.id}"
+    )
+
+
+def build_bug_assignment(bug):
+    if not bug.assignee:
+        return None
+    project_name = bug.project.name if bug.project else "a project"
+    return dict(
+        user=bug.assignee,
+        sender=bug.reporter,  # Use reporter as sender
+        message=f"You've been assigned to fix bug '{bug.summary}' in {project_name}",
+        item_type='bug',
+        item_id=str(bug.id),
+        notification_type='assignment',
+        url=f"/projects/{bug.project_id or ''}/bugs/{bug.id}"
+    )
+
+
+def build_bug_status_change(bug):
+    if not bug.assignee or bug.assignee == bug.reporter:
+        return None
+    return dict(
+        user=bug.assignee,
+        sender=bug.reporter,
+        message=f"Bug '{bug.summary}' status changed to {bug.status}",
+        item_type='bug',
+        item_id=str(bug.id),
+        notification_type='status_change',
+        url=f"/projects/{bug.project_id or ''}/bugs/{bug.id}"
+    )
+
+
+# --- Outbox ---
+
+def enqueue_notification(sender, message, item_type, item_id, notification_type='system', url=None,
+                         recipients=None, workspace=None, workspace_roles=None, exclude_user=None):
+    """
+    Queue a notification for delivery once the current transaction commits.
+
+    Args:
+        recipients: Users (or user ids) to notify
+        workspace: Notify the members of this workspace instead
+        workspace_roles: Only notify workspace members with one of these roles
+        exclude_user: User left out of a workspace audience (e.g. the actor)
+    """
+    event = NotificationEvent.objects.create(
+        recipient_ids=[getattr(user, 'pk', user) for user in recipients or []],
+        workspace_id=getattr(workspace, 'pk', workspace),
+        workspace_roles=list(workspace_roles or []),
+        exclude_user_id=getattr(exclude_user, 'pk', exclude_user),
+        sender_id=getattr(sender, 'pk', sender),
+        message=message,
+        notification_type=notification_type,
+        item_type=item_type,
+        item_id=str(item_id),
+        url=url,
+    )
+    schedule_delivery()
+    return event
+
+
+def enqueue_notifications(notifications):
+    """
+    Queue several create_notification-style dicts with a single INSERT.
+    Identical notifications addressed to different users share one event.
+    """
+    events = {}
+    for notification in notifications:
+        notification = dict(notification)
+        user = notification.pop('user')
+        sender = notification.pop('sender', None)
+        key = (
+            getattr(sender, 'pk', sender), notification['message'],
+            notification.get('notification_type', 'system'), notification['item_type'],
+            str(notification['item_id']), notification.get('url'),
+        )
+        events.setdefault(key, []).append(getattr(user, 'pk', user))
+    if not events:
+        return []
+    created = NotificationEvent.objects.bulk_create([
+        NotificationEvent(
+            recipient_ids=recipient_ids, sender_id=sender_id, message=message,
+            notification_type=notification_type, item_type=item_type, item_id=item_id, url=url,
+        ) for (sender_id, message, notification_type, item_type, item_id, url), recipient_ids in events.items()
+    ])
+    schedule_delivery()
+    return created
+
+
+def schedule_delivery():
+    mode = getattr(settings, 'NOTIFICATION_OUTBOX_MODE', 'thread')
+    if mode == 'sync':
+        transaction.on_commit(drain)
+    elif mode == 'thread':
+        transaction.on_commit(get_dispatcher().wake)
+
+
+def deliver_pending(batch_size=None, worker_id=None):
+    """
+    Claim one batch of events, create their Notification rows and delete the
+    events. Returns the number of events handled.
+
+    Events are claimed with a conditional UPDATE, so several dispatchers can
+    share the outbox without row locks; claims older than
+    NOTIFICATION_OUTBOX_CLAIM_TIMEOUT seconds are assumed abandoned.
+    """
+    batch_size = batch_size or getattr(settings, 'NOTIFICATION_OUTBOX_BATCH_SIZE', 500)
+    worker_id = worker_id or uuid.uuid4().hex
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, 'NOTIFICATION_OUTBOX_CLAIM_TIMEOUT', 300))
+    claimable = NotificationEvent.objects.filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale))
+
+    ids = list(claimable.order_by('id').values_list('id', flat=True)[:batch_size])
+    if not ids or not claimable.filter(id__in=ids).update(claimed_by=worker_id, claimed_at=now):
+        return 0
+
+    events = list(NotificationEvent.objects.filter(claimed_by=worker_id, claimed_at=now).order_by('id'))
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(expand_events(events), batch_size=batch_size)
+        adjust_unread_counts(Counter(notification.user_id for notification in notifications))
+        NotificationEvent.objects.filter(id__in=[event.id for event in events]).delete()
+    return len(events)
+
+
+def expand_events(events):
+    """
+    Resolve each event's audience and build the Notification rows, dropping
+    duplicates (same user, type, item and message) within the batch.
+    """
+    workspace_ids = {event.workspace_id for event in events if event.workspace_id}
+    members = {}
+    if workspace_ids:
+        for workspace_id, user_id, role in WorkspaceMember.objects.filter(
+            workspace_id__in=workspace_ids
+        ).values_list('workspace_id', 'user_id', 'role'):
+            members.setdefault(workspace_id, []).append((user_id, role))
+
+    # Explicit recipients may have been deleted since the event was queued
+    explicit_ids = {user_id for event in events for user_id in event.recipient_ids}
+    existing_ids = set(User.objects.filter(id__in=explicit_ids).values_list('id', flat=True)) if explicit_ids else set()
+
+    seen = set()
+    notifications = []
+    for event in events:
+        recipients = [user_id for user_id in event.recipient_ids if user_id in existing_ids]
+        if event.workspace_id:
+            recipients += [
+                user_id for user_id, role in members.get(event.workspace_id, [])
+                if not event.workspace_roles or role in event.workspace_roles
+            ]
+        for user_id in recipients:
+            if user_id == event.exclude_user_id:
+                continue
+            key = (user_id, event.notification_type, event.item_type, event.item_id, event.message)
+            if key in seen:
+                continue
+            seen.add(key)
+            notifications.append(Notification(
+                user_id=user_id,
+                sender_id=event.sender_id,
+                message=event.message,
+                notification_type=event.notification_type,
+                item_type=event.item_type,
+                item_id=event.item_id,
+                url=event.url,
+            ))
+    return notifications
+
+
+def drain(batch_size=None):
+    """
+    Deliver pending events until the outbox is empty. Returns the event count.
+    """
+    total = 0
+    while True:
+        delivered = deliver_pending(batch_size)
+        if not delivered:
+            return total
+        total += delivered
+
+
+def unread_group_name(user_id):
+    return f'notifications_{user_id}'
+
+
+def get_unread_count(user):
+    count = UserProfile.objects.filter(user=user).values_list('unread_notifications', flat=True).first()
+    if count is None:
+        # No profile to keep the counter on
+        count = Notification.objects.filter(user=user, read=False).count()
+    return count
+
+
+def adjust_unread_counts(deltas):
+    """
+    Apply {user_id: delta} to the users' unread counters (one UPDATE per
+    distinct delta) and push the change to their sockets after commit.
+
+    Deltas must count rows whose read flag actually changed, taken from a
+    conditional UPDATE/DELETE or from locked rows, never from instances loaded
+    earlier in the request; the clamp at zero is only a last resort.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    users_by_delta = {}
+    for user_id, delta in deltas.items():
+        users_by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in users_by_delta.items():
+        UserProfile.objects.filter(user_id__in=user_ids).update(
+            unread_notifications=Greatest(F('unread_notifications') + delta, 0)
+        )
+    transaction.on_commit(lambda: push_unread_counts(deltas))
+
+
+def push_unread_counts(deltas):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    counts = dict(UserProfile.objects.filter(user_id__in=list(deltas)).values_list('user_id', 'unread_notifications'))
+    messages = [
+        (unread_group_name(user_id), {'type': 'unread_count', 'delta': delta, 'count': counts.get(user_id)})
+        for user_id, delta in deltas.items()
+    ]
+
+    async def send_all():
+        for group, message in messages:
+            await channel_layer.group_send(group, message)
+
+    try:
+        async_to_sync(send_all)()
+    except Exception:
+        logger.exception("Failed to push unread notification counts")
+
+
+class NotificationDispatcher:
+    """
+    Background thread that drains the outbox whenever it is woken up and
+    otherwise polls every NOTIFICATION_OUTBOX_POLL_INTERVAL seconds.
+    """
+    def __init__(self, interval=None, batch_size=None):
+        self.interval = interval or getattr(settings, 'NOTIFICATION_OUTBOX_POLL_INTERVAL', 2.0)
+        self.batch_size = batch_size
+        self.event = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run_forever, name='notification-dispatcher', daemon=True)
+        self.thread.start()
+
+    def wake(self):
+        self.event.set()
+
+    def stop(self):
+        self.stopped.set()
+        self.event.set()
+
+    def run_forever(self):
+        while not self.stopped.is_set():
+            self.event.wait(self.interval)
+            self.event.clear()
+            try:
+                drain(self.batch_size)
+            except Exception:
+                logger.exception("Notification dispatch failed")
+            finally:
+                close_old_connections()
+
+
+_dispatcher = None
+_dispatcher_pid = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """
+    Return this process's dispatcher thread, starting it on first use (and
+    again after a fork).
+    """
+    global _dispatcher, _dispatcher_pid
+    with _dispatcher_lock:
+        if _dispatcher is None or _dispatcher_pid != os.getpid():
+            _dispatcher = NotificationDispatcher()
+            _dispatcher_pid = os.getpid()
+            _dispatcher.start()
+        return _dispatcher
@@ -0,0 +1,231 @@
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset pagination over (created_at, id), newest first.
+
+    Each page is fetched with an indexed range predicate on the last row seen
+    instead of an OFFSET, so the cost of a page does not grow with the table.
+    The response body stays a plain list (the frontend consumes list endpoints
+    as arrays); the opaque next/previous cursors are sent in the Link header.
+
+    Every list is bounded: a request without ?page_size= gets the first
+    PAGE_SIZE rows, and clients that need the rest follow rel="next" (the
+    frontend does so through utils/pagination.js).
+
+    Views can change the keyset column by setting `cursor_ordering_field`;
+    models without that column are paginated by id alone. Querysets may be
+    values() querysets as long as they include id and that column.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 500)
+    ordering_field = 'created_at'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        self.field = self.get_ordering_field(queryset, view)
+        reverse, position, pk = self.decode_cursor(request)
+        self.has_cursor = pk is not None
+
+        if reverse:
+            ordering = [self.field, 'id'] if self.field else ['id']
+        else:
+            ordering = ['-' + self.field, '-id'] if self.field else ['-id']
+        queryset = queryset.order_by(*ordering)
+
+        if self.has_cursor:
+            lookup = 'gt' if reverse else 'lt'
+            if self.field:
+                queryset = queryset.filter(
+                    Q(**{f'{self.field}__{lookup}': position}) |
+                    Q(**{self.field: position, f'id__{lookup}': pk})
+                )
+            else:
+                queryset = queryset.filter(**{f'id__{lookup}': pk})
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_item = self.previous_item = None
+        if results:
+            if reverse:
+                self.next_item = results[-1]
+                self.previous_item = results[0] if has_more else None
+            else:
+                self.next_item = results[-1] if has_more else None
+                self.previous_item = results[0] if self.has_cursor else None
+        return results
+
+    def get_ordering_field(self, queryset, view):
+        field_name = getattr(view, 'cursor_ordering_field', self.ordering_field)
+        try:
+            queryset.model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            return None
+        return field_name
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def decode_cursor(self, request):
+        """
+        Return (reverse, position, pk) for the cursor in the request, or
+        (False, None, None) when there is none.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None, None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            pk = int(tokens['i'][0])
+            position = tokens.get('p', [None])[0]
+            if self.field:
+                position = self.model._meta.get_field(self.field).to_python(position)
+                if position is None:
+                    raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position, pk
+
+    def encode_cursor(self, item, reverse):
+        if isinstance(item, dict):
+            # values() row from a fast list path
+            item = self.model(**{key: item[key] for key in ('id', self.field) if key})
+        tokens = {'i': item.pk}
+        if reverse:
+            tokens['r'] = '1'
+        if self.field:
+            tokens['p'] = item._meta.get_field(self.field).value_to_string(item)
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_item is None:
+            return None
+        return self.encode_cursor(self.next_item, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_item is None:
+            return None
+        return self.encode_cursor(self.previous_item, reverse=True)
+
+    def get_first_link(self):
+        if not self.has_cursor:
+            return None
+        return remove_query_param(self.base_url, self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        links = []
+        for rel, url in (('first', self.get_first_link()),
+                         ('prev', self.get_previous_link()),
+                         ('next', self.get_next_link())):
+            if url:
+                links.append(f'<{url}>; rel="{rel}"')
+        headers = {'Link': ', '.join(links)} if links else None
+        return Response(data, headers=headers)
+
+    def get_paginated_response_schema(self, schema):
+        return schema
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque pagination cursor taken from the Link header.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results per page (max {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class RankedPagination(BasePagination):
+    """
+    Offset pagination for result lists ordered by a computed score (search),
+    where there is no stable column to key on. Like KeysetCursorPagination it
+    returns a plain list and puts the first/prev/next links in the Link
+    header; offsets are capped at `max_results` so deep pages stay cheap.
+    """
+    offset_query_param = 'offset'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    max_results = getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        try:
+            self.page_size = _positive_int(
+                request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            pass
+        self.base_url = request.build_absolute_uri()
+        try:
+            self.offset = _positive_int(request.query_params.get(self.offset_query_param, 0))
+        except ValueError:
+            raise NotFound('Invalid offset')
+        limit = min(self.page_size, max(self.max_results - self.offset, 0))
+        results = list(queryset[self.offset:self.offset + limit + 1])
+        self.has_more = len(results) > limit
+        return results[:limit]
+
+    def get_link(self, offset):
+        if offset <= 0:
+            return remove_query_param(self.base_url, self.offset_query_param)
+        return replace_query_param(self.base_url, self.offset_query_param, offset)
+
+    def get_paginated_response(self, data):
+        links = []
+        if self.offset:
+            links.append(f'<{self.get_link(0)}>; rel="first"')
+            links.append(f'<{self.get_link(self.offset - self.page_size)}>; rel="prev"')
+        if self.has_more:
+            links.append(f'<{self.get_link(self.offset + self.page_size)}>; rel="next"')
+        headers = {'Link': ', '.join(links)} if links else None
+        return Response(data, headers=headers)
+
+    def get_paginated_response_schema(self, schema):
+        return schema
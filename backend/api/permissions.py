@@ -0,0 +1,19 @@
+from rest_framework.permissions import BasePermission
+
+from .membership import is_workspace_member
+
+
+class IsWorkspaceMember(BasePermission):
+    """
+    Rejects requests that name a workspace (X-Workspace-ID header or
+    ?workspace=) the user doesn't belong to. Uses the cached membership map,
+    so it costs no query on a warm cache. Querysets still scope objects to
+    the user's workspaces.
+    """
+    message = "You are not a member of this workspace."
+
+    def has_permission(self, request, view):
+        workspace_id = getattr(request, 'workspace_id', None) or request.query_params.get('workspace')
+        if not workspace_id:
+            return True
+        return is_workspace_member(request.user, workspace_id)
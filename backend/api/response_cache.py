@@ -0,0 +1,90 @@
+"""
+Versioned response cache for the workspace and project endpoints.
+
+Every workspace has a version counter in the shared cache tier. Saves and
+deletes of the workspace, its members and projects (and of a member's User,
+nested in both responses) bump it once their transaction commits. A cached
+GET response is keyed by the user, the full URL, the X-*-ID headers and the
+current versions of all the user's workspaces, so a bump makes every entry
+that could show the change unreachable without deleting anything; stale
+entries simply age out of the per-process LRU and the Django cache backend.
+
+Counters that are missing (never bumped, or evicted) start from a fresh
+time-based value rather than 0, so an evicted counter can never bring back
+entries cached under an older version.
+
+The versions must be visible to every process, so the cache is only on by
+default when RESPONSE_CACHE_ALIAS names a shared backend (Redis, Memcached,
+database); with the per-process LocMemCache other workers would keep
+serving their entries after a write.
+
+Settings: RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_ALIAS (entry in CACHES),
+RESPONSE_CACHE_SIZE and RESPONSE_CACHE_LOCAL_TTL (per-process LRU),
+RESPONSE_CACHE_TTL (shared tier).
+"""
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import TieredCache
+from .membership import get_workspace_ids
+
+response_cache = TieredCache(
+    'api-responses',
+    maxsize=getattr(settings, 'RESPONSE_CACHE_SIZE', 2048),
+    local_ttl=getattr(settings, 'RESPONSE_CACHE_LOCAL_TTL', 60.0),
+    shared_ttl=getattr(settings, 'RESPONSE_CACHE_TTL', 600),
+    alias=getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default'),
+)
+
+# Request headers that select what the endpoints return
+KEY_HEADERS = ('X-Object-ID', 'X-Workspace-ID', 'X-Project-ID', 'X-Sprint-ID', 'Accept')
+
+
+def _version_key(workspace_id):
+    return f'workspace-version:{workspace_id}'
+
+
+def get_workspace_versions(workspace_ids):
+    """
+    {workspace_id: version} with one round trip to the shared tier
+    """
+    shared = response_cache.shared
+    keys = {_version_key(workspace_id): workspace_id for workspace_id in workspace_ids}
+    found = shared.get_many(list(keys))
+    versions = {keys[key]: version for key, version in found.items()}
+    for key, workspace_id in keys.items():
+        if workspace_id not in versions:
+            versions[workspace_id] = response_cache.get_version(key)
+    return versions
+
+
+def _bump(workspace_ids):
+    for workspace_id in workspace_ids:
+        response_cache.bump_version(_version_key(workspace_id))
+
+
+def bump_workspace_versions(workspace_ids):
+    """
+    Invalidate the cached responses showing these workspaces once the
+    current transaction commits (a reader could otherwise cache the old rows
+    under the new version)
+    """
+    workspace_ids = {workspace_id for workspace_id in workspace_ids if workspace_id is not None}
+    if workspace_ids:
+        transaction.on_commit(lambda: _bump(workspace_ids))
+
+
+def response_key(request):
+    """
+    Cache key for request, or None when there is nothing to scope it to
+    """
+    user_id = request.user.pk
+    if user_id is None:
+        return None
+    versions = get_workspace_versions(sorted(get_workspace_ids(user_id)))
+    parts = [request.build_absolute_uri(), str(user_id)]
+    parts += [request.headers.get(header, '') for header in KEY_HEADERS]
+    parts += [f'{workspace_id}={version}' for workspace_id, version in sorted(versions.items())]
+    return hashlib.md5('|'.join(parts).encode(), usedforsecurity=False).hexdigest()
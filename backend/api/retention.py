@@ -0,0 +1,116 @@
+"""
+Retention for the append-only tables (ActivityLog, Notification).
+
+Rows older than a policy's horizon are moved out in batches: each batch is
+read in (created_at, id) order through the existing created_at indexes,
+written to a gzip-compressed JSONL segment under RETENTION_ARCHIVE_DIR, and
+then deleted by primary key in its own short transaction, so no lock is held
+across the whole run. A segment is written (atomically, via rename) before
+its rows are deleted; if a run dies in between, the next run rewrites the
+same segment and deletes the rows.
+
+Segments are laid out as <dir>/<table>/<YYYY-MM>/<first id>-<last id>.jsonl.gz,
+one JSON object per row with the values() of the model's concrete fields.
+Deleting unread notifications also lowers their users' unread counters.
+
+Run it with `manage.py archive_old_rows`, e.g. nightly.
+"""
+import gzip
+import json
+import os
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import ActivityLog, Notification
+from .notifications import adjust_unread_counts
+
+
+class RetentionPolicy:
+    def __init__(self, name, model, days_setting, default_days):
+        self.name = name
+        self.model = model
+        self.days_setting = days_setting
+        self.default_days = default_days
+
+    @property
+    def days(self):
+        return getattr(settings, self.days_setting, self.default_days)
+
+    def columns(self):
+        return [field.attname for field in self.model._meta.concrete_fields]
+
+    def before_delete(self, rows):
+        """
+        Hook run in the delete transaction with the rows about to go
+        """
+
+
+class NotificationRetention(RetentionPolicy):
+    def before_delete(self, rows):
+        # The rows were read before the transaction; lock the ones still
+        # unread so a concurrent mark_read can't decrement them as well
+        unread = Notification.objects.select_for_update().filter(
+            id__in=[row['id'] for row in rows], read=False
+        ).values_list('user_id', flat=True)
+        adjust_unread_counts({user_id: -count for user_id, count in Counter(unread).items()})
+
+
+POLICIES = {
+    'activity': RetentionPolicy('activity', ActivityLog, 'RETENTION_ACTIVITY_LOG_DAYS', 365),
+    'notifications': NotificationRetention('notifications', Notification, 'RETENTION_NOTIFICATION_DAYS', 180),
+}
+
+
+def archive_directory():
+    return Path(getattr(settings, 'RETENTION_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive'))
+
+
+def write_segment(policy, rows, directory=None):
+    """
+    Write rows (oldest first) to a compressed JSONL segment and return its path
+    """
+    first, last = rows[0], rows[-1]
+    path = (
+        Path(directory or archive_directory()) / policy.model._meta.db_table
+        / first['created_at'].strftime('%Y-%m') / f"{first['id']}-{last['id']}.jsonl.gz"
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + '.tmp')
+    with gzip.open(temporary, 'wt', encoding='utf-8') as segment:
+        for row in rows:
+            segment.write(json.dumps(row, cls=DjangoJSONEncoder, separators=(',', ':')))
+            segment.write('\n')
+    os.replace(temporary, path)
+    return path
+
+
+def archive_expired(policy, cutoff, batch_size=None, archive=True, directory=None, pause=0.0, limit=None):
+    """
+    Archive and delete policy.model rows created before cutoff, batch_size at
+    a time. Yields (rows in batch, segment path or None) after each batch.
+    """
+    batch_size = batch_size or getattr(settings, 'RETENTION_BATCH_SIZE', 5000)
+    columns = policy.columns()
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        rows = list(
+            policy.model.objects.filter(created_at__lt=cutoff)
+            .order_by('created_at', 'id').values(*columns)[:size]
+        )
+        if not rows:
+            return
+        path = write_segment(policy, rows, directory) if archive else None
+        with transaction.atomic():
+            policy.before_delete(rows)
+            policy.model.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        if remaining is not None:
+            remaining -= len(rows)
+        yield len(rows), path
+        if pause:
+            time.sleep(pause)  # let replication and other writers catch up
@@ -0,0 +1,198 @@
+"""
+Full-text search over tasks, bugs, projects and retrospectives.
+
+Each searchable object has one SearchDocument row (title, body, workspace,
+project). Saves and deletes only mark the object as stale; the documents are
+rebuilt in bulk once the transaction commits, one query per model and batch,
+so indexing neither slows the write path down nor sees rolled-back data.
+Bulk endpoints that bypass signals call schedule_reindex() themselves,
+migration 0012 indexes the objects that existed before search, and
+`manage.py rebuild_search_index` (re)builds everything.
+
+The index itself is backend-specific (migration 0009):
+
+    postgresql  generated tsvector column (title weighted A, body B) with a
+                GIN index; queries use websearch_to_tsquery and ts_rank_cd
+    sqlite      FTS5 table fed by triggers; terms are ANDed prefix matches
+                ranked with bm25
+    others      icontains over title and body, unranked
+
+Results are always restricted to the workspaces the user belongs to.
+"""
+import logging
+import re
+import threading
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connection, transaction
+from django.db.models import Q, Value, FloatField
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .membership import get_workspace_ids
+from .models import SearchDocument, Task, Bug, Project, Retrospective
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'english'
+
+
+def _task_document(task):
+    return task.name, task.description, task.project.workspace_id, task.project_id
+
+
+def _bug_document(bug):
+    return bug.summary, bug.description, bug.project.workspace_id, bug.project_id
+
+
+def _project_document(project):
+    return project.name, project.description, project.workspace_id, project.id
+
+
+def _retrospective_document(retrospective):
+    return retrospective.feedback, retrospective.description, retrospective.project.workspace_id, retrospective.project_id
+
+
+# item_type: (model, related objects to load, document builder)
+SEARCHABLE = {
+    'task': (Task, ['project'], _task_document),
+    'bug': (Bug, ['project'], _bug_document),
+    'project': (Project, [], _project_document),
+    'retrospective': (Retrospective, ['project'], _retrospective_document),
+}
+ITEM_TYPES = {model: item_type for item_type, (model, _, _) in SEARCHABLE.items()}
+
+
+# --- Indexing ---
+
+_pending = threading.local()
+
+
+def schedule_reindex(item_type, ids):
+    """
+    Rebuild the documents of these objects after the current transaction
+    commits (right away outside a transaction)
+    """
+    pending = getattr(_pending, 'ids', None)
+    if pending is None:
+        pending = _pending.ids = {}
+    pending.setdefault(item_type, set()).update(ids)
+    # Every call registers a callback; the first one to run flushes them all.
+    # Ids left behind by a rollback are harmlessly reindexed with the next commit.
+    transaction.on_commit(flush_pending)
+
+
+def flush_pending():
+    pending, _pending.ids = getattr(_pending, 'ids', None), None
+    for item_type, ids in (pending or {}).items():
+        try:
+            reindex(item_type, ids)
+        except Exception:
+            # The write itself is committed; rebuild_search_index repairs the index
+            logger.exception(f"Failed to reindex {len(ids)} {item_type} document(s)")
+
+
+def reindex(item_type, ids):
+    """
+    Bring the documents of the given objects in line with the database:
+    create or update those that exist, delete those that don't
+    """
+    model, related, build = SEARCHABLE[item_type]
+    ids = list(ids)
+    objects = model.objects.filter(id__in=ids).select_related(*related)
+    now = timezone.now()
+    documents = {}
+    for obj in objects:
+        title, body, workspace_id, project_id = build(obj)
+        documents[obj.id] = SearchDocument(
+            item_type=item_type, item_id=obj.id, title=(title or '')[:255], body=body or '',
+            workspace_id=workspace_id, project_id=project_id, updated_at=now,
+        )
+
+    existing = dict(
+        SearchDocument.objects.filter(item_type=item_type, item_id__in=ids).values_list('item_id', 'id')
+    )
+    stale = [item_id for item_id in existing if item_id not in documents]
+    changed = []
+    for item_id, document in documents.items():
+        if item_id in existing:
+            document.id = existing[item_id]
+            changed.append(document)
+    with transaction.atomic():
+        if stale:
+            SearchDocument.objects.filter(item_type=item_type, item_id__in=stale).delete()
+        if changed:
+            SearchDocument.objects.bulk_update(
+                changed, ['title', 'body', 'workspace', 'project', 'updated_at'], batch_size=500
+            )
+        SearchDocument.objects.bulk_create(
+            [document for document in documents.values() if document.id is None], batch_size=500
+        )
+        if item_type == 'project':
+            # Documents of a project's items follow it to another workspace
+            for project_id, document in documents.items():
+                SearchDocument.objects.filter(project_id=project_id).exclude(
+                    workspace_id=document.workspace_id
+                ).update(workspace_id=document.workspace_id)
+    return len(documents)
+
+
+# --- Querying ---
+
+def _sqlite_match(text):
+    """
+    FTS5 query ANDing a quoted prefix match per word, so user input can't
+    inject FTS syntax
+    """
+    return ' '.join(f'"{term}"*' for term in re.findall(r'\w+', text))
+
+
+def search_documents(user, text, item_types=None, workspace_id=None, project_id=None):
+    """
+    Return a SearchDocument values() queryset matching text, best match
+    first, with a `rank` column
+    """
+    scope = [('workspace_id', get_workspace_ids(user))]
+    if item_types:
+        scope.append(('item_type', list(item_types)))
+    if workspace_id:
+        scope.append(('workspace_id', [int(workspace_id)]))
+    if project_id:
+        scope.append(('project_id', [int(project_id)]))
+    if not all(values for _, values in scope):
+        return SearchDocument.objects.none().values()
+
+    queryset = SearchDocument.objects.all()
+    if connection.vendor == 'sqlite':
+        match = _sqlite_match(text)
+        if not match:
+            return SearchDocument.objects.none().values()
+        table = SearchDocument._meta.db_table
+        where = [f'{table}_fts MATCH %s', f'{table}_fts.rowid = {table}.id']
+        params = [match]
+        for column, values in scope:
+            # Unary + keeps SQLite from driving the join through these indexes,
+            # which would re-run the MATCH once per candidate row
+            where.append(f'+{table}.{column} IN ({", ".join(["%s"] * len(values))})')
+            params.extend(values)
+        queryset = queryset.extra(
+            tables=[f'{table}_fts'], where=where, params=params,
+            # bm25() is lower for better matches; title hits weigh 4x
+            select={'rank': f'-bm25({table}_fts, 4.0, 1.0)'},
+        )
+    else:
+        for column, values in scope:
+            queryset = queryset.filter(**{f'{column}__in': values})
+        if connection.vendor == 'postgresql':
+            vector = RawSQL(f'"{SearchDocument._meta.db_table}"."search_vector"', [], output_field=SearchVectorField())
+            query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+            queryset = queryset.alias(vector=vector).filter(vector=query).annotate(
+                rank=SearchRank(vector, query, cover_density=True)
+            )
+        else:
+            queryset = queryset.filter(Q(title__icontains=text) | Q(body__icontains=text)).annotate(
+                rank=Value(0.0, output_field=FloatField())
+            )
+    return queryset.order_by('-rank', '-id').values(
+        'id', 'item_type', 'item_id', 'title', 'workspace_id', 'project_id', 'updated_at', 'rank'
+    )
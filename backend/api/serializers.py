@@ -1,3 +1,5 @@
+import json
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import (
@@ -7,6 +9,82 @@ from .models import (
 )
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from django.utils.functional import cached_property
+
+
+class _PrimedQuerySet:
+    """
+    Stand-in for a related field's queryset that answers get(pk=...) from
+    objects fetched up front, so validating N items doesn't cost N queries.
+    """
+    def __init__(self, model, objects):
+        self.model = model
+        self.objects = objects
+
+    def get(self, pk):
+        obj = self.objects.get(self.model._meta.pk.to_python(pk))
+        if obj is None:
+            raise self.model.DoesNotExist
+        return obj
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    ListSerializer that writes with a single bulk_create / bulk_update.
+
+    For updates, pass `instance` as a dict of objects keyed by id; every item
+    in the payload must then carry the "id" of the object it changes.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.prime_related_fields(data)
+        return super().to_internal_value(data)
+
+    def prime_related_fields(self, data):
+        for field in self.child.fields.values():
+            if field.read_only or not isinstance(field, serializers.PrimaryKeyRelatedField):
+                continue
+            pks = {item.get(field.field_name) for item in data if isinstance(item, dict)}
+            pks.discard(None)
+            queryset = field.get_queryset()
+            try:
+                objects = queryset.in_bulk(pks)
+            except (TypeError, ValueError):
+                continue  # leave it to per-item validation to report bad ids
+            field.queryset = _PrimedQuerySet(queryset.model, objects)
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            try:
+                self.child.instance = self.instance[int(data['id'])]
+            except (KeyError, TypeError, ValueError):
+                raise serializers.ValidationError({'id': ['A valid id of an existing object is required.']})
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return model.objects.bulk_create([model(**attrs) for attrs in validated_data])
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        objs = [instances[int(item['id'])] for item in self.initial_data]
+        fields = set()
+        for obj, attrs in zip(objs, validated_data):
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
+            fields.update(attrs)
+        if fields:
+            # bulk_update() skips pre_save(), so auto_now has to be applied here
+            if any(f.name == 'updated_at' for f in model._meta.concrete_fields):
+                now = timezone.now()
+                for obj in objs:
+                    obj.updated_at = now
+                fields.add('updated_at')
+            model.objects.bulk_update(objs, sorted(fields))
+        return objs
+
+
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
     
@@ -86,6 +164,7 @@ class TaskSerializer(serializers.ModelSerializer):
             'reporter', 'status', 'priority', 'role', 'item_id', 
             'created_at', 'updated_at', 'due_date'
         ]
+        list_serializer_class = BulkListSerializer
 
 class BugSerializer(serializers.ModelSerializer):
     assignee = UserSerializer(read_only=True)
@@ -98,18 +177,24 @@ class BugSerializer(serializers.ModelSerializer):
             'assignee', 'status', 'priority', 'key', 'created_at', 
             'updated_at', 'due_date', 'resolution', 'type'
         ]
+        list_serializer_class = BulkListSerializer
         
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         if instance.reporter:
-            representation['reporter'] = UserSerializer(instance.reporter).data
+            representation['reporter'] = self.reporter_serializer.to_representation(instance.reporter)
         return representation
 
+    @cached_property
+    def reporter_serializer(self):
+        # One instance for the whole list; building a serializer per row is costly
+        return UserSerializer()
+
 class RetrospectiveSerializer(serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
     responsible = UserSerializer(read_only=True)
     voted_by = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
-    votes = serializers.IntegerField(source='voted_by.count', read_only=True)
+    votes = serializers.SerializerMethodField()
 
     class Meta:
         model = Retrospective
@@ -119,6 +204,13 @@ class RetrospectiveSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
 
+    def get_votes(self, obj):
+        """Use the vote_count annotation from the list queryset when present"""
+        vote_count = getattr(obj, 'vote_count', None)
+        if vote_count is None:
+            return len(obj.voted_by.all())
+        return vote_count
+
 class NotificationSerializer(serializers.ModelSerializer):
     sender = UserSerializer(read_only=True)
     time_since = serializers.SerializerMethodField()
@@ -163,8 +255,22 @@ class InvitationSerializer(serializers.ModelSerializer):
         model = Invitation
         fields = ['id', 'workspace', 'email', 'sender', 'role', 'status', 'token', 'created_at', 'view_only']
 
+class ActivityDetailsField(serializers.JSONField):
+    """
+    ActivityLog.details is stored as JSON but rendered as the JSON text the
+    API has always returned ('' when empty), so clients keep parsing a string
+    """
+    def to_representation(self, value):
+        if value in (None, {}):
+            return ''
+        if isinstance(value, str):
+            return value
+        return json.dumps(value)
+
+
 class ActivityLogSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    details = ActivityDetailsField(read_only=True)
     
     class Meta:
         model = ActivityLog
@@ -1,10 +1,23 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
+from django.db import transaction
 from django.contrib.auth.models import User
 from django.contrib.auth.signals import user_logged_in
-from django.utils import timezone
-from .models import UserProfile, Task, Bug, Invitation, Sprint, Workspace, WorkspaceMember, Project, Notification
-from .utils import create_notification
+from rest_framework.authtoken.models import Token
+from .models import (
+    UserProfile, Task, Bug, Invitation, Sprint, Workspace, WorkspaceMember, Project, Retrospective
+)
+from .utils import create_notification, update_user_activity
+from .membership import get_workspace_ids, invalidate_membership
+from .response_cache import bump_workspace_versions
+from .authentication import invalidate_token
+from .fast_serializers import invalidate_user_summary
+from .search import ITEM_TYPES, schedule_reindex
+from .sprint_stats import record_task_changes
+from .notifications import (
+    enqueue_notification, build_task_assignment, build_task_status_change,
+    build_bug_assignment, build_bug_status_change
+)
 
 @receiver(post_save, sender=User)
 def create_or_update_user_profile(sender, instance, created, **kwargs):
@@ -13,14 +26,20 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
     """
     UserProfile.objects.get_or_create(user=instance)
 
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user_summary(sender, instance, **kwargs):
+    """
+    Drop the user's cached summary used by the fast list serializers
+    """
+    invalidate_user_summary(instance.pk)
+
 @receiver(user_logged_in)
 def update_user_last_login(sender, user, request, **kwargs):
     """
     Update user's last_active timestamp when they log in
     """
-    profile, created = UserProfile.objects.get_or_create(user=user)
-    profile.last_active = timezone.now()
-    profile.save()
+    update_user_activity(user)
 
 # New signals for notifications
 
@@ -50,36 +69,20 @@ def task_assignment_notification(sender, instance, created, **kwargs):
     """
     Send notification when a task is assigned to a user
     """
-    if instance.assigned_to and (created or (kwargs.get('update_fields') and 'assigned_to' in kwargs.get('update_fields'))):
-        project_name = instance.project.name if instance.project else "a project"
-        message = f"You've been assigned to task '{instance.name}' in {project_name}"
-        create_notification(
-            user=instance.assigned_to,
-            sender=instance.reporter,  # Use reporter as sender
-            message=message,
-            item_type='task',
-            item_id=str(instance.id),
-            notification_type='assignment',
-            url=f"/projects/{instance.project.id if instance.project else ''}/tasks/{instance.id}"
-        )
+    if created or (kwargs.get('update_fields') and 'assigned_to' in kwargs.get('update_fields')):
+        notification = build_task_assignment(instance)
+        if notification:
+            create_notification(**notification)
 
 @receiver(post_save, sender=Bug)
 def bug_assignment_notification(sender, instance, created, **kwargs):
     """
     Send notification when a bug is assigned to a user
     """
-    if instance.assignee and (created or (kwargs.get('update_fields') and 'assignee' in kwargs.get('update_fields'))):
-        project_name = instance.project.name if instance.project else "a project"
-        message = f"You've been assigned to fix bug '{instance.summary}' in {project_name}"
-        create_notification(
-            user=instance.assignee,
-            sender=instance.reporter,  # Use reporter as sender
-            message=message,
-            item_type='bug',
-            item_id=str(instance.id),
-            notification_type='assignment',
-            url=f"/projects/{instance.project.id if instance.project else ''}/bugs/{instance.id}"
-        )
+    if created or (kwargs.get('update_fields') and 'assignee' in kwargs.get('update_fields')):
+        notification = build_bug_assignment(instance)
+        if notification:
+            create_notification(**notification)
 
 @receiver(post_save, sender=Sprint)
 def sprint_start_notification(sender, instance, created, **kwargs):
@@ -88,49 +91,82 @@ def sprint_start_notification(sender, instance, created, **kwargs):
         if not project:
             return
 
-        members = WorkspaceMember.objects.filter(workspace=project.workspace).select_related('user')
-        sender_user = instance.assigned_by if hasattr(instance, 'assigned_by') else None
-        
         if instance.active:
             message = f"Sprint '{instance.name}' has started in project '{project.name}'"
         else:
             message = f"Sprint '{instance.name}' has been completed in project '{project.name}'"
         
-        notifications_to_create = [
-            Notification(
-                user=member.user,
-                sender=sender_user,
-                message=message,
-                item_type='sprint',
-                item_id=str(instance.id),
-                notification_type='status_change',
-                url=f"/projects/{project.id}/sprints/{instance.id}"
-            ) for member in members
-        ]
-        
-        if notifications_to_create:
-            Notification.objects.bulk_create(notifications_to_create)
+        # The outbox dispatcher expands the workspace audience after commit
+        enqueue_notification(
+            workspace=project.workspace_id,
+            sender=instance.assigned_by_id,
+            message=message,
+            item_type='sprint',
+            item_id=str(instance.id),
+            notification_type='status_change',
+            url=f"/projects/{project.id}/sprints/{instance.id}"
+        )
+
 
+@receiver(post_save, sender=WorkspaceMember)
+@receiver(post_delete, sender=WorkspaceMember)
+def invalidate_workspace_membership(sender, instance, **kwargs):
+    """
+    Drop the member's cached workspace roles when their membership changes.
+    Done again on commit so a reader that loaded the old rows mid-transaction
+    can't leave them cached.
+    """
+    invalidate_membership(instance.user_id)
+    transaction.on_commit(lambda: invalidate_membership(instance.user_id))
+
+@receiver(post_save, sender=Workspace)
+@receiver(post_save, sender=WorkspaceMember)
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Workspace)
+@receiver(post_delete, sender=WorkspaceMember)
+@receiver(post_delete, sender=Project)
+def invalidate_workspace_responses(sender, instance, **kwargs):
+    """
+    Make the cached workspace/project responses showing this workspace stale
+    (see api.response_cache)
+    """
+    workspace_ids = [instance.pk if sender is Workspace else instance.workspace_id]
+    if sender is Project:
+        workspace_ids.append(getattr(instance, 'previous_workspace_id', None))
+    bump_workspace_versions(workspace_ids)
+
+@receiver(pre_save, sender=Project)
+def remember_project_workspace(sender, instance, **kwargs):
+    """
+    A project moved to another workspace leaves the old one's responses stale too
+    """
+    if instance.pk is not None:
+        instance.previous_workspace_id = Project.objects.filter(pk=instance.pk).values_list(
+            'workspace_id', flat=True
+        ).first()
+
+@receiver(post_save, sender=User)
+def invalidate_member_responses(sender, instance, update_fields=None, **kwargs):
+    """
+    Users are nested in workspace members and project creators
+    """
+    if update_fields is None or set(update_fields) & {'username', 'email', 'first_name', 'last_name'}:
+        bump_workspace_versions(get_workspace_ids(instance))
 
 @receiver(post_save, sender=WorkspaceMember)
 def new_member_notification(sender, instance, created, **kwargs):
     if created:
-        admins = WorkspaceMember.objects.filter(workspace=instance.workspace, role__in=['admin', 'owner']).select_related('user')
-        
-        notifications_to_create = [
-            Notification(
-                user=admin.user,
-                sender=instance.user,
-                message=f"{instance.user.username} has joined the workspace '{instance.workspace.name}'",
-                item_type='workspace',
-                item_id=str(instance.workspace.id),
-                notification_type='system',
-                url=f"/workspaces/{instance.workspace.id}/members"
-            ) for admin in admins if admin.user != instance.user
-        ]
-
-        if notifications_to_create:
-            Notification.objects.bulk_create(notifications_to_create)
+        enqueue_notification(
+            workspace=instance.workspace_id,
+            workspace_roles=['admin', 'owner'],
+            exclude_user=instance.user_id,
+            sender=instance.user_id,
+            message=f"{instance.user.username} has joined the workspace '{instance.workspace.name}'",
+            item_type='workspace',
+            item_id=str(instance.workspace_id),
+            notification_type='system',
+            url=f"/workspaces/{instance.workspace_id}/members"
+        )
 
 @receiver(post_save, sender=Task)
 def task_status_notification(sender, instance, created, **kwargs):
@@ -138,17 +174,9 @@ def task_status_notification(sender, instance, created, **kwargs):
     Send notification when a task status changes
     """
     if not created and kwargs.get('update_fields') and 'status' in kwargs.get('update_fields'):
-        if instance.assigned_to and instance.assigned_to != instance.reporter:
-            message = f"Task '{instance.name}' status changed to {instance.status}"
-            create_notification(
-                user=instance.assigned_to,
-                sender=instance.reporter,
-                message=message,
-                item_type='task',
-                item_id=str(instance.id),
-                notification_type='status_change',
-                url=f"/projects/{instance.project.id if instance.project else ''}/tasks/{instance.id}"
-            )
+        notification = build_task_status_change(instance)
+        if notification:
+            create_notification(**notification)
 
 @receiver(post_save, sender=Bug)
 def bug_status_notification(sender, instance, created, **kwargs):
@@ -156,14 +184,55 @@ def bug_status_notification(sender, instance, created, **kwargs):
     Send notification when a bug status changes
     """
     if not created and kwargs.get('update_fields') and 'status' in kwargs.get('update_fields'):
-        if instance.assignee and instance.assignee != instance.reporter:
-            message = f"Bug '{instance.summary}' status changed to {instance.status}"
-            create_notification(
-                user=instance.assignee,
-                sender=instance.reporter,
-                message=message,
-                item_type='bug',
-                item_id=str(instance.id),
-                notification_type='status_change',
-                url=f"/projects/{instance.project.id if instance.project else ''}/bugs/{instance.id}"
-            )
\ No newline at end of file
+        notification = build_bug_status_change(instance)
+        if notification:
+            create_notification(**notification)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Bug)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Retrospective)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Bug)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Retrospective)
+def update_search_document(sender, instance, **kwargs):
+    """
+    Keep the item's search document current (rebuilt after commit, see api.search)
+    """
+    schedule_reindex(ITEM_TYPES[sender], [instance.pk])
+
+@receiver(post_save, sender=Task)
+def update_sprint_stats(sender, instance, created, **kwargs):
+    """
+    Count the task's sprint, status, priority and assignee changes (see api.sprint_stats)
+    """
+    record_task_changes([instance], created=created, update_fields=kwargs.get('update_fields'))
+
+@receiver(post_delete, sender=Task)
+def remove_from_sprint_stats(sender, instance, **kwargs):
+    record_task_changes([instance], deleted=True)
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    """
+    Drop the token from the auth cache (see api.authentication), again on
+    commit so a concurrent reader can't keep the old row cached
+    """
+    invalidate_token(instance.key)
+    transaction.on_commit(lambda: invalidate_token(instance.key))
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user_tokens(sender, instance, update_fields=None, **kwargs):
+    """
+    Cached tokens carry the user, so drop them when the user changes
+    (logins only touch last_login)
+    """
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    keys = list(Token.objects.filter(user=instance).values_list('key', flat=True))
+    for key in keys:
+        invalidate_token(key)
+    transaction.on_commit(lambda: [invalidate_token(key) for key in keys])
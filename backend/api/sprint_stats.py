@@ -0,0 +1,253 @@
+"""
+Per-sprint task counters and burndown.
+
+SprintStat holds how many of a sprint's tasks have each status, priority
+and assignee. Task saves and deletes turn into counter deltas: Task.save and
+Task.delete lock the stored row and compare its counted fields with the new
+values, so concurrent saves of the same task each count the change they
+actually made (the bulk endpoints lock their rows when loading them, and
+Task.from_db remembers the counted fields as loaded). The deltas are applied
+in the writer's transaction with one upsert and one UPDATE per distinct delta.
+Bulk endpoints record their tasks themselves (bulk_create/bulk_update send no
+signals), and deferred_stats() folds the per-row signals of a bulk delete into
+a single update.
+
+SprintBurndown keeps one end-of-day (total, done) row per sprint and day.
+`manage.py sprint_stats --snapshot` (run daily) copies today's counters into
+it; `--replay` reconstructs the past days of a sprint from the task status
+transitions recorded in ActivityLog, and `--rebuild` recounts the counters
+from the tasks.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db.models import Q, F, Count
+from django.utils import timezone
+
+from .models import Sprint, SprintStat, SprintBurndown, Task, ActivityLog
+
+DONE_STATUS = 'done'
+
+_local = threading.local()
+
+
+def counter_keys(state):
+    """
+    The (sprint_id, dimension, key) counters a task in this stats_state()
+    counts towards
+    """
+    if state is None or state[0] is None:
+        return []
+    sprint_id, status, priority, assigned_to_id = state
+    return [
+        (sprint_id, 'status', status),
+        (sprint_id, 'priority', priority),
+        (sprint_id, 'assignee', '' if assigned_to_id is None else str(assigned_to_id)),
+    ]
+
+
+def record_task_changes(tasks, created=False, deleted=False, update_fields=None):
+    """
+    Count saved (or deleted) tasks against the sprint counters. Each task's
+    loaded state is reset afterwards so a later save counts from here.
+    """
+    saved = None if update_fields is None else {Task._meta.get_field(name).attname for name in update_fields}
+    deltas = {}
+    unknown = []
+    for task in tasks:
+        old = None if created else getattr(task, 'loaded_stats_state', None)
+        new = None if deleted else task.stats_state()
+        if not deleted and old is not None and (new is None or saved is not None):
+            # Deferred fields and those left out of update_fields weren't
+            # saved, so they still have their old values
+            new = tuple(
+                task.__dict__[field] if field in task.__dict__ and (saved is None or field in saved) else value
+                for field, value in zip(Task.STATS_FIELDS, old)
+            )
+        if not created and old is None:
+            # Saved without Task.lock_stats_state() (e.g. a bulk path): the
+            # previous values are unknown, so recount instead
+            unknown.append(task)
+            continue
+        for key in counter_keys(old):
+            deltas[key] = deltas.get(key, 0) - 1
+        for key in counter_keys(new):
+            deltas[key] = deltas.get(key, 0) + 1
+        task.loaded_stats_state = new
+
+    if unknown:
+        sprint_ids = set(Task.objects.filter(pk__in=[task.pk for task in unknown]).values_list('sprint_id', flat=True))
+        sprint_ids.update(task.__dict__.get('sprint_id') for task in unknown)
+        sprint_ids.discard(None)
+        rebuild_sprint_stats(sprint_ids)
+        for task in unknown:
+            task.loaded_stats_state = None if deleted else task.stats_state()
+
+    pending = getattr(_local, 'deltas', None)
+    if pending is not None:
+        for key, delta in deltas.items():
+            pending[key] = pending.get(key, 0) + delta
+    else:
+        apply_deltas(deltas)
+
+
+@contextmanager
+def deferred_stats():
+    """
+    Collect the counter deltas recorded inside the block and apply them
+    together when it exits without an error
+    """
+    if getattr(_local, 'deltas', None) is not None:
+        yield  # nested: the outermost block applies them
+        return
+    _local.deltas = {}
+    try:
+        yield
+        deltas = _local.deltas
+    finally:
+        _local.deltas = None
+    apply_deltas(deltas)
+
+
+def apply_deltas(deltas):
+    """
+    Apply {(sprint_id, dimension, key): delta}: missing counters are created
+    with one INSERT, then one UPDATE per distinct delta
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    # Only increments create counters: a decrement may come from a task
+    # deleted along with its sprint, whose counters are already gone
+    SprintStat.objects.bulk_create(
+        [SprintStat(sprint_id=sprint_id, dimension=dimension, key=key)
+         for (sprint_id, dimension, key), delta in deltas.items() if delta > 0],
+        ignore_conflicts=True,
+    )
+    keys_by_delta = {}
+    for key, delta in deltas.items():
+        keys_by_delta.setdefault(delta, []).append(key)
+    for delta, keys in keys_by_delta.items():
+        condition = Q()
+        for sprint_id, dimension, key in keys:
+            condition |= Q(sprint_id=sprint_id, dimension=dimension, key=key)
+        SprintStat.objects.filter(condition).update(count=F('count') + delta)
+
+
+def rebuild_sprint_stats(sprint_ids):
+    """
+    Recount the counters of the given sprints from their tasks
+    """
+    sprint_ids = list(sprint_ids)
+    if not sprint_ids:
+        return
+    tasks = Task.objects.filter(sprint_id__in=sprint_ids)
+    counters = []
+    for dimension, field in (('status', 'status'), ('priority', 'priority'), ('assignee', 'assigned_to_id')):
+        for row in tasks.order_by().values('sprint_id', field).annotate(count=Count('id')):
+            key = row[field]
+            counters.append(SprintStat(
+                sprint_id=row['sprint_id'], dimension=dimension,
+                key='' if key is None else str(key), count=row['count'],
+            ))
+    SprintStat.objects.filter(sprint_id__in=sprint_ids).delete()
+    SprintStat.objects.bulk_create(counters)
+
+
+def get_sprint_stats(sprint):
+    stats = {'by_status': {}, 'by_priority': {}, 'by_assignee': {}}
+    for dimension, key, count in SprintStat.objects.filter(sprint=sprint, count__gt=0).values_list(
+        'dimension', 'key', 'count'
+    ):
+        stats[f'by_{dimension}'][key or 'unassigned'] = count
+    total = sum(stats['by_status'].values())
+    done = stats['by_status'].get(DONE_STATUS, 0)
+    return {'sprint': sprint.id, 'total': total, 'done': done, 'remaining': total - done, **stats}
+
+
+# --- Burndown ---
+
+def burndown_row(day, total, done):
+    return {'date': day, 'total': total, 'done': done, 'remaining': total - done}
+
+
+def get_burndown(sprint):
+    """
+    The sprint's daily snapshots, plus today's live counts while it runs
+    """
+    rows = [
+        burndown_row(day, total, done)
+        for day, total, done in sprint.burndown.order_by('date').values_list('date', 'total', 'done')
+    ]
+    today = timezone.localdate()
+    if sprint.start_date <= today <= sprint.end_date and (not rows or rows[-1]['date'] != today):
+        stats = get_sprint_stats(sprint)
+        rows.append(burndown_row(today, stats['total'], stats['done']))
+    return rows
+
+
+def snapshot_burndown(day=None):
+    """
+    Store day's (default: today) counts of every sprint running that day.
+    Returns the number of sprints snapshotted.
+    """
+    day = day or timezone.localdate()
+    sprint_ids = list(Sprint.objects.filter(start_date__lte=day, end_date__gte=day).values_list('id', flat=True))
+    if not sprint_ids:
+        return 0
+    totals = {sprint_id: [0, 0] for sprint_id in sprint_ids}
+    for sprint_id, key, count in SprintStat.objects.filter(
+        sprint_id__in=sprint_ids, dimension='status'
+    ).values_list('sprint_id', 'key', 'count'):
+        totals[sprint_id][0] += count
+        if key == DONE_STATUS:
+            totals[sprint_id][1] += count
+    SprintBurndown.objects.bulk_create(
+        [SprintBurndown(sprint_id=sprint_id, date=day, total=total, done=done)
+         for sprint_id, (total, done) in totals.items()],
+        update_conflicts=True, unique_fields=['sprint', 'date'], update_fields=['total', 'done'],
+    )
+    return len(sprint_ids)
+
+
+def replay_burndown(sprint):
+    """
+    Rebuild the sprint's snapshots up to yesterday from its current tasks and
+    their status transitions in ActivityLog (status changes that were not
+    logged, e.g. plain PATCHes, are attributed to the day they are seen
+    first). Returns the number of days written.
+    """
+    today = timezone.localdate()
+    last_day = min(sprint.end_date, today - timedelta(days=1))
+    if last_day < sprint.start_date:
+        return 0
+
+    tasks = list(Task.objects.filter(sprint=sprint).values_list('item_id', 'status', 'created_at'))
+    transitions = {}
+    for item_id, details, created_at in ActivityLog.objects.filter(
+        content_type='task', action='status', object_id__in=[item_id for item_id, _, _ in tasks],
+    ).order_by('created_at', 'id').values_list('object_id', 'details', 'created_at'):
+        if isinstance(details, dict) and 'old_status' in details:
+            transitions.setdefault(item_id, []).append((timezone.localtime(created_at).date(), details['old_status']))
+
+    snapshots = []
+    day = sprint.start_date
+    while day <= last_day:
+        total = done = 0
+        for item_id, status, created_at in tasks:
+            if timezone.localtime(created_at).date() > day:
+                continue
+            # Walk back from the current status through the later transitions
+            for changed_on, old_status in reversed(transitions.get(item_id, [])):
+                if changed_on <= day:
+                    break
+                status = old_status
+            total += 1
+            done += status == DONE_STATUS
+        snapshots.append(SprintBurndown(sprint=sprint, date=day, total=total, done=done))
+        day += timedelta(days=1)
+
+    SprintBurndown.objects.filter(sprint=sprint, date__lte=last_day).delete()
+    SprintBurndown.objects.bulk_create(snapshots)
+    return len(snapshots)
@@ -1,3 +1,1234 @@
-from django.test import TestCase
+import json
+import re
+import tempfile
+import time
+from datetime import date, timedelta
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.core.mail.backends.locmem import EmailBackend as LocmemEmailBackend
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from backend.profiling import ProfileRegistry, load_dumps, registry
+
+from .activity import ActivityLogWriter
+from .authentication import token_cache, get_token_user
+from .cache import TieredCache
+from .mail import MailQueue
+from .fast_serializers import (
+    user_summary_cache, task_list_serializer, bug_list_serializer,
+    retrospective_list_serializer, activity_log_list_serializer
+)
+from .last_active import LastActiveTracker
+from .management.commands.check_query_budgets import Command as QueryBudgetCommand, build_fixture
+from .membership import membership_cache
+from .models import (
+    Bookmark, KeySequence, Notification, UserProfile, Workspace, WorkspaceMember, Project, Sprint, Task, Bug,
+    Retrospective, ActivityLog, SearchDocument, NotificationEvent
+)
+from .notifications import adjust_unread_counts, deliver_pending, drain, enqueue_notification, enqueue_notifications
+from .pagination import KeysetCursorPagination
+from .response_cache import response_cache
+from .retention import NotificationRetention
+from .sprint_stats import rebuild_sprint_stats, snapshot_burndown
+from .utils import build_activity_log
+from .views import ActivityLogViewSet, NotificationViewSet
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    NOTIFICATION_OUTBOX_MODE='worker',
+    ACTIVITY_LOG_MODE='sync',
+    LAST_ACTIVE_MODE='sync',
+    RESPONSE_CACHE_ENABLED=False,
+)
+class APITestCase(TestCase):
+    """
+    Clears the process-local caches between tests: ids are reused once a
+    test's transaction is rolled back, so entries of an earlier test would
+    otherwise show up under the same keys
+    """
+    def setUp(self):
+        caches['default'].clear()
+        for cache in (membership_cache, response_cache, token_cache):
+            cache.clear_local()
+        user_summary_cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def later(self, seconds):
+        """
+        Move the clocks of the cache tiers `seconds` ahead
+        """
+        wall, monotonic = time.time, time.monotonic
+        return mock.patch.multiple(
+            time, time=lambda: wall() + seconds, monotonic=lambda: monotonic() + seconds,
+        )
+
+
+class QueryBudgetTests(APITestCase):
+    """
+    Every list endpoint must need the same number of queries for N and 3N
+    rows, i.e. no N+1 (same endpoints and fixture as `manage.py check_query_budgets`)
+    """
+    ROWS = 2
+
+    def measure(self, rows):
+        client = self.client_for(build_fixture(rows))
+        results = {}
+        for label, url, overrides in QueryBudgetCommand().endpoints():
+            with override_settings(**overrides):
+                client.get(url)  # warm per-user caches (membership)
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+            self.assertEqual(response.status_code, 200, f"GET {url}")
+            results[label] = [query['sql'] for query in queries.captured_queries]
+        return results
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        small = self.measure(self.ROWS)
+        large = self.measure(self.ROWS * 3)
+        for label in small:
+            with self.subTest(endpoint=label):
+                self.assertEqual(len(small[label]), len(large[label]), '\n'.join(large[label]))
+
+
+class FastSerializerTests(APITestCase):
+    """
+    The values() list serializers must render byte-identical JSON to the
+    ModelSerializers they replace
+    """
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='alice', email='alice@localhost', first_name='Alice')
+        self.other = User.objects.create(username='bob', email='bob@localhost')
+        workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        self.project = Project.objects.create(name='Project', workspace=workspace, created_by=self.user)
+        self.sprint = Sprint.objects.create(name='Sprint', project=self.project, start_date=date(2026, 1, 1),
+                                            end_date=date(2026, 1, 14))
+
+    def assertSameJSON(self, fast, queryset):
+        renderer = JSONRenderer()
+        expected = renderer.render(fast.serializer_class(list(queryset), many=True).data)
+        user_summary_cache.clear()
+        self.assertEqual(renderer.render(fast.serialize(fast.rows(queryset))), expected)
+        # and again from a warm user-summary cache
+        self.assertEqual(renderer.render(fast.serialize(fast.rows(queryset))), expected)
+
+    def test_tasks(self):
+        Task.objects.create(name='Assigned', description='Text', project=self.project, sprint=self.sprint,
+                            assigned_to=self.other, reporter=self.user, due_date=date(2026, 1, 10))
+        Task.objects.create(name='Unassigned, no sprint or reporter', project=self.project)
+        self.assertSameJSON(task_list_serializer, Task.objects.order_by('id'))
+
+    def test_bugs(self):
+        Bug.objects.create(summary='Assigned', project=self.project, reporter=self.user, assignee=self.other,
+                           due_date=date(2026, 1, 10), resolution='fixed')
+        Bug.objects.create(summary='Unassigned, no reporter', project=self.project)
+        self.assertSameJSON(bug_list_serializer, Bug.objects.order_by('id'))
+
+    def test_retrospectives(self):
+        voted = Retrospective.objects.create(feedback='Voted', project=self.project, created_by=self.user,
+                                             responsible=self.other, repeating=True)
+        voted.voted_by.add(self.user, self.other)
+        Retrospective.objects.create(feedback='No votes, nobody responsible', project=self.project)
+        self.assertSameJSON(retrospective_list_serializer, Retrospective.objects.order_by('id'))
+
+    def test_activity_logs(self):
+        ActivityLog.objects.create(user=self.user, workspace=self.project.workspace, project=self.project,
+                                   action='mention', content_type='task', object_id=1,
+                                   details={'mentioned_user_id': self.other.id, 'text': 'caf\u00e9'},
+                                   mentioned_user=self.other)
+        ActivityLog.objects.create(user=self.other, action='create', content_type='bug', object_id=2)
+        self.assertSameJSON(activity_log_list_serializer, ActivityLog.objects.order_by('id'))
+
+
+class ConditionalGetTests(APITestCase):
+    """
+    ETags must change when nested members or users change, although the
+    listed rows' updated_at doesn't
+    """
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        self.other = User.objects.create(username='bob', email='bob@localhost')
+        self.workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='owner')
+        self.member = WorkspaceMember.objects.create(workspace=self.workspace, user=self.other, role='member')
+        project = Project.objects.create(name='Project', workspace=self.workspace, created_by=self.user)
+        Task.objects.create(name='Task', project=project, assigned_to=self.other, reporter=self.user)
+        self.client = self.client_for(self.user)
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def assertETagChanges(self, url, change):
+        etag = self.etag(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertNotEqual(self.etag(url), etag)
+
+    def test_member_role_change(self):
+        def change():
+            self.member.role = 'admin'
+            self.member.save()
+        self.assertETagChanges('/api/workspaces/', change)
+
+    def test_user_rename(self):
+        def change():
+            self.other.first_name = 'Bob'
+            self.other.save()
+        for url in ('/api/workspaces/', '/api/tasks/'):
+            with self.subTest(url=url):
+                self.assertETagChanges(url, change)
+
+
+class TieredCacheTests(APITestCase):
+    def test_evicted_version_does_not_revive_old_entries(self):
+        cache = TieredCache('test-versions')
+        self.assertEqual(cache.get('key', lambda: 'old'), 'old')
+        cache.invalidate('key')
+        self.assertEqual(cache.get('key', lambda: 'new'), 'new')
+        # The shared tier drops the version counter but keeps the entries
+        cache.shared.delete(cache.version_key('key'))
+        cache.clear_local()
+        self.assertEqual(cache.get('key', lambda: 'newest'), 'newest')
+
+    def test_invalidate_seeds_missing_version(self):
+        cache = TieredCache('test-versions')
+        self.assertEqual(cache.get('key', lambda: 'old'), 'old')
+        cache.shared.delete(cache.version_key('key'))
+        cache.invalidate('key')
+        self.assertEqual(cache.get('key', lambda: 'new'), 'new')
+
+
+class TokenCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        self.token = Token.objects.create(user=self.user)
+
+    def revoke_elsewhere(self):
+        """
+        Delete the token without the signal, as another process whose cache
+        tier isn't shared with this one would
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {Token._meta.db_table} WHERE key = %s', [self.token.key])
+
+    def test_revoked_token_rejected_after_local_ttl(self):
+        self.assertEqual(get_token_user(self.token.key)[0], self.user)
+        self.revoke_elsewhere()
+        self.assertIsNotNone(get_token_user(self.token.key))  # within the revocation window
+        later = time.time() + token_cache.local.ttl + 1
+        with mock.patch('api.authentication.time.time', return_value=later):
+            self.assertIsNone(get_token_user(self.token.key))
+
+    def test_recheck_sees_deactivated_user(self):
+        get_token_user(self.token.key)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        later = time.time() + token_cache.local.ttl + 1
+        with mock.patch('api.authentication.time.time', return_value=later):
+            user, _ = get_token_user(self.token.key)
+        self.assertFalse(user.is_active)
+
+    def test_deleted_token_rejected_at_once(self):
+        get_token_user(self.token.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertIsNone(get_token_user(self.token.key))
+
+
+class FlakyEmailBackend(LocmemEmailBackend):
+    """
+    Refuses every batch containing a message to bad@localhost
+    """
+    calls = []
+
+    def send_messages(self, messages):
+        self.calls.append(len(messages))
+        if any('bad@localhost' in message.to for message in messages):
+            raise OSError('refused')
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='api.tests.FlakyEmailBackend')
+class MailQueueTests(APITestCase):
+    def send(self, recipients):
+        FlakyEmailBackend.calls = []
+        queue = MailQueue(max_retries=0)
+        batch = [(0, mail.EmailMessage('Subject', 'Body', 'from@localhost', [to])) for to in recipients]
+        queue.pending = len(batch)
+        queue.send_batch(batch)
+        return queue.stats()
+
+    def test_batch_sent_with_one_call(self):
+        stats = self.send(['a@localhost', 'b@localhost', 'c@localhost'])
+        self.assertEqual(FlakyEmailBackend.calls, [3])
+        self.assertEqual((stats['sent'], stats['failed'], stats['pending']), (3, 0, 0))
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_only_failed_messages_retried(self):
+        with self.assertLogs('api.mail', 'WARNING') as logs:
+            stats = self.send(['a@localhost', 'bad@localhost', 'c@localhost'])
+        self.assertIn('Giving up on email to bad@localhost', logs.output[-1])
+        self.assertEqual(FlakyEmailBackend.calls, [3, 1, 1, 1])
+        self.assertEqual((stats['sent'], stats['failed'], stats['pending']), (2, 1, 0))
+        self.assertEqual([message.to for message in mail.outbox], [['a@localhost'], ['c@localhost']])
+
+    def message(self, to):
+        return mail.EmailMessage('Subject', 'Body', 'from@localhost', [to])
+
+    def test_zero_retry_delay(self):
+        FlakyEmailBackend.calls = []
+        queue = MailQueue(max_retries=2, retry_delay=0, idle_timeout=0)
+        self.assertEqual((queue.retry_delay, queue.idle_timeout), (0, 0))
+        with self.assertLogs('api.mail', 'WARNING'):
+            queue.enqueue(self.message('bad@localhost'))
+            self.assertTrue(queue.flush(timeout=2))
+        stats = queue.stats()
+        self.assertEqual((stats['retried'], stats['failed'], stats['pending']), (2, 1, 0))
+
+    def test_unexpected_error_settles_batch(self):
+        queue = MailQueue()
+        with self.assertLogs('api.mail', 'ERROR') as logs, \
+                mock.patch.object(queue, 'schedule_retry', side_effect=RuntimeError('boom')):
+            queue.enqueue(self.message('bad@localhost'))
+            self.assertTrue(queue.flush(timeout=2))
+        self.assertIn('failed unexpectedly', logs.output[0])
+        self.assertEqual((queue.stats()['failed'], queue.stats()['pending']), (1, 0))
+
+        # The sender thread survived
+        queue.enqueue(self.message('a@localhost'))
+        self.assertTrue(queue.flush(timeout=2))
+        self.assertEqual(queue.stats()['sent'], 1)
+        self.assertEqual([message.to for message in mail.outbox], [['a@localhost']])
+
+
+class ProfilingTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(override_settings(PROFILING_DIR=directory.name, PROFILING_FLUSH_INTERVAL=3600))
+        self.addCleanup(registry.endpoints.clear)
+
+    def test_view_time_recorded(self):
+        user = User.objects.create(username='alice', email='alice@localhost')
+        with override_settings(PROFILING_ENABLED=True):
+            self.assertEqual(self.client_for(user).get('/api/tasks/').status_code, 200)
+        summary = registry.local_stats()['GET task-list'].summary()
+        self.assertEqual(summary['requests'], 1)
+        self.assertGreater(summary['view_ms']['max'], 0)
+
+    def test_reset_reaches_other_processes(self):
+        first, second = ProfileRegistry(), ProfileRegistry()
+        for process in (first, second):
+            process.record('GET task-list', {'time_ms': 5}, 200)
+        with mock.patch.object(second, 'dump_path', return_value=first.directory / 'other.json'):
+            second.flush()
+            first.flush()
+            first.reset()
+            self.assertEqual(load_dumps(first.directory, generation=first.current_generation()), [])
+            # The other process still has its pre-reset data in memory
+            second.flush()
+        dumps = load_dumps(first.directory, generation=first.current_generation())
+        self.assertEqual(dumps, [{}])
+
+
+class NotificationByTypeTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        sender = User.objects.create(username='bob', email='bob@localhost')
+        for i in range(3):
+            Notification.objects.create(user=self.user, sender=sender, message=f'Mention {i}',
+                                        notification_type='mention', item_type='task', item_id=str(i))
+        Notification.objects.create(user=self.user, message='System', item_type='system', item_id='0')
+        self.client = self.client_for(self.user)
+
+    def test_grouped_lists(self):
+        response = self.client.get('/api/notifications/by_type/', {'limit': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data), {key for key, _ in Notification.NOTIFICATION_TYPES})
+        self.assertEqual([item['message'] for item in response.data['mention']], ['Mention 2', 'Mention 1'])
+        self.assertEqual(len(response.data['system']), 1)
+        self.assertEqual(response.data['deadline'], [])
+
+    def test_counts_on_request(self):
+        response = self.client.get('/api/notifications/by_type/', {'limit': 2, 'counts': 'true'})
+        self.assertEqual(len(response.data['mention']), 2)
+        self.assertEqual(response.data['counts']['mention'], 3)
+        self.assertEqual(response.data['counts']['deadline'], 0)
+
+
+class UnreadCountTests(APITestCase):
+    """
+    UserProfile.unread_notifications must move once per actual read/unread
+    transition, also when the request works from a stale instance
+    """
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        self.other = User.objects.create(username='bob', email='bob@localhost')
+        self.client = self.client_for(self.user)
+
+    def notify(self, user=None, read=False):
+        notification = Notification.objects.create(user=user or self.user, message='Hi', item_type='task',
+                                                   item_id='1', read=read)
+        if not read:
+            adjust_unread_counts({notification.user_id: 1})
+        return notification
+
+    def count(self, user=None):
+        return UserProfile.objects.get(user=user or self.user).unread_notifications
+
+    def stale(self, notification):
+        """
+        Serve `notification` as loaded now to the next request, after it has changed underneath
+        """
+        stale = Notification.objects.get(pk=notification.pk)
+        return mock.patch.object(NotificationViewSet, 'get_object', return_value=stale)
+
+    def object_request(self, method, notification, data=None):
+        return getattr(self.client, method)('/api/notifications/', data, format='json',
+                                            HTTP_X_OBJECT_ID=str(notification.pk))
+
+    def test_mark_read_twice(self):
+        notification = self.notify()
+        self.notify()
+        for _ in range(2):
+            response = self.client.post('/api/notifications/mark_read/', HTTP_X_OBJECT_ID=str(notification.pk))
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.count(), 1)
+
+    def test_update_from_stale_instance(self):
+        notification = self.notify()
+        self.notify()
+        with self.stale(notification):
+            self.client.post('/api/notifications/mark_read/', HTTP_X_OBJECT_ID=str(notification.pk))
+            self.assertEqual(self.count(), 1)
+            response = self.object_request('patch', notification, {'read': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.count(), 1)
+
+        self.object_request('patch', notification, {'read': False})
+        self.assertEqual(self.count(), 2)
+        self.object_request('patch', notification, {'user': self.other.id})
+        self.assertEqual((self.count(), self.count(self.other)), (1, 1))
+
+    def test_destroy_from_stale_instance(self):
+        notification = self.notify()
+        self.notify()
+        with self.stale(notification):
+            self.client.post('/api/notifications/mark_read/', HTTP_X_OBJECT_ID=str(notification.pk))
+            response = self.object_request('delete', notification)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Notification.objects.filter(pk=notification.pk).exists())
+        self.assertEqual(self.count(), 1)
+
+        self.object_request('delete', Notification.objects.get())
+        self.assertEqual(self.count(), 0)
+
+    def test_retention_with_stale_rows(self):
+        expired = [self.notify(), self.notify()]
+        self.notify()
+        self.notify(user=self.other)
+        rows = list(Notification.objects.filter(pk__in=[n.pk for n in expired]).values('id', 'user_id', 'read'))
+        self.client.post('/api/notifications/mark_read/', HTTP_X_OBJECT_ID=str(expired[0].pk))
+        with transaction.atomic():
+            NotificationRetention('notifications', Notification, 'RETENTION_NOTIFICATION_DAYS', 180).before_delete(rows)
+        self.assertEqual((self.count(), self.count(self.other)), (1, 1))
+
+    def test_mark_all_read_and_delivery(self):
+        self.notify(read=True)
+        for _ in range(3):
+            enqueue_notification(sender=None, message='Hi', item_type='task', item_id='1', recipients=[self.user])
+        deliver_pending()
+        self.assertEqual(self.count(), 1)  # duplicates within the batch collapse
+        self.notify()
+        self.client.post('/api/notifications/mark_all_read/')
+        self.client.post('/api/notifications/mark_all_read/')
+        self.assertEqual(self.count(), 0)
+        self.assertEqual(self.client.get('/api/notifications/unread_count/').json(), {'count': 0})
+
+
+class NotificationOutboxTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = User.objects.create(username='alice', email='alice@localhost')
+        self.admin = User.objects.create(username='bob', email='bob@localhost')
+        self.member = User.objects.create(username='carol', email='carol@localhost')
+        self.workspace = Workspace.objects.create(name='Workspace', owner=self.owner)
+        for user, role in ((self.owner, 'owner'), (self.admin, 'admin'), (self.member, 'member')):
+            WorkspaceMember.objects.create(workspace=self.workspace, user=user, role=role)
+        NotificationEvent.objects.all().delete()
+        Notification.objects.all().delete()
+
+    def enqueue(self, **kwargs):
+        return enqueue_notification(sender=self.owner, message='Hi', item_type='workspace',
+                                    item_id=self.workspace.id, **kwargs)
+
+    def received(self):
+        return sorted(Notification.objects.values_list('user__username', flat=True))
+
+    def test_one_event_per_notification(self):
+        self.enqueue(workspace=self.workspace, exclude_user=self.owner)
+        self.enqueue(workspace=self.workspace, workspace_roles=['owner', 'admin'])
+        self.assertEqual(NotificationEvent.objects.count(), 2)
+        self.assertEqual(Notification.objects.count(), 0)  # worker mode: nothing until delivered
+        self.assertEqual(deliver_pending(), 2)
+        # Same user, type, item and message once per batch
+        self.assertEqual(self.received(), ['alice', 'bob', 'carol'])
+        self.assertFalse(NotificationEvent.objects.exists())
+        self.assertEqual(UserProfile.objects.get(user=self.member).unread_notifications, 1)
+
+    def test_explicit_recipients(self):
+        gone = User.objects.create(username='dave', email='dave@localhost')
+        self.enqueue(recipients=[self.member, gone.id])
+        gone.delete()
+        enqueue_notifications([
+            {'user': self.admin, 'sender': self.owner, 'message': 'Assigned', 'item_type': 'task', 'item_id': 1},
+            {'user': self.member, 'sender': self.owner, 'message': 'Assigned', 'item_type': 'task', 'item_id': 1},
+        ])
+        self.assertEqual(NotificationEvent.objects.count(), 2)
+        self.assertEqual(drain(), 2)
+        self.assertEqual(self.received(), ['bob', 'carol', 'carol'])
+
+    def test_batches(self):
+        for i in range(5):
+            enqueue_notification(sender=self.owner, message=str(i), item_type='task', item_id=i,
+                                 recipients=[self.member])
+        self.assertEqual(deliver_pending(batch_size=2), 2)
+        self.assertEqual(drain(batch_size=2), 3)
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_claimed_events_skipped_until_stale(self):
+        self.enqueue(recipients=[self.member])
+        NotificationEvent.objects.update(claimed_by='other', claimed_at=timezone.now())
+        self.assertEqual(deliver_pending(), 0)
+        with override_settings(NOTIFICATION_OUTBOX_CLAIM_TIMEOUT=60):
+            NotificationEvent.objects.update(claimed_at=timezone.now() - timedelta(seconds=61))
+            self.assertEqual(deliver_pending(), 1)
+        self.assertEqual(self.received(), ['carol'])
+
+    def test_failed_delivery_retried(self):
+        self.enqueue(recipients=[self.member])
+        with mock.patch('api.notifications.expand_events', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                deliver_pending(worker_id='first')
+        event = NotificationEvent.objects.get()
+        self.assertEqual(event.claimed_by, 'first')
+        self.assertEqual(Notification.objects.count(), 0)
+        self.assertEqual(deliver_pending(), 0)  # still claimed by the failed worker
+
+        with override_settings(NOTIFICATION_OUTBOX_CLAIM_TIMEOUT=0):
+            self.assertEqual(deliver_pending(worker_id='second'), 1)
+        self.assertEqual(self.received(), ['carol'])
+        self.assertFalse(NotificationEvent.objects.exists())
+
+    @override_settings(NOTIFICATION_OUTBOX_MODE='sync')
+    def test_sync_mode_delivers_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.enqueue(recipients=[self.member])
+            self.assertEqual(Notification.objects.count(), 0)
+        self.assertEqual(self.received(), ['carol'])
+
+
+class SprintStatsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        WorkspaceMember.objects.create(workspace=workspace, user=self.user, role='owner')
+        self.project = Project.objects.create(name='Project', workspace=workspace, created_by=self.user)
+        today = timezone.localdate()
+        self.sprint = Sprint.objects.create(name='Sprint', project=self.project, start_date=today - timedelta(days=2),
+                                            end_date=today + timedelta(days=5))
+        self.client = self.client_for(self.user)
+
+    def task(self, **fields):
+        return Task.objects.create(name='Task', project=self.project, sprint=self.sprint, **fields)
+
+    def stats(self):
+        response = self.client.get(f'/api/sprints/{self.sprint.id}/stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assertMatchesRecount(self):
+        counted = self.stats()
+        rebuild_sprint_stats([self.sprint.id])
+        self.assertEqual(counted, self.stats())
+
+    def test_counts(self):
+        self.task(status='done', assigned_to=self.user)
+        self.task(priority='high')
+        stats = self.stats()
+        self.assertEqual((stats['total'], stats['done'], stats['remaining']), (2, 1, 1))
+        self.assertEqual(stats['by_status'], {'backlog': 1, 'done': 1})
+        self.assertEqual(stats['by_priority'], {'medium': 1, 'high': 1})
+        self.assertEqual(stats['by_assignee'], {str(self.user.id): 1, 'unassigned': 1})
+
+    def test_concurrent_saves_from_stale_instances(self):
+        task = self.task()
+        first, second = Task.objects.get(pk=task.pk), Task.objects.get(pk=task.pk)
+        first.status = 'in_progress'
+        first.save()
+        second.status = 'done'
+        second.save()
+        self.assertEqual(self.stats()['by_status'], {'done': 1})
+        self.assertMatchesRecount()
+
+        stale = Task.objects.get(pk=task.pk)
+        moved = Task.objects.get(pk=task.pk)
+        moved.sprint = None
+        moved.save()
+        stale.delete()
+        self.assertEqual(self.stats()['total'], 0)
+        self.assertMatchesRecount()
+
+    def test_bulk_endpoints(self):
+        tasks = [self.task() for _ in range(3)]
+        response = self.client.patch('/api/tasks/bulk/', [
+            {'id': tasks[0].id, 'status': 'done'}, {'id': tasks[1].id, 'status': 'review'},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stats()['by_status'], {'backlog': 1, 'review': 1, 'done': 1})
+        response = self.client.delete('/api/tasks/bulk/', [tasks[0].id, tasks[2].id], format='json')
+        self.assertEqual(response.json(), {'deleted': 2})
+        self.assertEqual(self.stats()['by_status'], {'review': 1})
+        self.assertMatchesRecount()
+
+    def test_burndown(self):
+        today = timezone.localdate()
+        done = self.task(status='done')
+        self.task()
+        snapshot_burndown(today - timedelta(days=1))
+        done.status = 'review'
+        done.save()
+        response = self.client.get(f'/api/sprints/{self.sprint.id}/burndown/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'sprint': self.sprint.id, 'days': [
+            {'date': str(today - timedelta(days=1)), 'total': 2, 'done': 1, 'remaining': 1},
+            {'date': str(today), 'total': 2, 'done': 0, 'remaining': 2},
+        ]})
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        self.other = User.objects.create(username='bob', email='bob@localhost')
+        workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        WorkspaceMember.objects.create(workspace=workspace, user=self.user, role='owner')
+        foreign = Workspace.objects.create(name='Foreign', owner=self.other)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project = Project.objects.create(name='Payments', workspace=workspace, created_by=self.user)
+            self.title_hit = Task.objects.create(name='Refund webhook', project=self.project)
+            self.body_hit = Bug.objects.create(summary='Crash on save', description='webhooks retry forever',
+                                               project=self.project)
+            Task.objects.create(name='Unrelated', project=self.project)
+            Task.objects.create(name='Webhook elsewhere', project=Project.objects.create(
+                name='Foreign', workspace=foreign, created_by=self.other,
+            ))
+        self.client = self.client_for(self.user)
+
+    def search(self, **params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [(item['type'], item['id']) for item in response.json()]
+
+    def test_fts(self):
+        self.assertEqual(self.search(q='webhook'), [('task', self.title_hit.id), ('bug', self.body_hit.id)])
+        self.assertEqual(self.search(q='webhook', type='bug'), [('bug', self.body_hit.id)])
+        self.assertEqual(self.search(q='refund webhook'), [('task', self.title_hit.id)])
+        self.assertEqual(self.search(q='"); DROP'), [])
+
+    def test_fallback(self):
+        with mock.patch('api.search.connection', mock.Mock(vendor='mysql')):
+            self.assertEqual(sorted(self.search(q='webhook')), [('bug', self.body_hit.id), ('task', self.title_hit.id)])
+            self.assertEqual(self.search(q='webhook', project=self.project.id, type='task'),
+                             [('task', self.title_hit.id)])
+
+    def test_reindexed_on_write(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.title_hit.name = 'Refund callback'
+            self.title_hit.save()
+            self.body_hit.delete()
+        self.assertEqual(self.search(q='webhook'), [])
+        self.assertEqual(self.search(q='callback'), [('task', self.title_hit.id)])
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/api/search/', {'q': 'x', 'type': 'sprint'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'x', 'project': 'abc'}).status_code, 400)
+        self.assertEqual(self.search(q=''), [])
+
+    def test_migration_backfill(self):
+        backfill = import_module('api.migrations.0012_backfill_search_documents').backfill_documents
+        kept = SearchDocument.objects.get(item_type='task', item_id=self.title_hit.id)
+        SearchDocument.objects.exclude(pk=kept.pk).delete()  # objects from before search existed
+        backfill(django_apps, None)
+        self.assertEqual(SearchDocument.objects.count(), 6)
+        self.assertEqual(SearchDocument.objects.get(pk=kept.pk).updated_at, kept.updated_at)
+        self.assertEqual(self.search(q='webhook'), [('task', self.title_hit.id), ('bug', self.body_hit.id)])
+        self.assertEqual(self.search(q='payments'), [('project', self.project.id)])
+
+
+class MembershipCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        self.workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        self.member = WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='member')
+        self.client = self.client_for(self.user)
+
+    def get_projects(self):
+        return self.client.get('/api/projects/', HTTP_X_WORKSPACE_ID=str(self.workspace.id)).status_code
+
+    def test_removed_member_denied(self):
+        self.assertEqual(self.get_projects(), 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.delete()
+        self.assertEqual(self.get_projects(), 403)
+
+    def test_removed_in_other_process_denied_after_local_ttl(self):
+        self.assertEqual(self.get_projects(), 200)
+        # Deleted without the signal, as by a process that can't reach this
+        # one's per-process cache
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {WorkspaceMember._meta.db_table} WHERE id = %s', [self.member.id])
+        with self.later(membership_cache.local.ttl + 1):
+            self.assertEqual(self.get_projects(), 403)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        self.other = User.objects.create(username='bob', email='bob@localhost')
+        self.workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='owner')
+        self.project = Project.objects.create(name='Project', workspace=self.workspace, created_by=self.user)
+        self.client = self.client_for(self.user)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def write(self, change):
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+
+    def test_responses_cached(self):
+        self.assertEqual(self.get('/api/workspaces/')[0]['name'], 'Workspace')
+        # update() sends no signals, so nothing invalidates the entry
+        Workspace.objects.filter(pk=self.workspace.pk).update(name='Renamed')
+        self.assertEqual(self.get('/api/workspaces/')[0]['name'], 'Workspace')
+
+    def test_workspace_write_invalidates(self):
+        self.get('/api/workspaces/')
+        self.workspace.name = 'Renamed'
+        self.write(self.workspace.save)
+        self.assertEqual(self.get('/api/workspaces/')[0]['name'], 'Renamed')
+
+    def test_member_write_invalidates(self):
+        self.get('/api/workspaces/')
+        self.write(lambda: WorkspaceMember.objects.create(workspace=self.workspace, user=self.other))
+        self.other.first_name = 'Bob'
+        self.write(self.other.save)
+        members = self.get('/api/workspaces/')[0]['members']
+        self.assertIn('Bob', json.dumps(members))
+
+    def test_project_writes_invalidate(self):
+        self.assertEqual(len(self.get('/api/projects/')), 1)
+        self.write(lambda: Project.objects.create(name='Second', workspace=self.workspace, created_by=self.user))
+        self.assertEqual(len(self.get('/api/projects/')), 2)
+        self.project.name = 'Renamed'
+        self.write(self.project.save)
+        self.assertEqual(self.get(f'/api/projects/{self.project.pk}/')['name'], 'Renamed')
+        self.write(self.project.delete)
+        self.assertEqual(len(self.get('/api/projects/')), 1)
+
+
+class ActivityDetailsTests(APITestCase):
+    """
+    details is stored as JSON but still rendered as the JSON text (or '')
+    the API returned before 0007
+    """
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        self.other = User.objects.create(username='bob', email='bob@localhost')
+        self.workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='owner')
+        self.client = self.client_for(self.other)
+        self.mention = ActivityLog.objects.create(
+            user=self.user, workspace=self.workspace, action='mention', content_type='task', object_id=1,
+            details={'mentioned_user_id': self.other.id, 'task_name': 'caf\u00e9'}, mentioned_user=self.other,
+        )
+        self.empty = ActivityLog.objects.create(user=self.user, workspace=self.workspace, action='create',
+                                                content_type='bug', object_id=2)
+        self.text = ActivityLog.objects.create(user=self.user, workspace=self.workspace, action='update',
+                                               content_type='bug', object_id=2, details='free text')
+
+    def test_list_and_detail(self):
+        client = self.client_for(self.user)
+        response = client.get('/api/activities/', HTTP_X_WORKSPACE_ID=str(self.workspace.id))
+        details = {item['id']: item['details'] for item in response.json()}
+        expected = json.dumps({'mentioned_user_id': self.other.id, 'task_name': 'caf\u00e9'})
+        self.assertEqual(details, {self.mention.id: expected, self.empty.id: '', self.text.id: 'free text'})
+        response = client.get('/api/activities/', HTTP_X_OBJECT_ID=str(self.mention.id))
+        self.assertEqual(response.json()['details'], expected)
+        self.assertEqual(json.loads(response.json()['details'])['mentioned_user_id'], self.other.id)
+
+    def test_mentions(self):
+        [item] = self.client.get('/api/activities/mentions/').json()
+        self.assertEqual(item['id'], self.mention.id)
+        self.assertIsInstance(item['details'], str)
+        self.assertEqual(json.loads(item['details'])['task_name'], 'caf\u00e9')
+
+
+class ActivityDetailsMigrationTests(TransactionTestCase):
+    """
+    0007 moves the JSON text into a JSONField (and mentioned_user) and back
+    """
+    before = [('api', '0006_userprofile_unread_notifications')]
+    after = [('api', '0007_activitylog_json_details')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_forwards_and_backwards(self):
+        apps = self.migrate(self.before)
+        OldUser = apps.get_model('auth', 'User')
+        OldActivityLog = apps.get_model('api', 'ActivityLog')
+        user = OldUser.objects.create(username='alice')
+        rows = {
+            'mention': json.dumps({'mentioned_user_id': user.id, 'task_name': 'Task'}),
+            'gone': json.dumps({'mentioned_user_id': user.id + 1}),
+            'string id': json.dumps({'mentioned_user_id': str(user.id)}),
+            'empty': '',
+            'free text': 'not json',
+            'list': json.dumps([1, 2]),
+        }
+        ids = {
+            action: OldActivityLog.objects.create(user=user, action=action, content_type='task', object_id=1,
+                                                  details=details).id
+            for action, details in rows.items()
+        }
+
+        with mock.patch.object(import_module('api.migrations.0007_activitylog_json_details'), 'BATCH_SIZE', 4):
+            apps = self.migrate(self.after)
+            logs = {log.id: log for log in apps.get_model('api', 'ActivityLog').objects.all()}
+            self.assertEqual(logs[ids['mention']].details, {'mentioned_user_id': user.id, 'task_name': 'Task'})
+            self.assertEqual(logs[ids['mention']].mentioned_user_id, user.id)
+            self.assertIsNone(logs[ids['gone']].mentioned_user_id)
+            self.assertEqual(logs[ids['string id']].mentioned_user_id, user.id)
+            self.assertEqual(logs[ids['empty']].details, {})
+            self.assertEqual(logs[ids['free text']].details, 'not json')
+            self.assertEqual(logs[ids['list']].details, [1, 2])
+            self.assertEqual(len(logs), len(rows))
+
+            apps = self.migrate(self.before)
+            restored = dict(apps.get_model('api', 'ActivityLog').objects.values_list('id', 'details'))
+        self.assertEqual(restored, {ids[action]: details for action, details in rows.items()})
+
+
+class BookmarkFeedTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        self.client = self.client_for(self.user)
+
+    def log(self, content_type, object_id, count=1):
+        for _ in range(count):
+            ActivityLog.objects.create(user=self.user, action='update', content_type=content_type,
+                                       object_id=str(object_id))
+
+    def feed(self, **params):
+        response = self.client.get('/api/activities/bookmarks/', params)
+        self.assertEqual(response.status_code, 200)
+        return [(item['content_type'], item['object_id']) for item in response.json()]
+
+    def test_no_bookmarks(self):
+        self.log('task', 1)
+        self.assertEqual(self.feed(), [])
+
+    def test_only_bookmarked_objects_newest_first(self):
+        Bookmark.objects.create(user=self.user, item_type='task', item_id='1')
+        Bookmark.objects.create(user=self.user, item_type='bug', item_id='2')
+        self.log('task', 1)
+        self.log('task', 2)  # not bookmarked: only bug 2 is
+        self.log('bug', 2)
+        self.log('bug', 1)
+        ids = list(ActivityLog.objects.filter(
+            Q(content_type='task', object_id='1') | Q(content_type='bug', object_id='2')
+        ).order_by('-created_at', '-id').values_list('content_type', 'object_id'))
+        self.assertEqual(self.feed(), ids)
+
+    def test_limited(self):
+        for object_id in range(4):
+            Bookmark.objects.create(user=self.user, item_type='task', item_id=str(object_id))
+            self.log('task', object_id, count=20)
+        self.assertEqual(len(self.feed()), 50)
+        expected = list(ActivityLog.objects.order_by('-created_at', '-id').values_list('content_type', 'object_id')[:7])
+        # Across chunks of bookmarks too
+        with mock.patch.object(ActivityLogViewSet, 'BOOKMARK_CHUNK_SIZE', 1):
+            self.assertEqual(self.feed(limit=7), expected)
+        self.assertEqual(self.client.get('/api/activities/bookmarks/', {'limit': 0}).status_code, 400)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        self.client = self.client_for(self.user)
+        Notification.objects.bulk_create(
+            Notification(user=self.user, message=str(i), item_type='task', item_id=str(i)) for i in range(23)
+        )
+        # Ties on created_at, which only the id breaks
+        tied = Notification.objects.order_by('id').values_list('id', flat=True)[5:15]
+        Notification.objects.filter(id__in=list(tied)).update(created_at=Notification.objects.get(id=tied[0]).created_at)
+        self.expected = list(Notification.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def links(self, response):
+        return dict(
+            (rel, url) for url, rel in re.findall(r'<([^>]+)>; rel="(\w+)"', response.get('Link', ''))
+        )
+
+    def walk(self, url, rel):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([item['id'] for item in response.json()])
+            url = self.links(response).get(rel)
+        return pages
+
+    def test_walk_forward(self):
+        pages = self.walk('/api/notifications/?page_size=4', 'next')
+        self.assertEqual([len(page) for page in pages], [4, 4, 4, 4, 4, 3])
+        self.assertEqual(sum(pages, []), self.expected)
+
+    def test_walk_back(self):
+        last = self.walk('/api/notifications/?page_size=5', 'next')
+        response = self.client.get('/api/notifications/?page_size=5')
+        while 'next' in self.links(response):
+            response = self.client.get(self.links(response)['next'])
+        pages = self.walk(self.links(response)['prev'], 'prev')
+        self.assertEqual(sum(reversed(pages), []), self.expected[:-len(last[-1])])
+
+    def test_last_page(self):
+        response = self.client.get('/api/notifications/', {'page_size': len(self.expected)})
+        self.assertEqual([item['id'] for item in response.json()], self.expected)
+        self.assertNotIn('Link', response)
+
+    def test_bounded_by_default(self):
+        with mock.patch.object(KeysetCursorPagination, 'page_size', 10):
+            response = self.client.get('/api/notifications/')
+        self.assertEqual([item['id'] for item in response.json()], self.expected[:10])
+        self.assertIn('next', self.links(response))
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/notifications/', {'cursor': 'nope'}).status_code, 404)
+
+
+class KeySequenceMixin:
+    def setUp(self):
+        super().setUp()
+        KeySequence._blocks.clear()
+        self.addCleanup(KeySequence._blocks.clear)
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        self.project = Project.objects.create(name='Project', workspace=workspace, created_by=self.user)
+
+    def assertConsecutive(self, values):
+        self.assertEqual(values, list(range(values[0], values[0] + len(values))))
+
+    def task_numbers(self):
+        return [int(item_id) - Task.ITEM_ID_OFFSET for item_id in Task.objects.order_by('id').values_list('item_id', flat=True)]
+
+    def bug_numbers(self):
+        return [int(key.split('-')[1]) for key in Bug.objects.order_by('id').values_list('key', flat=True)]
+
+    def test_save_assigns_unique_consecutive_keys(self):
+        for i in range(5):
+            Task.objects.create(name=f'Task {i}', project=self.project, reporter=self.user)
+            Bug.objects.create(summary=f'Bug {i}', project=self.project)
+        self.assertConsecutive(self.task_numbers())
+        self.assertConsecutive(self.bug_numbers())
+        self.assertTrue(Bug.objects.filter(key__startswith='PRO-').exists())
+
+    def test_bulk_create_assigns_unique_consecutive_keys(self):
+        # Each bulk_create takes one consecutive range; values a block had
+        # cached before may be handed out later, never twice
+        Task.objects.create(name='First', project=self.project, reporter=self.user)
+        Task.objects.bulk_create([Task(name=f'Task {i}', project=self.project, reporter=self.user) for i in range(30)])
+        Task.objects.create(name='Last', project=self.project, reporter=self.user)
+        Bug.objects.bulk_create([Bug(summary=f'Bug {i}', project=self.project) for i in range(30)])
+        Bug.objects.create(summary='Last', project=self.project)
+        tasks, bugs = self.task_numbers(), self.bug_numbers()
+        self.assertEqual(len(set(tasks)), 32)
+        self.assertEqual(len(set(bugs)), 31)
+        self.assertConsecutive(tasks[1:31])
+        self.assertConsecutive(bugs[:30])
+
+
+class KeySequenceTests(KeySequenceMixin, APITestCase):
+    """
+    Inside a transaction: every reservation goes to the database
+    """
+
+
+@override_settings(KEY_SEQUENCE_BLOCK_SIZE=20)
+class KeySequenceBlockTests(KeySequenceMixin, TransactionTestCase):
+    """
+    Autocommit: values are handed out from cached blocks
+    """
+    def test_database_allocation_outside_process_lock(self):
+        allocate = KeySequence._allocate.__func__
+
+        def checked(cls, name, size):
+            self.assertFalse(KeySequence._lock.locked())
+            return allocate(cls, name, size)
+
+        with mock.patch.object(KeySequence, '_allocate', classmethod(checked)):
+            values = KeySequence.reserve('test', 3) + KeySequence.reserve('test', 30)
+        self.assertEqual(len(set(values)), 33)
+        # The rest of the first block is still handed out
+        self.assertEqual(KeySequence.reserve('test', 2), [4, 5])
+
+
+@override_settings(NOTIFICATION_OUTBOX_MODE='sync')
+class BulkWriteTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        self.other = User.objects.create(username='bob', email='bob@localhost')
+        self.workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='owner')
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.other, role='member')
+        self.project = Project.objects.create(name='Project', workspace=self.workspace, created_by=self.user)
+        foreign = Workspace.objects.create(name='Foreign', owner=self.other)
+        self.foreign_project = Project.objects.create(name='Foreign', workspace=foreign, created_by=self.other)
+        self.client = self.client_for(self.user)
+
+    def bulk(self, method, url, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, data, format='json')
+
+    def test_create_tasks(self):
+        items = [{'name': f'Task {i}', 'project': self.project.id} for i in range(3)]
+        response = self.bulk('post', '/api/tasks/bulk/', items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([item['name'] for item in response.data], ['Task 0', 'Task 1', 'Task 2'])
+        tasks = Task.objects.filter(project=self.project)
+        self.assertEqual(set(tasks.values_list('reporter', flat=True)), {self.user.id})
+        logs = ActivityLog.objects.filter(action='create', content_type='task')
+        self.assertEqual(sorted(logs.values_list('object_id', flat=True)), sorted(tasks.values_list('item_id', flat=True)))
+
+    def test_create_bugs_notifies_per_item(self):
+        items = [{'summary': f'Bug {i}', 'project': self.project.id, 'reporter': self.other.id} for i in range(2)]
+        response = self.bulk('post', '/api/bugs/bulk/', items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ActivityLog.objects.filter(action='create', content_type='bug').count(), 2)
+        notifications = Notification.objects.filter(user=self.user, notification_type='assignment')
+        self.assertEqual(sorted(notifications.values_list('item_id', flat=True)),
+                         sorted(str(item['id']) for item in response.data))
+
+    def test_create_in_foreign_workspace_denied(self):
+        items = [{'name': 'Mine', 'project': self.project.id}, {'name': 'Theirs', 'project': self.foreign_project.id}]
+        response = self.bulk('post', '/api/tasks/bulk/', items)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(ActivityLog.objects.exists())
+
+    def test_validation_errors_per_item(self):
+        items = [{'name': 'Fine', 'project': self.project.id}, {'project': self.project.id}, {'name': 'x', 'project': 0}]
+        response = self.bulk('post', '/api/tasks/bulk/', items)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('name', response.data[1])
+        self.assertIn('project', response.data[2])
+        self.assertFalse(Task.objects.exists())
+
+    def test_payload_shape_and_limit(self):
+        self.assertEqual(self.bulk('post', '/api/tasks/bulk/', {'name': 'x'}).status_code, 400)
+        self.assertEqual(self.bulk('post', '/api/tasks/bulk/', []).status_code, 400)
+        with override_settings(API_BULK_MAX_ITEMS=2):
+            items = [{'name': f'Task {i}', 'project': self.project.id} for i in range(3)]
+            self.assertEqual(self.bulk('post', '/api/tasks/bulk/', items).status_code, 400)
+
+    def test_update_logs_and_notifies_status_changes(self):
+        tasks = [Task.objects.create(name=f'Task {i}', project=self.project, reporter=self.user, assigned_to=self.other)
+                 for i in range(3)]
+        items = [{'id': tasks[0].id, 'status': 'done'}, {'id': tasks[1].id, 'name': 'Renamed'},
+                 {'id': tasks[2].id, 'status': 'review'}]
+        response = self.bulk('patch', '/api/tasks/bulk/', items)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Task.objects.get(pk=tasks[1].pk).name, 'Renamed')
+        logs = ActivityLog.objects.filter(action='status', content_type='task')
+        self.assertEqual(sorted(logs.values_list('object_id', flat=True)), sorted([tasks[0].item_id, tasks[2].item_id]))
+        self.assertEqual(Notification.objects.filter(user=self.other, notification_type='status_change').count(), 2)
+
+    def test_update_requires_ids_of_visible_objects(self):
+        task = Task.objects.create(name='Mine', project=self.project, reporter=self.user)
+        foreign = Task.objects.create(name='Theirs', project=self.foreign_project, reporter=self.other)
+        response = self.bulk('patch', '/api/tasks/bulk/', [{'id': task.id, 'name': 'x'}, {'name': 'no id'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('id', response.data[1])
+        response = self.bulk('patch', '/api/tasks/bulk/', [{'id': foreign.id, 'name': 'x'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Task.objects.get(pk=foreign.pk).name, 'Theirs')
+        # Moving a task into a foreign project
+        response = self.bulk('patch', '/api/tasks/bulk/', [{'id': task.id, 'project': self.foreign_project.id}])
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Task.objects.get(pk=task.pk).project_id, self.project.id)
+
+    def test_delete_only_visible_objects(self):
+        mine = [Task.objects.create(name=f'Mine {i}', project=self.project, reporter=self.user) for i in range(2)]
+        foreign = Task.objects.create(name='Theirs', project=self.foreign_project, reporter=self.other)
+        response = self.bulk('delete', '/api/tasks/bulk/', {'ids': [task.id for task in mine] + [foreign.id]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'deleted': 2})
+        self.assertEqual(list(Task.objects.values_list('id', flat=True)), [foreign.id])
+        logs = ActivityLog.objects.filter(action='delete', content_type='task')
+        self.assertEqual(sorted(logs.values_list('object_id', flat=True)), sorted(task.item_id for task in mine))
+
+
+class WriteBehindMixin:
+    """
+    Runs the writers' daemon threads against the test database, so rows must
+    be committed (TransactionTestCase) for the thread to see them. Waits on
+    the writer's counters rather than polling the table, which SQLite's
+    shared-cache test database would lock against the thread's writes
+    """
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail('Timed out waiting for the writer thread')
+            time.sleep(0.01)
+
+    def stop(self, writer):
+        # The thread can't be stopped; make it idle for the rest of the run
+        writer.interval = 3600
+        writer.wakeup.set()
+
+
+@override_settings(ACTIVITY_LOG_MODE='buffered')
+class ActivityLogWriterTests(WriteBehindMixin, TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+
+    def entries(self, count, action='update'):
+        return [build_activity_log(self.user, action, 'task', i, {'n': i}) for i in range(count)]
+
+    def test_flush_on_batch_size(self):
+        writer = ActivityLogWriter(batch_size=3, interval=3600)
+        self.addCleanup(self.stop, writer)
+        writer.add(self.entries(2))
+        time.sleep(0.1)
+        self.assertEqual(ActivityLog.objects.count(), 0)
+        writer.add(self.entries(1, action='create'))
+        self.wait_for(lambda: writer.stats()['written'] == 3)
+        self.assertEqual(ActivityLog.objects.count(), 3)
+        self.assertEqual(writer.stats(), {'buffered': 0, 'written': 3, 'failed': 0})
+
+    def test_flush_on_interval(self):
+        writer = ActivityLogWriter(batch_size=100, interval=0.2)
+        self.addCleanup(self.stop, writer)
+        started = time.monotonic()
+        writer.add(self.entries(2))
+        self.wait_for(lambda: writer.stats()['written'] == 2)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(sorted(ActivityLog.objects.values_list('details', flat=True), key=str), [{'n': 0}, {'n': 1}])
+
+    def test_flush_at_exit(self):
+        writer = ActivityLogWriter(batch_size=100, interval=3600)
+        self.addCleanup(self.stop, writer)
+        writer.add(self.entries(2))
+        self.assertEqual(writer.stats()['buffered'], 2)
+        with mock.patch('api.activity.activity_writer', writer):
+            import_module('api.activity')._flush_at_exit()
+        self.assertEqual(ActivityLog.objects.count(), 2)
+        self.assertEqual(writer.stats()['buffered'], 0)
+
+    def test_rolled_back_entries_dropped(self):
+        writer = ActivityLogWriter(batch_size=100, interval=3600)
+        self.addCleanup(self.stop, writer)
+        with transaction.atomic():
+            writer.add(self.entries(1))
+            transaction.set_rollback(True)
+        self.assertEqual(writer.stats()['buffered'], 0)
+
+
+@override_settings(LAST_ACTIVE_MODE='buffered')
+class LastActiveTrackerTests(WriteBehindMixin, TransactionTestCase):
+    def setUp(self):
+        self.users = [User.objects.create(username=f'user{i}', email=f'user{i}@localhost') for i in range(5)]
+        self.past = timezone.now() - timedelta(days=1)
+        UserProfile.objects.update(last_active=self.past)
+
+    def active(self):
+        return set(UserProfile.objects.filter(last_active__gt=self.past).values_list('user_id', flat=True))
+
+    def test_flush_on_interval(self):
+        tracker = LastActiveTracker(interval=0.2)
+        self.addCleanup(self.stop, tracker)
+        for user in self.users[:2]:
+            tracker.touch(user.pk)
+            tracker.touch(user.pk)
+        self.wait_for(lambda: tracker.stats()['flushes'] == 1)
+        self.assertEqual(self.active(), {user.pk for user in self.users[:2]})
+        stats = tracker.stats()
+        self.assertEqual((stats['pending'], stats['recorded'], stats['coalesced'], stats['written']), (0, 2, 2, 2))
+
+    def test_flush_in_batches(self):
+        tracker = LastActiveTracker(interval=3600)
+        self.addCleanup(self.stop, tracker)
+        UserProfile.objects.filter(user=self.users[0]).delete()
+        for user in self.users:
+            tracker.touch(user.pk)
+        with mock.patch('api.last_active.BATCH_SIZE', 2), CaptureQueriesContext(connection) as queries:
+            self.assertEqual(tracker.flush(), len(self.users))
+        self.assertEqual(self.active(), {user.pk for user in self.users})
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 3)
+
+    def test_flush_at_exit(self):
+        tracker = LastActiveTracker(interval=3600)
+        self.addCleanup(self.stop, tracker)
+        tracker.touch(self.users[0].pk)
+        self.assertEqual(self.active(), set())
+        with mock.patch('api.last_active.last_active_tracker', tracker):
+            import_module('api.last_active')._flush_at_exit()
+        self.assertEqual(self.active(), {self.users[0].pk})
+        self.assertEqual(tracker.stats()['pending'], 0)
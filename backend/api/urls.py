@@ -85,4 +85,8 @@ urlpatterns = [
     path('auth/request-otp/', views.request_otp, name='request_otp'),
     path('auth/verify-otp/', views.verify_otp, name='verify_otp'),
     path('notifications/', include(notification_patterns)),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('metrics/mail/', views.mail_queue_status, name='mail-queue-status'),
+    path('metrics/activity/', views.activity_log_status, name='activity-log-status'),
+    path('metrics/endpoints/', views.endpoint_profile, name='endpoint-profile'),
 ]
\ No newline at end of file
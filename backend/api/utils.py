@@ -1,30 +1,54 @@
-import json
-from .models import ActivityLog, Notification
+from .models import ActivityLog
+from .activity import activity_writer
+from .notifications import enqueue_notification, enqueue_notifications
+from .mail import send_email
 from django.utils import timezone
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
 from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-def log_activity(user, action, content_type, object_id, details=None, workspace=None, project=None):
+def build_activity_log(user, action, content_type, object_id, details=None, workspace=None, project=None):
     """
-    Utility function to log user activities
+    Build an unsaved ActivityLog entry. workspace and project may be given as
+    instances or as ids; details['mentioned_user_id'] also fills mentioned_user.
     """
-    log = ActivityLog.objects.create(
+    details = details or {}
+    return ActivityLog(
         user=user,
         action=action,
         content_type=content_type,
         object_id=str(object_id),
-        details=json.dumps(details) if details else '',
-        workspace=workspace,
-        project=project,
+        details=details,
+        mentioned_user_id=details.get('mentioned_user_id') if isinstance(details, dict) else None,
+        workspace_id=getattr(workspace, 'pk', workspace),
+        project_id=getattr(project, 'pk', project),
     )
+
+def log_activity(user, action, content_type, object_id, details=None, workspace=None, project=None):
+    """
+    Utility function to log user activities. The entry is written after the
+    current transaction commits, batched with others (see api.activity), so
+    the returned ActivityLog has no pk yet.
+    """
+    log = build_activity_log(user, action, content_type, object_id, details, workspace, project)
+    activity_writer.add([log])
     return log
 
+def log_activities(logs):
+    """
+    Queue several unsaved ActivityLog entries (see build_activity_log) for the
+    batched writer
+    """
+    logs = list(logs)
+    activity_writer.add(logs)
+    return logs
+
 def create_notification(user, sender, message, item_type, item_id, notification_type='system', url=None):
     """
-    Create a notification for a user
+    Queue a notification for a user. The Notification row is created by the
+    outbox dispatcher after the current transaction commits.
     
     Args:
         user: User to receive the notification
@@ -35,8 +59,8 @@ def create_notification(user, sender, message, item_type, item_id, notification_
         notification_type: Type of notification (invitation, assignment, etc.)
         url: Optional URL to redirect to when clicking the notification
     """
-    notification = Notification.objects.create(
-        user=user,
+    return enqueue_notification(
+        recipients=[user],
         sender=sender,
         message=message,
         notification_type=notification_type,
@@ -44,25 +68,35 @@ def create_notification(user, sender, message, item_type, item_id, notification_
         item_id=item_id,
         url=url
     )
-    return notification
+
+def create_notifications(notifications):
+    """
+    Queue several notifications with one INSERT into the outbox
+
+    Args:
+        notifications: Iterable of dicts with the create_notification arguments
+    """
+    return enqueue_notifications(notifications)
 
 def update_user_activity(user):
     """
-    Update the user's last active timestamp
+    Record that the user is active; UserProfile.last_active is written
+    behind in batches (see api.last_active)
     
     Args:
         user: User to update
+
+    Returns:
+        The activity timestamp
     """
-    from .models import UserProfile
-    profile, created = UserProfile.objects.get_or_create(user=user)
-    profile.last_active = timezone.now()
-    profile.save()
-    return profile
+    from .last_active import last_active_tracker
+    last_active_tracker.touch(user.pk)
+    return timezone.now()
 
 
 def send_otp_email(email, otp_code):
     """
-    Send OTP code to user's email
+    Queue the OTP code for delivery to the user's email (see api.mail)
     
     Args:
         email: Email address to send OTP to
@@ -74,8 +108,8 @@ def send_otp_email(email, otp_code):
         from_email = settings.DEFAULT_FROM_EMAIL
         recipient_list = [email]
         
-        send_mail(subject, message, from_email, recipient_list)
-        logger.info(f"OTP email sent to {email}")
+        send_email(EmailMessage(subject, message, from_email, recipient_list))
+        logger.info(f"OTP email queued for {email}")
         return True
     except Exception as e:
         logger.error(f"Failed to send OTP email to {email}: {str(e)}")
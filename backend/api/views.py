@@ -1,16 +1,19 @@
-from rest_framework import viewsets, status, permissions
+from rest_framework import viewsets, status, permissions, generics
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, F, Count, Window, Prefetch
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 import json
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import authenticate, login
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, PermissionDenied
 
 from .models import (
     Workspace, WorkspaceMember, Project, Sprint,
@@ -24,9 +27,45 @@ from .serializers import (
     NotificationSerializer, BookmarkSerializer, ActivityLogSerializer, 
     InvitationSerializer, OTPRequestSerializer, OTPVerifySerializer
 )
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from .mixins import HeaderIDMixin
-from .utils import log_activity, create_notification, update_user_activity, send_otp_email
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from .mixins import HeaderIDMixin, ConditionalGetMixin, CachedResponseMixin, BulkWriteMixin, FastListMixin
+from .membership import get_workspace_ids, is_workspace_member
+from .permissions import IsWorkspaceMember
+from .utils import (
+    log_activity, build_activity_log, log_activities, create_notification,
+    create_notifications, update_user_activity, send_otp_email
+)
+from backend import profiling
+from .activity import activity_writer
+from .mail import mail_queue
+from .pagination import RankedPagination
+from .search import SEARCHABLE, search_documents, schedule_reindex
+from .sprint_stats import get_sprint_stats, get_burndown, record_task_changes, deferred_stats
+from .authentication import token_expired
+from .fast_serializers import (
+    task_list_serializer, bug_list_serializer,
+    retrospective_list_serializer, activity_log_list_serializer
+)
+from .notifications import (
+    build_task_assignment, build_task_status_change,
+    build_bug_assignment, build_bug_status_change,
+    adjust_unread_counts, get_unread_count
+)
+
+
+def check_bulk_project_access(user, validated_data):
+    """
+    Make sure every project referenced by a bulk payload belongs to one of the
+    user's workspaces (checked with a single query).
+    """
+    project_ids = {attrs['project'].id for attrs in validated_data if attrs.get('project')}
+    if not project_ids:
+        return
+    allowed = set(
+        Project.objects.filter(id__in=project_ids, workspace_id__in=get_workspace_ids(user)).values_list('id', flat=True)
+    )
+    if project_ids - allowed:
+        raise PermissionDenied("You are not a member of the workspace for one or more projects.")
 
 class UserViewSet(HeaderIDMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
@@ -77,10 +116,13 @@ class UserProfileViewSet(HeaderIDMixin, viewsets.ModelViewSet):
     queryset = UserProfile.objects.all().select_related('user')
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
+    # Numeric lookups only, so the router doesn't read "my_profile" as a pk
+    lookup_value_regex = '[0-9]+'
     
     @action(detail=False, methods=['get'])
     def my_profile(self, request):
-        profile = update_user_activity(request.user)
+        profile, created = UserProfile.objects.select_related('user').get_or_create(user=request.user)
+        profile.last_active = max(profile.last_active, update_user_activity(request.user))
         serializer = self.get_serializer(profile)
         return Response(serializer.data)
 
@@ -96,13 +138,15 @@ class UserProfileViewSet(HeaderIDMixin, viewsets.ModelViewSet):
     #     return Response({"detail": "Object ID is required in X-Object-ID header"}, 
     #                    status=status.HTTP_400_BAD_REQUEST)
 
-class WorkspaceViewSet(HeaderIDMixin, viewsets.ModelViewSet):
+class WorkspaceViewSet(HeaderIDMixin, ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Workspace.objects.all()
     serializer_class = WorkspaceSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return Workspace.objects.filter(members=self.request.user).prefetch_related('members')
+        return Workspace.objects.filter(id__in=get_workspace_ids(self.request.user)).prefetch_related(
+            Prefetch('workspacemember_set', queryset=WorkspaceMember.objects.select_related('user'))
+        )
 
     
     def perform_create(self, serializer):
@@ -114,16 +158,16 @@ class WorkspaceViewSet(HeaderIDMixin, viewsets.ModelViewSet):
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class ProjectViewSet(HeaderIDMixin, viewsets.ModelViewSet):
+class ProjectViewSet(HeaderIDMixin, ConditionalGetMixin, CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsWorkspaceMember]
     
     def get_queryset(self):
         workspace_id = self.request.META.get('HTTP_X_WORKSPACE_ID') or self.request.query_params.get('workspace')
         
         # Base queryset scoped to the user
-        queryset = Project.objects.filter(workspace__members=self.request.user)
+        queryset = Project.objects.filter(workspace_id__in=get_workspace_ids(self.request.user))
         
         if workspace_id:
             queryset = queryset.filter(workspace_id=workspace_id)
@@ -133,16 +177,16 @@ class ProjectViewSet(HeaderIDMixin, viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
-class SprintViewSet(HeaderIDMixin, viewsets.ModelViewSet):
+class SprintViewSet(HeaderIDMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Sprint.objects.all()
     serializer_class = SprintSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsWorkspaceMember]
     
     def get_queryset(self):
         project_id = self.request.META.get('HTTP_X_PROJECT_ID') or self.request.query_params.get('project', None)
         active = self.request.query_params.get('active', None)
         
-        queryset = Sprint.objects.filter(project__workspace__members=self.request.user)
+        queryset = Sprint.objects.filter(project__workspace_id__in=get_workspace_ids(self.request.user))
         
         if project_id:
             queryset = queryset.filter(project_id=project_id)
@@ -171,13 +215,29 @@ class SprintViewSet(HeaderIDMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(sprint)
         return Response(serializer.data)
 
-class TaskViewSet(HeaderIDMixin, viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Task counts of the sprint by status, priority and assignee
+        """
+        return Response(get_sprint_stats(self.get_object()))
+
+    @action(detail=True, methods=['get'])
+    def burndown(self, request, pk=None):
+        """
+        Daily total/done/remaining task counts of the sprint
+        """
+        sprint = self.get_object()
+        return Response({'sprint': sprint.id, 'days': get_burndown(sprint)})
+
+class TaskViewSet(HeaderIDMixin, ConditionalGetMixin, BulkWriteMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
-    permission_classes = [IsAuthenticated]
+    fast_list_serializer = task_list_serializer
+    permission_classes = [IsAuthenticated, IsWorkspaceMember]
     
     def get_queryset(self):
-        queryset = Task.objects.filter(project__workspace__members=self.request.user)
+        queryset = Task.objects.filter(project__workspace_id__in=get_workspace_ids(self.request.user))
         
         project_id = self.request.META.get('HTTP_X_PROJECT_ID') or self.request.query_params.get('project', None)
         sprint_id = self.request.META.get('HTTP_X_SPRINT_ID') or self.request.query_params.get('sprint', None)
@@ -202,6 +262,52 @@ class TaskViewSet(HeaderIDMixin, viewsets.ModelViewSet):
         )
         return task
 
+    def perform_bulk_create(self, serializer):
+        check_bulk_project_access(self.request.user, serializer.validated_data)
+        tasks = serializer.save(reporter=self.request.user)
+        log_activities([
+            build_activity_log(
+                user=self.request.user, action='create', content_type='task', object_id=task.item_id,
+                workspace=task.project.workspace_id, project=task.project,
+                details={'task_name': task.name}
+            ) for task in tasks
+        ])
+        create_notifications(filter(None, map(build_task_assignment, tasks)))
+        schedule_reindex('task', [task.pk for task in tasks])
+        record_task_changes(tasks, created=True)
+
+    def perform_bulk_update(self, serializer):
+        check_bulk_project_access(self.request.user, serializer.validated_data)
+        old_statuses = {pk: task.status for pk, task in serializer.instance.items()}
+        tasks = serializer.save()
+        changed = [task for task in tasks if task.status != old_statuses[task.pk]]
+        log_activities([
+            build_activity_log(
+                user=self.request.user, action='status', content_type='task', object_id=task.item_id,
+                details={
+                    'task_name': task.name,
+                    'project_id': task.project_id,
+                    'old_status': old_statuses[task.pk],
+                    'new_status': task.status
+                }
+            ) for task in changed
+        ])
+        create_notifications(filter(None, map(build_task_status_change, changed)))
+        schedule_reindex('task', [task.pk for task in tasks])
+        record_task_changes(tasks)
+
+    def perform_bulk_destroy(self, queryset):
+        deleted = list(queryset.values_list('item_id', 'name', 'project_id', 'project__workspace_id'))
+        with deferred_stats():
+            queryset.delete()
+        log_activities([
+            build_activity_log(
+                user=self.request.user, action='delete', content_type='task', object_id=item_id,
+                workspace=workspace_id, project=project_id,
+                details={'task_name': name}
+            ) for item_id, name, project_id, workspace_id in deleted
+        ])
+        return len(deleted)
     
     @action(detail=True, methods=['post'])
     def assign(self, request, pk=None):
@@ -213,7 +319,7 @@ class TaskViewSet(HeaderIDMixin, viewsets.ModelViewSet):
         
         user = get_object_or_404(User, id=user_id)
         
-        if not user.workspaces.filter(id=task.project.workspace.id).exists():
+        if not is_workspace_member(user, task.project.workspace_id):
             return Response({"error": "User is not a member of this workspace"}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
@@ -264,13 +370,14 @@ class TaskViewSet(HeaderIDMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(task)
         return Response(serializer.data)
 
-class BugViewSet(HeaderIDMixin, viewsets.ModelViewSet):
+class BugViewSet(HeaderIDMixin, ConditionalGetMixin, BulkWriteMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Bug.objects.all()
     serializer_class = BugSerializer
-    permission_classes = [IsAuthenticated]
+    fast_list_serializer = bug_list_serializer
+    permission_classes = [IsAuthenticated, IsWorkspaceMember]
     
     def get_queryset(self):
-        queryset = Bug.objects.filter(project__workspace__members=self.request.user)
+        queryset = Bug.objects.filter(project__workspace_id__in=get_workspace_ids(self.request.user))
         
         project_id = self.request.META.get('HTTP_X_PROJECT_ID') or self.request.query_params.get('project', None)
         status_param = self.request.query_params.get('status', None)
@@ -281,7 +388,7 @@ class BugViewSet(HeaderIDMixin, viewsets.ModelViewSet):
         if status_param:
             queryset = queryset.filter(status=status_param)
             
-        return queryset
+        return queryset.select_related('project', 'assignee', 'reporter')
     
     def perform_create(self, serializer):
             bug = serializer.save(assignee=self.request.user)
@@ -300,6 +407,52 @@ class BugViewSet(HeaderIDMixin, viewsets.ModelViewSet):
             )
             
             return bug
+
+    def perform_bulk_create(self, serializer):
+        check_bulk_project_access(self.request.user, serializer.validated_data)
+        bugs = serializer.save(assignee=self.request.user)
+        log_activities([
+            build_activity_log(
+                user=self.request.user, action='create', content_type='bug', object_id=bug.key,
+                details={
+                    'bug_summary': bug.summary,
+                    'project_id': bug.project.id,
+                    'project_name': bug.project.name
+                }
+            ) for bug in bugs
+        ])
+        create_notifications(filter(None, map(build_bug_assignment, bugs)))
+        schedule_reindex('bug', [bug.pk for bug in bugs])
+
+    def perform_bulk_update(self, serializer):
+        check_bulk_project_access(self.request.user, serializer.validated_data)
+        old_statuses = {pk: bug.status for pk, bug in serializer.instance.items()}
+        bugs = serializer.save()
+        changed = [bug for bug in bugs if bug.status != old_statuses[bug.pk]]
+        log_activities([
+            build_activity_log(
+                user=self.request.user, action='status', content_type='bug', object_id=bug.key,
+                details={
+                    'bug_summary': bug.summary,
+                    'project_id': bug.project_id,
+                    'old_status': old_statuses[bug.pk],
+                    'new_status': bug.status
+                }
+            ) for bug in changed
+        ])
+        create_notifications(filter(None, map(build_bug_status_change, changed)))
+        schedule_reindex('bug', [bug.pk for bug in bugs])
+
+    def perform_bulk_destroy(self, queryset):
+        deleted = list(queryset.values_list('key', 'summary', 'project_id'))
+        queryset.delete()
+        log_activities([
+            build_activity_log(
+                user=self.request.user, action='delete', content_type='bug', object_id=key,
+                details={'bug_summary': summary, 'project_id': project_id}
+            ) for key, summary, project_id in deleted
+        ])
+        return len(deleted)
     
     @action(detail=True, methods=['post'])
     def assign(self, request, pk=None):
@@ -311,7 +464,7 @@ class BugViewSet(HeaderIDMixin, viewsets.ModelViewSet):
         
         user = get_object_or_404(User, id=user_id)
         
-        if not user.workspaces.filter(id=bug.project.workspace.id).exists():
+        if not is_workspace_member(user, bug.project.workspace_id):
             return Response({"error": "User is not a member of this workspace"}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
@@ -378,13 +531,14 @@ class BugViewSet(HeaderIDMixin, viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class RetrospectiveViewSet(HeaderIDMixin, viewsets.ModelViewSet):
+class RetrospectiveViewSet(HeaderIDMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Retrospective.objects.all()
     serializer_class = RetrospectiveSerializer
-    permission_classes = [IsAuthenticated]
+    fast_list_serializer = retrospective_list_serializer
+    permission_classes = [IsAuthenticated, IsWorkspaceMember]
     
     def get_queryset(self):
-        queryset = Retrospective.objects.filter(project__workspace__members=self.request.user)
+        queryset = Retrospective.objects.filter(project__workspace_id__in=get_workspace_ids(self.request.user))
         
         project_id = self.request.META.get('HTTP_X_PROJECT_ID') or self.request.query_params.get('project', None)
         type_param = self.request.query_params.get('type', None)
@@ -395,7 +549,9 @@ class RetrospectiveViewSet(HeaderIDMixin, viewsets.ModelViewSet):
         if type_param:
             queryset = queryset.filter(type=type_param)
             
-        return queryset.select_related('project', 'created_by', 'responsible').prefetch_related('voted_by')
+        return queryset.select_related('project', 'created_by', 'responsible').prefetch_related('voted_by').annotate(
+            vote_count=Count('voted_by', distinct=True)
+        )
     
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -417,6 +573,7 @@ class RetrospectiveViewSet(HeaderIDMixin, viewsets.ModelViewSet):
             project=retro.project,
             details={'feedback': retro.feedback}
         )
+        retro.vote_count = None  # annotated before the vote; count the refreshed voters instead
         serializer = self.get_serializer(retro)
         return Response(serializer.data)
 
@@ -426,7 +583,7 @@ class NotificationViewSet(HeaderIDMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        queryset = Notification.objects.filter(user=self.request.user).order_by('-created_at')
+        queryset = Notification.objects.filter(user=self.request.user).select_related('sender').order_by('-created_at')
         
         notification_type = self.request.query_params.get('type')
         if notification_type:
@@ -439,17 +596,47 @@ class NotificationViewSet(HeaderIDMixin, viewsets.ModelViewSet):
             
         return queryset
     
+    def perform_create(self, serializer):
+        notification = serializer.save()
+        if not notification.read:
+            adjust_unread_counts({notification.user_id: 1})
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            # Compare against the locked row, not serializer.instance: a
+            # concurrent mark_read may have flipped it since it was loaded
+            before = Notification.objects.select_for_update().values('user_id', 'read').get(
+                pk=serializer.instance.pk
+            )
+            notification = serializer.save()
+            deltas = {before['user_id']: -int(not before['read'])}
+            deltas[notification.user_id] = deltas.get(notification.user_id, 0) + int(not notification.read)
+            adjust_unread_counts(deltas)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # Only the request that deletes the row while it is unread decrements
+            unread = Notification.objects.filter(pk=instance.pk, read=False).delete()[1].get(
+                Notification._meta.label, 0
+            )
+            adjust_unread_counts({instance.user_id: -unread})
+            instance.delete()
+
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
-        Notification.objects.filter(user=request.user, read=False).update(read=True)
+        with transaction.atomic():
+            updated = Notification.objects.filter(user=request.user, read=False).update(read=True)
+            adjust_unread_counts({request.user.id: -updated})
         return Response({"status": "All notifications marked as read"})
     
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         try:
             notification = self.get_object()
-            notification.read = True
-            notification.save()
+            with transaction.atomic():
+                # Conditional update, so a repeated call can't decrement twice
+                updated = Notification.objects.filter(pk=notification.pk, read=False).update(read=True)
+                adjust_unread_counts({notification.user_id: -updated})
             return Response({"status": "Notification marked as read"})
         except NotFound:
             return Response({"error": "Notification ID is required. Please provide it in the X-Object-ID header."}, 
@@ -457,27 +644,48 @@ class NotificationViewSet(HeaderIDMixin, viewsets.ModelViewSet):
     
     @action(detail=False, methods=['delete'])
     def clear_all(self, request):
-        """Delete all read notifications for the current user"""
+        """Delete all read notifications for the current user (the unread count is unchanged)"""
         Notification.objects.filter(user=request.user, read=True).delete()
         return Response({"status": "All read notifications cleared"})
     
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Get the count of unread notifications"""
-        count = Notification.objects.filter(user=request.user, read=False).count()
-        return Response({"count": count})
+        return Response({"count": get_unread_count(request.user)})
     
     @action(detail=False, methods=['get'])
     def by_type(self, request):
-        """Get notifications grouped by type"""
-        notifications = Notification.objects.filter(user=request.user).order_by('-created_at')
-        
-        result = {}
-        for notification_type, _ in Notification.NOTIFICATION_TYPES:
-            type_notifications = notifications.filter(notification_type=notification_type)
-            serializer = self.get_serializer(type_notifications, many=True)
-            result[notification_type] = serializer.data
-            
+        """
+        Get the latest ?limit= notifications of each type (default 20) as
+        {type: [...]}, in one query: a window function numbers the rows within
+        each type, and only the first `limit` of each are fetched. With
+        ?counts=true the total per type is added under "counts".
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), settings.API_MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"error": "limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+        partition = [F('notification_type')]
+        notifications = self.get_queryset().annotate(
+            row_number=Window(RowNumber(), partition_by=partition, order_by=[F('created_at').desc(), F('id').desc()]),
+            type_count=Window(Count('id'), partition_by=partition),
+        ).filter(row_number__lte=limit).order_by('notification_type', 'row_number')
+
+        grouped = {notification_type: [] for notification_type, _ in Notification.NOTIFICATION_TYPES}
+        counts = dict.fromkeys(grouped, 0)
+        for notification in notifications:
+            grouped.setdefault(notification.notification_type, []).append(notification)
+            counts[notification.notification_type] = notification.type_count
+
+        result = {
+            notification_type: self.get_serializer(items, many=True).data
+            for notification_type, items in grouped.items()
+        }
+        if request.query_params.get('counts') == 'true':
+            result["counts"] = counts
         return Response(result)
 
 class BookmarkViewSet(HeaderIDMixin, viewsets.ModelViewSet):
@@ -499,10 +707,10 @@ class InvitationViewSet(HeaderIDMixin, viewsets.ModelViewSet):
     def get_queryset(self):
         user_email = self.request.user.email
         return Invitation.objects.filter(
-            Q(workspace__members=self.request.user) |  # User is a workspace member
-            Q(sender=self.request.user) |              # User is the sender
-            Q(email__iexact=user_email)                # User is the receiver
-        ).distinct()
+            Q(workspace_id__in=get_workspace_ids(self.request.user)) |  # User is a workspace member
+            Q(sender=self.request.user) |                                # User is the sender
+            Q(email__iexact=user_email)                                  # User is the receiver
+        ).select_related('sender')
     
     def perform_create(self, serializer):
         invitation = serializer.save(sender=self.request.user)
@@ -565,17 +773,20 @@ class InvitationViewSet(HeaderIDMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(invitation)
         return Response(serializer.data)
 
-class ActivityLogViewSet(HeaderIDMixin, viewsets.ReadOnlyModelViewSet):
+class ActivityLogViewSet(HeaderIDMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = ActivityLog.objects.all()
     serializer_class = ActivityLogSerializer
-    permission_classes = [IsAuthenticated]
+    fast_list_serializer = activity_log_list_serializer
+    permission_classes = [IsAuthenticated, IsWorkspaceMember]
+    # Numeric lookups, so the router doesn't read "mentions" as a primary key
+    lookup_value_regex = '[0-9]+'
     
     def get_queryset(self):
         workspace_id = self.request.META.get('HTTP_X_WORKSPACE_ID') or self.request.query_params.get('workspace', None)
         project_id = self.request.META.get('HTTP_X_PROJECT_ID') or self.request.query_params.get('project', None)
         
         queryset = ActivityLog.objects.filter(
-            workspace__members=self.request.user
+            workspace_id__in=get_workspace_ids(self.request.user)
         )
         if project_id:
             queryset = queryset.filter(project_id=project_id)
@@ -587,27 +798,86 @@ class ActivityLogViewSet(HeaderIDMixin, viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def mentions(self, request):
         queryset = ActivityLog.objects.filter(
-            action='mention',
-            details__contains=f'"mentioned_user_id": {request.user.id}'
-        ).order_by('-created_at')
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+            mentioned_user=request.user, action='mention'
+        ).select_related('user').order_by('-created_at')
+        return self.list_response(queryset)
     
+    # Bookmarked objects looked up per statement in the bookmarks feed
+    BOOKMARK_CHUNK_SIZE = 500
+
     @action(detail=False, methods=['get'])
     def bookmarks(self, request):
-        bookmarks = Bookmark.objects.filter(user=request.user)
-    
-        bookmark_conditions = Q()
-        for bookmark in bookmarks:
-            bookmark_conditions |= Q(content_type=bookmark.item_type, object_id=bookmark.item_id)
-        
-        if bookmark_conditions:
-            activities = ActivityLog.objects.filter(bookmark_conditions).order_by('-created_at')[:50]
-            serializer = self.get_serializer(activities, many=True)
-            return Response(serializer.data)
-        return Response([])
+        """
+        The latest ?limit= (default 50) activities on the user's bookmarked
+        objects. Driven from the user's bookmarks: each chunk of bookmarked
+        objects of one type is a range scan per object on the (content_type,
+        object_id, created_at) index, keeping its newest `limit` rows, and the
+        chunks are merged here.
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', 50)), settings.API_MAX_PAGE_SIZE)
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"error": "limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+        object_ids = {}
+        for item_type, item_id in Bookmark.objects.filter(user=request.user).values_list('item_type', 'item_id'):
+            object_ids.setdefault(item_type, []).append(item_id)
+
+        newest = []
+        for content_type, ids in object_ids.items():
+            for start in range(0, len(ids), self.BOOKMARK_CHUNK_SIZE):
+                newest += ActivityLog.objects.filter(
+                    content_type=content_type, object_id__in=ids[start:start + self.BOOKMARK_CHUNK_SIZE]
+                ).order_by('-created_at', '-id').values_list('created_at', 'id')[:limit]
+        selected = [activity_id for _, activity_id in sorted(newest, reverse=True)[:limit]]
+
+        queryset = ActivityLog.objects.filter(id__in=selected).select_related('user').order_by('-created_at', '-id')
+        return self.list_response(queryset, paginate=False)
     
+class SearchView(generics.GenericAPIView):
+    """
+    Full-text search over the tasks, bugs, projects and retrospectives of the
+    user's workspaces (see api.search), best match first:
+    ?q=<text>[&type=task&type=bug...][&project=<id>], scoped to a workspace
+    with X-Workspace-ID or ?workspace=.
+    """
+    permission_classes = [IsAuthenticated, IsWorkspaceMember]
+    pagination_class = RankedPagination
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response([])
+        item_types = request.query_params.getlist('type')
+        unknown = set(item_types) - set(SEARCHABLE)
+        if unknown:
+            return Response({"error": f"Unknown type(s): {', '.join(sorted(unknown))}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        project_id = getattr(request, 'project_id', None) or request.query_params.get('project')
+        if project_id and not str(project_id).isdigit():
+            return Response({"error": "Invalid project id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = search_documents(
+            request.user, text, item_types=item_types, project_id=project_id,
+            workspace_id=getattr(request, 'workspace_id', None) or request.query_params.get('workspace'),
+        )
+        page = self.paginate_queryset(results)
+        return self.get_paginated_response([
+            {
+                'type': row['item_type'],
+                'id': row['item_id'],
+                'title': row['title'],
+                'workspace': row['workspace_id'],
+                'project': row['project_id'],
+                'updated_at': row['updated_at'],
+                'rank': round(row['rank'], 4),
+            } for row in page
+        ])
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register_user(request):
@@ -630,6 +900,9 @@ class CustomAuthToken(ObtainAuthToken):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
         token, created = Token.objects.get_or_create(user=user)
+        if not created and token_expired(token.created):
+            token.delete()
+            token = Token.objects.create(user=user)
         return Response({
             'token': token.key,
             'user_id': user.pk,
@@ -707,4 +980,38 @@ def verify_otp(request):
                 {"error": "Invalid or expired OTP"}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def mail_queue_status(request):
+    """
+    Depth and delivery counters of the background mail queue
+    """
+    return Response(mail_queue.stats())
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def activity_log_status(request):
+    """
+    Buffered entries and write counters of the activity log writer
+    """
+    return Response(activity_writer.stats())
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def endpoint_profile(request):
+    """
+    Per-endpoint profiling histograms (PROFILING_ENABLED), merged across
+    processes. DELETE resets them.
+    """
+    if request.method == 'DELETE':
+        profiling.registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response({
+        'enabled': settings.PROFILING_ENABLED,
+        'endpoints': profiling.merged_snapshot(),
+    })
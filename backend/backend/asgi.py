@@ -11,17 +11,14 @@ django.setup()
 
 # Now import channels and chat routing
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-from chat.middleware import TokenAuthMiddleware
+from chat.middleware import TokenAuthMiddlewareStack
 from chat.routing import websocket_urlpatterns
 # Get ASGI application
 django_asgi_app = get_asgi_application()
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
-    "websocket": TokenAuthMiddleware(
-        AuthMiddlewareStack(
-            URLRouter(websocket_urlpatterns)
-        )
+    "websocket": TokenAuthMiddlewareStack(
+        URLRouter(websocket_urlpatterns)
     ),
 })
\ No newline at end of file
@@ -1,7 +1,16 @@
 # backend/middleware.py - Alternative simpler approach
 
+import random
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
 from django.utils.deprecation import MiddlewareMixin
 
+from .profiling import registry
+
 class CsrfExemptMiddleware(MiddlewareMixin):
     def process_request(self, request):
         if request.path.startswith('/api/'):
@@ -12,4 +21,99 @@ class HeaderIDMiddleware(MiddlewareMixin):
         request.object_id = request.META.get('HTTP_X_OBJECT_ID')
         request.workspace_id = request.META.get('HTTP_X_WORKSPACE_ID')
         request.project_id = request.META.get('HTTP_X_PROJECT_ID')
-        request.sprint_id = request.META.get('HTTP_X_SPRINT_ID')
\ No newline at end of file
+        request.sprint_id = request.META.get('HTTP_X_SPRINT_ID')
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper() hook counting queries, SQL time and
+    repeated statements for one request.
+    """
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.seen = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - started
+            self.count += 1
+            try:
+                self.seen[(sql, repr(params))] += 1
+            except Exception:
+                pass
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.seen.values())
+
+    def duplicate_example(self):
+        repeated = [(count, sql) for (sql, _), count in self.seen.items() if count > 1]
+        if not repeated:
+            return None
+        count, sql = max(repeated)
+        return f"{count}x {sql[:300]}"
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in (PROFILING_ENABLED) per-endpoint profiling: query count, SQL time,
+    duplicate queries, view time and response size are recorded per
+    resolved view name in backend.profiling.registry. See
+    GET /api/metrics/endpoints/ and `manage.py profile_report`.
+
+    View time runs from the view being called until the response is
+    rendered, minus the SQL time in between: it covers serializer.data
+    (including the queries it triggers lazily, which are subtracted) and
+    rendering, not just response.render().
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 1.0)
+
+    def __call__(self, request):
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        request._profiling_recorder = recorder
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        finished = time.perf_counter()
+        elapsed = finished - started
+
+        match = request.resolver_match
+        if match is None:
+            return response  # unresolved (404s, static files)
+
+        # DRF responses are rendered by the handler before they get here
+        view_time = None
+        view_started = getattr(request, '_profiling_view_started', None)
+        if view_started is not None:
+            view_start, sql_before = view_started
+            view_time = max(finished - view_start - (recorder.time - sql_before), 0.0)
+        size = None if response.streaming else len(response.content)
+        registry.record(
+            f"{request.method} {match.view_name}",
+            {
+                'time_ms': elapsed * 1000,
+                'sql_ms': recorder.time * 1000,
+                'queries': recorder.count,
+                'duplicates': recorder.duplicates,
+                'view_ms': None if view_time is None else view_time * 1000,
+                'size': size,
+            },
+            response.status_code,
+            recorder.duplicate_example(),
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        recorder = getattr(request, '_profiling_recorder', None)
+        if recorder is not None:
+            request._profiling_view_started = (time.perf_counter(), recorder.time)
@@ -0,0 +1,281 @@
+# backend/profiling.py
+"""
+In-process request profiling, collected by backend.middleware.ProfilingMiddleware
+when PROFILING_ENABLED is set.
+
+For every resolved view (e.g. "GET task-list") the registry keeps histograms
+of request time, SQL time, query count, duplicate queries, view time
+(serialization and rendering, without SQL) and response size. Histograms use
+fixed buckets, so snapshots from several processes can simply be added up:
+each process writes its snapshot to PROFILING_DIR at most every
+PROFILING_FLUSH_INTERVAL seconds, and merged_snapshot() combines them with
+the live local data.
+
+A reset writes a new generation to PROFILING_DIR/generation. Every process
+compares it with the generation its data belongs to before dumping (and
+before reporting), drops its data when they differ, and tags its dump with
+it; dumps of another generation are ignored, so a process that hadn't
+noticed the reset yet can't bring the old numbers back.
+"""
+import bisect
+import json
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+TIME_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+METRICS = {
+    'time_ms': TIME_BUCKETS_MS,
+    'sql_ms': TIME_BUCKETS_MS,
+    'queries': COUNT_BUCKETS,
+    'duplicates': COUNT_BUCKETS,
+    'view_ms': TIME_BUCKETS_MS,
+    'size': SIZE_BUCKETS,
+}
+
+
+class Histogram:
+    def __init__(self, bounds, counts=None, total=0.0, maximum=0.0):
+        self.bounds = bounds
+        self.counts = list(counts) if counts else [0] * (len(bounds) + 1)
+        self.total = total
+        self.max = maximum
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction):
+        """
+        Upper bound of the bucket holding the given fraction of samples
+        (the observed maximum for the overflow bucket)
+        """
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return 0
+
+    def summary(self):
+        count = self.count
+        return {
+            'mean': round(self.total / count, 2) if count else 0,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': round(self.max, 2),
+        }
+
+    def to_dict(self):
+        return {'counts': self.counts, 'total': self.total, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, bounds, data):
+        return cls(bounds, data['counts'], data['total'], data['max'])
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.histograms = {name: Histogram(bounds) for name, bounds in METRICS.items()}
+        self.duplicate_example = None
+
+    def add(self, sample, status_code, duplicate_example=None):
+        self.requests += 1
+        if status_code >= 500:
+            self.errors += 1
+        for name, value in sample.items():
+            if value is not None:
+                self.histograms[name].add(value)
+        if duplicate_example:
+            self.duplicate_example = duplicate_example
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.errors += other.errors
+        for name, histogram in self.histograms.items():
+            histogram.merge(other.histograms[name])
+        self.duplicate_example = self.duplicate_example or other.duplicate_example
+
+    def summary(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            **{name: histogram.summary() for name, histogram in self.histograms.items()},
+            'duplicate_example': self.duplicate_example,
+        }
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'histograms': {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+            'duplicate_example': self.duplicate_example,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.requests = data['requests']
+        stats.errors = data['errors']
+        stats.duplicate_example = data.get('duplicate_example')
+        for name, bounds in METRICS.items():
+            if name in data['histograms']:
+                stats.histograms[name] = Histogram.from_dict(bounds, data['histograms'][name])
+        return stats
+
+
+class ProfileRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.generation = None  # read on first use
+        self.last_flush = time.monotonic()
+
+    @property
+    def directory(self):
+        return Path(getattr(settings, 'PROFILING_DIR', Path(settings.BASE_DIR) / 'profiling'))
+
+    def dump_path(self):
+        return self.directory / f'{socket.gethostname()}-{os.getpid()}.json'
+
+    def generation_path(self):
+        return self.directory / 'generation'
+
+    def current_generation(self):
+        try:
+            return self.generation_path().read_text().strip()
+        except OSError:
+            return ''  # never reset
+
+    def check_generation(self):
+        """
+        Drop the local data if a reset happened since it was collected.
+        Returns the current generation.
+        """
+        generation = self.current_generation()
+        with self.lock:
+            if self.generation != generation:
+                self.endpoints.clear()
+                self.generation = generation
+        return generation
+
+    def record(self, endpoint, sample, status_code, duplicate_example=None):
+        if self.generation is None:
+            self.check_generation()
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.add(sample, status_code, duplicate_example)
+            due = time.monotonic() - self.last_flush >= getattr(settings, 'PROFILING_FLUSH_INTERVAL', 30)
+            if due:
+                self.last_flush = time.monotonic()
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Write this process's snapshot to PROFILING_DIR
+        """
+        generation = self.check_generation()
+        with self.lock:
+            data = {
+                'generation': generation,
+                'endpoints': {endpoint: stats.to_dict() for endpoint, stats in self.endpoints.items()},
+            }
+        path = self.dump_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(data))
+        os.replace(temporary, path)
+
+    def reset(self):
+        """
+        Forget the local data and every process's dump; other processes
+        drop theirs when they see the new generation
+        """
+        generation = str(time.time_ns())
+        path = self.generation_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(generation)
+        os.replace(temporary, path)
+        with self.lock:
+            self.endpoints.clear()
+            self.generation = generation
+        for path in self.directory.glob('*.json'):
+            path.unlink(missing_ok=True)
+
+    def local_stats(self):
+        with self.lock:
+            return {endpoint: EndpointStats.from_dict(stats.to_dict()) for endpoint, stats in self.endpoints.items()}
+
+
+registry = ProfileRegistry()
+
+
+def load_dumps(directory, exclude=None, generation=None):
+    """
+    Return [{endpoint: EndpointStats}] for every dump file in directory,
+    skipping those of another generation when one is given
+    """
+    dumps = []
+    for path in sorted(Path(directory).glob('*.json')):
+        if exclude is not None and path == exclude:
+            continue
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # being replaced or truncated; it'll be there next time
+        if generation is not None and data.get('generation') != generation:
+            continue  # written before a reset
+        dumps.append({endpoint: EndpointStats.from_dict(stats) for endpoint, stats in data['endpoints'].items()})
+    return dumps
+
+
+def merged_snapshot():
+    """
+    Summaries per endpoint across this process (live) and the dumps of all
+    others, busiest first
+    """
+    generation = registry.check_generation()
+    merged = registry.local_stats()
+    for dump in load_dumps(registry.directory, exclude=registry.dump_path(), generation=generation):
+        for endpoint, stats in dump.items():
+            if endpoint in merged:
+                merged[endpoint].merge(stats)
+            else:
+                merged[endpoint] = stats
+    return summarize(merged)
+
+
+def summarize(stats_by_endpoint):
+    return {
+        endpoint: stats.summary()
+        for endpoint, stats in sorted(
+            stats_by_endpoint.items(),
+            key=lambda item: item[1].histograms['time_ms'].total,
+            reverse=True,
+        )
+    }
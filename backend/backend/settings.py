@@ -55,6 +55,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'backend.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -67,6 +68,13 @@ MIDDLEWARE = [
     'backend.middleware.HeaderIDMiddleware',
 ]
 
+# Per-endpoint profiling (backend.middleware.ProfilingMiddleware); off unless
+# PROFILING_ENABLED=True. Each process dumps its stats to PROFILING_DIR.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 1.0))
+PROFILING_DIR = os.environ.get('PROFILING_DIR', str(BASE_DIR / 'profiling'))
+PROFILING_FLUSH_INTERVAL = float(os.environ.get('PROFILING_FLUSH_INTERVAL', 30))
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -88,11 +96,43 @@ TEMPLATES = [
 WSGI_APPLICATION = 'backend.wsgi.application'
 ASGI_APPLICATION = 'backend.asgi.application'
 
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
-    },
-}
+# Channel layer: 'memory' only reaches sockets in the same process; use 'unix'
+# (manage.py channelhub, single host) or 'redis' (needs channels_redis) to run
+# several ASGI workers.
+CHANNEL_LAYER_BACKEND = os.environ.get('CHANNEL_LAYER_BACKEND', 'memory')
+
+if CHANNEL_LAYER_BACKEND == 'redis':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [os.environ.get('CHANNEL_REDIS_URL', 'redis://127.0.0.1:6379/0')],
+            },
+        },
+    }
+elif CHANNEL_LAYER_BACKEND == 'unix':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'chat.layers.UnixSocketChannelLayer',
+            'CONFIG': {
+                'path': os.environ.get('CHANNEL_HUB_SOCKET', str(BASE_DIR / 'channelhub.sock')),
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer'
+        },
+    }
+
+# Chat: coalesce message INSERTs from concurrent senders into one bulk_create,
+# waiting at most this many seconds (0 = save each message immediately)
+CHAT_MESSAGE_BATCH_DELAY = float(os.environ.get('CHAT_MESSAGE_BATCH_DELAY', 0))
+CHAT_MESSAGE_BATCH_SIZE = int(os.environ.get('CHAT_MESSAGE_BATCH_SIZE', 100))
+
+# Upper bound for ?limit= on the chat history endpoint
+CHAT_HISTORY_MAX_LIMIT = int(os.environ.get('CHAT_HISTORY_MAX_LIMIT', 200))
 
 
 # Database
@@ -110,6 +150,47 @@ DATABASES = {
 }
 
 
+# Cache
+# Defaults to a per-process memory cache; point CACHE_BACKEND/CACHE_LOCATION at a
+# shared backend (e.g. django.core.cache.backends.redis.RedisCache) in production.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Per-user workspace membership cache (api.membership); with the default
+# per-process LocMemCache, entries live at most MEMBERSHIP_CACHE_LOCAL_TTL
+MEMBERSHIP_CACHE_SIZE = int(os.environ.get('MEMBERSHIP_CACHE_SIZE', 4096))
+MEMBERSHIP_CACHE_LOCAL_TTL = float(os.environ.get('MEMBERSHIP_CACHE_LOCAL_TTL', 5.0))
+MEMBERSHIP_CACHE_TTL = int(os.environ.get('MEMBERSHIP_CACHE_TTL', 300))
+
+# Versioned cache of workspace/project GET responses (api.response_cache);
+# RESPONSE_CACHE_ALIAS picks the CACHES entry used as the shared tier. Off by
+# default unless that entry is shared across processes: with a per-process
+# backend the other workers never see the version bumps of a write.
+RESPONSE_CACHE_ALIAS = os.environ.get('RESPONSE_CACHE_ALIAS', 'default')
+RESPONSE_CACHE_ENABLED = os.environ.get(
+    'RESPONSE_CACHE_ENABLED',
+    str(CACHES[RESPONSE_CACHE_ALIAS]['BACKEND'] not in (
+        'django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache',
+    )),
+) == 'True'
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 2048))
+RESPONSE_CACHE_LOCAL_TTL = float(os.environ.get('RESPONSE_CACHE_LOCAL_TTL', 60.0))
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 600))
+
+# Token -> user cache for REST and websocket auth (api.authentication);
+# a revoked token keeps working in other processes for up to
+# TOKEN_CACHE_LOCAL_TTL seconds. Tokens older than TOKEN_EXPIRY_DAYS are
+# rejected (0 = never expire)
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 4096))
+TOKEN_CACHE_LOCAL_TTL = float(os.environ.get('TOKEN_CACHE_LOCAL_TTL', 5.0))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 60))
+TOKEN_EXPIRY_DAYS = int(os.environ.get('TOKEN_EXPIRY_DAYS', 0))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -154,15 +235,16 @@ STATIC_ROOT = BASE_DIR / 'staticfiles' #so that whitenoise could fetch the stati
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         # 'rest_framework_simplejwt.authentication.JWTAuthentication', # Remove or comment out JWT
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    # 'PAGE_SIZE': 10,
+    # Keyset pages of PAGE_SIZE rows unless the client asks for ?page_size=
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 100)),
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.FormParser',
@@ -174,6 +256,51 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Upper bound for the ?page_size= query parameter on paginated list endpoints
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+
+# Largest array accepted by the /bulk/ endpoints
+API_BULK_MAX_ITEMS = int(os.environ.get('API_BULK_MAX_ITEMS', 5000))
+
+# Serve task/bug/retrospective/activity lists from values() projections
+# (api.fast_serializers); nested user summaries are cached per process
+API_FAST_LIST_SERIALIZERS = os.environ.get('API_FAST_LIST_SERIALIZERS', 'True') == 'True'
+USER_SUMMARY_CACHE_TTL = float(os.environ.get('USER_SUMMARY_CACHE_TTL', 60.0))
+
+# ETag/Last-Modified and 304 responses on workspace, project, sprint, task
+# and bug GETs (api.mixins.ConditionalGetMixin)
+API_CONDITIONAL_GET = os.environ.get('API_CONDITIONAL_GET', 'True') == 'True'
+
+# Task.item_id / Bug.key values reserved per round trip to the KeySequence table
+KEY_SEQUENCE_BLOCK_SIZE = int(os.environ.get('KEY_SEQUENCE_BLOCK_SIZE', 20))
+
+# Notification outbox delivery: 'thread' (in-process background thread),
+# 'worker' (manage.py process_notifications only) or 'sync' (on commit, inline)
+NOTIFICATION_OUTBOX_MODE = os.environ.get('NOTIFICATION_OUTBOX_MODE', 'thread')
+NOTIFICATION_OUTBOX_BATCH_SIZE = int(os.environ.get('NOTIFICATION_OUTBOX_BATCH_SIZE', 500))
+NOTIFICATION_OUTBOX_POLL_INTERVAL = float(os.environ.get('NOTIFICATION_OUTBOX_POLL_INTERVAL', 2.0))
+NOTIFICATION_OUTBOX_CLAIM_TIMEOUT = int(os.environ.get('NOTIFICATION_OUTBOX_CLAIM_TIMEOUT', 300))
+
+# ActivityLog entries are buffered per process and bulk-inserted by a
+# background thread (api.activity); 'sync' inserts them on commit instead
+ACTIVITY_LOG_MODE = os.environ.get('ACTIVITY_LOG_MODE', 'buffered')
+ACTIVITY_LOG_BATCH_SIZE = int(os.environ.get('ACTIVITY_LOG_BATCH_SIZE', 200))
+ACTIVITY_LOG_FLUSH_INTERVAL = float(os.environ.get('ACTIVITY_LOG_FLUSH_INTERVAL', 1.0))
+
+# UserProfile.last_active is written behind (api.last_active): at most once per
+# user per LAST_ACTIVE_GRANULARITY seconds, batched every LAST_ACTIVE_FLUSH_INTERVAL;
+# 'sync' writes in the calling thread
+LAST_ACTIVE_MODE = os.environ.get('LAST_ACTIVE_MODE', 'buffered')
+LAST_ACTIVE_GRANULARITY = float(os.environ.get('LAST_ACTIVE_GRANULARITY', 60.0))
+LAST_ACTIVE_FLUSH_INTERVAL = float(os.environ.get('LAST_ACTIVE_FLUSH_INTERVAL', 10.0))
+
+# Retention (api.retention, manage.py archive_old_rows): rows older than these
+# horizons are archived to compressed JSONL segments and deleted
+RETENTION_ACTIVITY_LOG_DAYS = int(os.environ.get('RETENTION_ACTIVITY_LOG_DAYS', 365))
+RETENTION_NOTIFICATION_DAYS = int(os.environ.get('RETENTION_NOTIFICATION_DAYS', 180))
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', 5000))
+RETENTION_ARCHIVE_DIR = os.environ.get('RETENTION_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+
 # Remove or comment out SIMPLE_JWT settings if no longer needed
 # SIMPLE_JWT = {
 #     'ACCESS_TOKEN_LIFETIME': timedelta(days=int(os.environ.get('ACCESS_TOKEN_LIFETIME_DAYS', 1))),
@@ -209,6 +336,9 @@ CORS_ALLOW_HEADERS = [
     'x-sprint-id',
 ]
 
+# Pagination cursors are returned in the Link header
+CORS_EXPOSE_HEADERS = ['link']
+
 
 # Email settings
 # EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For development
@@ -220,4 +350,10 @@ EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
 EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
+# Outgoing mail is sent by a background thread over one reused connection
+EMAIL_QUEUE_ENABLED = os.environ.get('EMAIL_QUEUE_ENABLED', 'True') == 'True'
+EMAIL_QUEUE_BATCH_SIZE = int(os.environ.get('EMAIL_QUEUE_BATCH_SIZE', 50))
+EMAIL_QUEUE_MAX_RETRIES = int(os.environ.get('EMAIL_QUEUE_MAX_RETRIES', 5))
+EMAIL_QUEUE_RETRY_DELAY = float(os.environ.get('EMAIL_QUEUE_RETRY_DELAY', 2.0))
+EMAIL_QUEUE_IDLE_TIMEOUT = float(os.environ.get('EMAIL_QUEUE_IDLE_TIMEOUT', 30.0))
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage' #   enableing whitenoise for compression and caching
\ No newline at end of file
@@ -1,10 +1,14 @@
 #chat/consumers.py
+import asyncio
 import json
+import weakref
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
 from .models import ChatRoom, ChatMessage
-from api.models import Workspace
+from api.membership import is_workspace_member
+from api.notifications import get_unread_count, unread_group_name
 from .serializers import ChatMessageSerializer
 import logging
 
@@ -15,44 +19,131 @@ logger = logging.getLogger(__name__)
 @database_sync_to_async
 def check_workspace_access(user, workspace_id):
     """
-    Asynchronously checks if a user is a member of the given workspace.
+    Asynchronously checks if a user is a member of the given workspace,
+    using the cached membership map (no query on a warm cache).
     """
     if not user or not user.is_authenticated:
         return False
-    try:
-        # Verify the user is in the workspace's members list.
-        return Workspace.objects.get(id=workspace_id).members.filter(id=user.id).exists()
-    except Workspace.DoesNotExist:
-        logger.warn(f"User {user.id} tried to join non-existent workspace {workspace_id}")
-        return False
+    return is_workspace_member(user, workspace_id)
 
 @database_sync_to_async
-def save_chat_message(workspace_id, user, content):
+def get_chat_room_id(workspace_id):
     """
-    Asynchronously finds the correct chat room and saves a new message to the database.
+    Asynchronously finds (or creates) the chat room linked to the workspace.
+    """
+    chat_room, created = ChatRoom.objects.get_or_create(workspace_id=workspace_id)
+    return chat_room.id
+
+@database_sync_to_async
+def save_chat_message(message):
+    """
+    Asynchronously saves a new (unsaved) ChatMessage to the database.
     """
     try:
-        # Get or create the chat room linked to the workspace.
-        chat_room, created = ChatRoom.objects.get_or_create(workspace_id=workspace_id)
-        
-        message = ChatMessage.objects.create(
-            room=chat_room,
-            sender=user,
-            content=content
-        )
+        message.save()
         return message
     except Exception as e:
-        logger.error(f"Failed to save chat message for workspace {workspace_id}: {e}")
+        logger.error(f"Failed to save chat message for room {message.room_id}: {e}")
         return None
 
-@database_sync_to_async
 def serialize_message(message):
     """
-    Asynchronously serializes a ChatMessage instance.
-    This must be async because the serializer accesses related models (like sender.username).
+    Serializes a saved ChatMessage. The sender is already set on the
+    instance, so this touches no database and needs no thread hop.
+    """
+    return ChatMessageSerializer(message).data
+
+@database_sync_to_async
+def get_unread_notification_count(user):
+    """
+    Asynchronously reads the user's maintained unread notification counter.
+    """
+    return get_unread_count(user)
+
+# --- Write coalescing ---
+
+class MessageBatcher:
+    """
+    Coalesces ChatMessage inserts from every consumer on one event loop into
+    a single bulk_create. A batch is written at most `delay` seconds after its
+    first message arrives, or as soon as `max_size` messages are pending.
+    """
+    def __init__(self, delay, max_size):
+        self.delay = delay
+        self.max_size = max_size
+        self.pending = []
+        self.timer = None
+        self.writes = set()  # running write tasks, so they aren't collected early
+
+    async def save(self, message):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((message, future))
+        if len(self.pending) >= self.max_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.delay, self.flush)
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self.write(batch))
+            self.writes.add(task)
+            task.add_done_callback(lambda task: self.write_done(task, batch))
+
+    def write_done(self, task, batch):
+        self.writes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Chat message batch writer failed", exc_info=task.exception())
+        # Don't leave senders waiting on a write that never finished
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    async def write(self, batch):
+        messages = [message for message, future in batch]
+        try:
+            await database_sync_to_async(ChatMessage.objects.bulk_create)(messages)
+        except Exception as e:
+            logger.error(f"Failed to save a batch of {len(messages)} chat messages: {e}")
+            messages = [None] * len(batch)
+        for (_, future), message in zip(batch, messages):
+            if not future.done():
+                future.set_result(message)
+
+_batchers = weakref.WeakKeyDictionary()
+
+def get_batch_delay():
+    """
+    CHAT_MESSAGE_BATCH_DELAY in seconds; 0 (the default) disables batching
     """
-    serializer = ChatMessageSerializer(message)
-    return serializer.data
+    return getattr(settings, 'CHAT_MESSAGE_BATCH_DELAY', 0)
+
+def get_message_batcher():
+    """
+    Returns the MessageBatcher for the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = _batchers[loop] = MessageBatcher(
+            get_batch_delay(),
+            getattr(settings, 'CHAT_MESSAGE_BATCH_SIZE', 100),
+        )
+    return batcher
+
+async def store_message(message):
+    """
+    Saves a message, coalescing the INSERT with other consumers' when
+    CHAT_MESSAGE_BATCH_DELAY is set.
+    """
+    if get_batch_delay() > 0:
+        return await get_message_batcher().save(message)
+    return await save_chat_message(message)
 
 # --- Chat Consumer ---
 
@@ -76,6 +167,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close(code=4003)  # 4003 = Custom code for "Forbidden"
             return
 
+        # Resolve the room once; every message on this connection reuses it.
+        self.room_id = await get_chat_room_id(self.workspace_id)
+
         # User is authenticated and authorized. Accept the connection.
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -107,14 +201,16 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 return
 
             # 1. Save the new message to the database
-            new_message = await save_chat_message(self.workspace_id, self.user, message_content)
+            new_message = await store_message(
+                ChatMessage(room_id=self.room_id, sender=self.user, content=message_content)
+            )
             
             if not new_message:
                 logger.error("Message was not saved, so not broadcasting.")
                 return 
 
             # 2. Serialize the saved message object (this has the real ID, timestamp, etc.)
-            serialized_message_data = await serialize_message(new_message)
+            serialized_message_data = serialize_message(new_message)
 
             # 3. Broadcast the REAL message data to the entire room group
             await self.channel_layer.group_send(
@@ -137,3 +233,41 @@ class ChatConsumer(AsyncWebsocketConsumer):
         
         # Send the message data (as a JSON string) down to the client.
         await self.send(text_data=json.dumps(message_data))
+
+
+# --- Notification Consumer ---
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    Pushes the user's unread notification count, so clients don't have to
+    poll: the current count on connect, then every change as
+    {"type": "unread_count", "delta": <change>, "count": <new count>}.
+    """
+    async def connect(self):
+        self.user = self.scope.get('user')
+
+        if not self.user or not self.user.is_authenticated:
+            logger.warn("Anonymous user rejected from ws/notifications")
+            await self.close(code=4001)  # 4001 = Custom code for "Unauthenticated"
+            return
+
+        self.group_name = unread_group_name(self.user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+        count = await get_unread_notification_count(self.user)
+        await self.send(text_data=json.dumps({'type': 'unread_count', 'delta': 0, 'count': count}))
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def unread_count(self, event):
+        """
+        Called by api.notifications.push_unread_counts via group_send.
+        """
+        await self.send(text_data=json.dumps({
+            'type': 'unread_count',
+            'delta': event['delta'],
+            'count': event['count'],
+        }))
@@ -0,0 +1,125 @@
+# chat/hub.py
+"""
+Relay process behind chat.layers.UnixSocketChannelLayer.
+
+It holds group membership for every connected worker process and forwards
+each send/group_send frame once per destination process. Run it with
+`manage.py channelhub` next to the ASGI workers.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+
+from .layers import encode_frame, read_frame
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelHub:
+    # Stop writing to a worker that has this many bytes unread; it is stuck
+    max_buffer = 16 * 1024 * 1024
+
+    def __init__(self, path, group_expiry=86400):
+        self.path = str(path)
+        self.group_expiry = group_expiry
+        self.clients = {}                 # prefix -> StreamWriter
+        self.groups = defaultdict(dict)   # group -> {channel: expires_at}
+        self.listeners = {}               # named channel -> prefix
+
+    async def serve(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self.handle, path=self.path)
+        logger.info(f"Channel hub listening on {self.path}")
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        prefix = None
+        try:
+            hello = await read_frame(reader)
+            prefix = hello['prefix']
+            self.clients[prefix] = writer
+            while True:
+                frame = await read_frame(reader)
+                handler = getattr(self, f"op_{frame.get('op')}", None)
+                if handler is None:
+                    logger.warning(f"Unknown hub operation from {prefix}: {frame.get('op')}")
+                    continue
+                handler(prefix, frame)
+        except (asyncio.IncompleteReadError, ConnectionError, KeyError, ValueError):
+            pass
+        finally:
+            # A worker that reconnected has already taken the prefix over
+            if prefix is not None and self.clients.get(prefix) is writer:
+                self.drop_client(prefix)
+            writer.close()
+
+    def drop_client(self, prefix):
+        self.clients.pop(prefix, None)
+        marker = prefix + '!'
+        for group, members in list(self.groups.items()):
+            for channel in [c for c in members if c.startswith(marker)]:
+                del members[channel]
+            if not members:
+                del self.groups[group]
+        for channel in [c for c, owner in self.listeners.items() if owner == prefix]:
+            del self.listeners[channel]
+
+    def owner(self, channel):
+        if '!' in channel:
+            return channel.split('!', 1)[0]
+        return self.listeners.get(channel)
+
+    def deliver(self, prefix, channels, message):
+        writer = self.clients.get(prefix)
+        if writer is None or writer.is_closing():
+            return
+        if writer.transport.get_write_buffer_size() > self.max_buffer:
+            logger.warning(f"Worker {prefix} is not reading; dropping message for {len(channels)} channel(s)")
+            return
+        writer.write(encode_frame({'op': 'deliver', 'channels': channels, 'message': message}))
+
+    # --- Operations ---
+
+    def op_send(self, prefix, frame):
+        owner = self.owner(frame['channel'])
+        if owner:
+            self.deliver(owner, [frame['channel']], frame['message'])
+
+    def op_listen(self, prefix, frame):
+        self.listeners[frame['channel']] = prefix
+
+    def op_group_add(self, prefix, frame):
+        self.groups[frame['group']][frame['channel']] = time.monotonic() + self.group_expiry
+
+    def op_group_discard(self, prefix, frame):
+        members = self.groups.get(frame['group'])
+        if members is not None:
+            members.pop(frame['channel'], None)
+            if not members:
+                del self.groups[frame['group']]
+
+    def op_group_send(self, prefix, frame):
+        members = self.groups.get(frame['group'])
+        if not members:
+            return
+        now = time.monotonic()
+        by_owner = defaultdict(list)
+        for channel, expires_at in list(members.items()):
+            if expires_at < now:
+                del members[channel]
+                continue
+            owner = self.owner(channel)
+            if owner:
+                by_owner[owner].append(channel)
+        if not members:
+            del self.groups[frame['group']]
+        for owner, channels in by_owner.items():
+            self.deliver(owner, channels, frame['message'])
+
+    def op_flush(self, prefix, frame):
+        self.groups.clear()
+        self.listeners.clear()
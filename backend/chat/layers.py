@@ -0,0 +1,231 @@
+# chat/layers.py
+"""
+Channel layer for running several ASGI worker processes on one host without
+an external broker.
+
+Every process connects to a small relay (`manage.py channelhub`) over a Unix
+socket. The hub keeps group membership for all processes and forwards
+group_send/send frames to the process that owns each channel; a message is
+written once per destination process, not once per socket. Sends to a
+channel owned by the sending process never leave it.
+
+If the hub connection drops, the next layer call reconnects under the same
+prefix and registers the loop's groups and named channels again, so channels
+handed out earlier keep receiving (messages sent while disconnected are lost).
+
+Messages travel as JSON, so they must be JSON-serializable (ChatConsumer's
+are). Select it with CHANNEL_LAYER_BACKEND=unix; see backend/settings.py.
+"""
+import asyncio
+import json
+import logging
+import struct
+import uuid
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('>I')
+
+
+def encode_frame(payload):
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return HEADER.pack(len(data)) + data
+
+
+async def read_frame(reader):
+    header = await reader.readexactly(HEADER.size)
+    (size,) = HEADER.unpack(header)
+    return json.loads(await reader.readexactly(size))
+
+
+class HubConnection:
+    """
+    One connection to the hub, owned by a single event loop. Channels created
+    on this loop are named "<prefix>!<suffix>" so the hub can route to it.
+    The queues, group memberships and listened channels are handed on to the
+    connection that replaces this one after a disconnect.
+    """
+    def __init__(self, layer, reader, writer, prefix, previous=None):
+        self.layer = layer
+        self.reader = reader
+        self.writer = writer
+        self.prefix = prefix
+        self.queues = previous.queues if previous else {}
+        self.groups = previous.groups if previous else {}        # group -> {channel}
+        self.listening = previous.listening if previous else set()
+        self.closed = False
+        self.reader_task = asyncio.ensure_future(self.read_loop())
+
+    def registrations(self):
+        """
+        The frames that tell the hub about this loop's groups and named channels
+        """
+        frames = [
+            {'op': 'group_add', 'group': group, 'channel': channel}
+            for group, channels in self.groups.items() for channel in channels
+        ]
+        frames += [{'op': 'listen', 'channel': channel} for channel in self.listening]
+        return frames
+
+    def owns(self, channel):
+        return channel.startswith(self.prefix + '!')
+
+    def queue(self, channel):
+        queue = self.queues.get(channel)
+        if queue is None:
+            queue = self.queues[channel] = asyncio.Queue(maxsize=self.layer.get_capacity(channel))
+        return queue
+
+    def put(self, channel, message):
+        queue = self.queue(channel)
+        try:
+            queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def write(self, payload):
+        if self.closed:
+            raise ConnectionError("Connection to the channel hub was lost")
+        self.writer.write(encode_frame(payload))
+        await self.writer.drain()
+
+    async def read_loop(self):
+        try:
+            while True:
+                frame = await read_frame(self.reader)
+                if frame.get('op') != 'deliver':
+                    continue
+                for channel in frame['channels']:
+                    if not self.put(channel, frame['message']):
+                        logger.warning(f"Channel {channel} is over capacity; dropping message")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.error("Lost connection to the channel hub")
+        finally:
+            self.closed = True
+
+    async def close(self):
+        self.closed = True
+        self.reader_task.cancel()
+        self.writer.close()
+
+
+class UnixSocketChannelLayer(BaseChannelLayer):
+    extensions = ['groups', 'flush']
+
+    def __init__(self, path='channelhub.sock', expiry=60, group_expiry=86400, capacity=100, channel_capacity=None):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.path = str(path)
+        self.group_expiry = group_expiry
+        self.connections = {}
+        self.locks = {}
+
+    async def connection(self):
+        """
+        Return the hub connection for the running event loop, opening it on
+        first use. Each loop (e.g. async_to_sync callers) gets its own.
+        """
+        loop = asyncio.get_running_loop()
+        connection = self.connections.get(loop)
+        if connection is not None and not connection.closed:
+            return connection
+        for stale in [other for other in self.connections if other.is_closed()]:
+            self.connections.pop(stale, None)
+            self.locks.pop(stale, None)
+        lock = self.locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            connection = self.connections.get(loop)
+            if connection is None or connection.closed:
+                connection = self.connections[loop] = await self.connect(connection)
+        return connection
+
+    async def connect(self, previous=None):
+        """
+        Open a hub connection. A reconnect keeps the previous connection's
+        prefix and state and re-registers its groups and named channels.
+        """
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise ConnectionError(
+                f"Cannot reach the channel hub at {self.path}; start it with `manage.py channelhub`"
+            ) from e
+        prefix = previous.prefix if previous else f"hub.{uuid.uuid4().hex}"
+        frames = [{'op': 'hello', 'prefix': prefix, 'group_expiry': self.group_expiry}]
+        if previous:
+            frames += previous.registrations()
+        writer.write(b''.join(map(encode_frame, frames)))
+        await writer.drain()
+        return HubConnection(self, reader, writer, prefix, previous)
+
+    # --- Channel layer API ---
+
+    async def new_channel(self, prefix='specific.'):
+        connection = await self.connection()
+        return f"{connection.prefix}!{prefix}{uuid.uuid4().hex}"
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        connection = await self.connection()
+        if connection.owns(channel):
+            if not connection.put(channel, message):
+                raise ChannelFull(channel)
+            return
+        await connection.write({'op': 'send', 'channel': channel, 'message': message})
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        connection = await self.connection()
+        if not connection.owns(channel):
+            # Named (non process-specific) channel: ask the hub to route it here
+            connection.listening.add(channel)
+            await connection.write({'op': 'listen', 'channel': channel})
+        queue = connection.queue(channel)
+        try:
+            return await queue.get()
+        except asyncio.CancelledError:
+            # The consumer went away; don't keep an empty queue for it
+            if queue.empty():
+                connection.queues.pop(channel, None)
+            raise
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        connection = await self.connection()
+        # Recorded first, so a reconnect re-registers it even if this write fails
+        connection.groups.setdefault(group, set()).add(channel)
+        await connection.write({'op': 'group_add', 'group': group, 'channel': channel})
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        connection = await self.connection()
+        channels = connection.groups.get(group)
+        if channels is not None:
+            channels.discard(channel)
+            if not channels:
+                del connection.groups[group]
+        await connection.write({'op': 'group_discard', 'group': group, 'channel': channel})
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_group_name(group)
+        connection = await self.connection()
+        await connection.write({'op': 'group_send', 'group': group, 'message': message})
+
+    async def flush(self):
+        connection = await self.connection()
+        connection.queues.clear()
+        connection.groups.clear()
+        connection.listening.clear()
+        await connection.write({'op': 'flush'})
+
+    async def close(self):
+        for connection in list(self.connections.values()):
+            await connection.close()
+        self.connections.clear()
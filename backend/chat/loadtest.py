@@ -0,0 +1,140 @@
+# chat/loadtest.py
+"""
+Worker side of `manage.py chat_loadtest`.
+
+Each worker process opens its share of simulated websocket clients against
+ChatConsumer (driven in-process through asgiref's ApplicationCommunicator,
+so no server is involved), waits until every worker is connected, lets a few clients send
+timestamped messages and records how long each broadcast took to reach every
+client. Cross-process delivery goes through the configured channel layer.
+"""
+import asyncio
+import json
+import time
+import traceback
+
+from asgiref.testing import ApplicationCommunicator
+
+
+class WebsocketClient(ApplicationCommunicator):
+    """
+    Minimal websocket client for an ASGI application. channels.testing has
+    one too, but importing it requires daphne.
+    """
+    def __init__(self, application, path, user):
+        super().__init__(application, {
+            'type': 'websocket',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': b'',
+            'headers': [],
+            'subprotocols': [],
+            'user': user,
+        })
+
+    async def connect(self, timeout):
+        await self.send_input({'type': 'websocket.connect'})
+        response = await self.receive_output(timeout)
+        return response['type'] == 'websocket.accept'
+
+    async def send_text(self, text):
+        await self.send_input({'type': 'websocket.receive', 'text': text})
+
+    async def receive_text(self, timeout):
+        # Unlike receive_output(), a timeout here leaves the application running
+        if self.future.done():
+            self.future.result()
+            raise ValueError("The application has exited")
+        response = await asyncio.wait_for(self.output_queue.get(), timeout)
+        if response['type'] != 'websocket.send':
+            raise ValueError(f"Unexpected {response['type']} event")
+        return response['text']
+
+    async def disconnect(self):
+        if self.future.done():
+            return
+        await self.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await self.wait(1)
+
+
+def run_worker(index, options, barrier, results):
+    import django
+    django.setup()
+    try:
+        results.put(asyncio.run(_run_worker(index, options, barrier)))
+    except Exception:
+        barrier.abort()  # release the other workers instead of leaving them waiting
+        results.put({'worker': index, 'error': traceback.format_exc()})
+
+
+async def _receive_all(communicator, expected, latencies, deadline):
+    while len(latencies) < expected:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return
+        try:
+            data = json.loads(await communicator.receive_text(remaining))
+            payload = json.loads(data['content'])
+        except (asyncio.TimeoutError, ValueError, KeyError, TypeError):
+            return
+        latencies.append(time.time() - payload['sent_at'])
+
+
+async def _send_all(communicator, count, interval):
+    for n in range(count):
+        await communicator.send_text(json.dumps({
+            'message': json.dumps({'sent_at': time.time(), 'n': n})
+        }))
+        if interval:
+            await asyncio.sleep(interval)
+
+
+async def _run_worker(index, options, barrier):
+    from channels.db import database_sync_to_async
+    from channels.routing import URLRouter
+    from django.contrib.auth.models import User
+    from chat.routing import websocket_urlpatterns
+
+    loop = asyncio.get_running_loop()
+    user = await database_sync_to_async(User.objects.get)(id=options['user_id'])
+    application = URLRouter(websocket_urlpatterns)
+
+    communicators = []
+    for _ in range(options['clients']):
+        communicator = WebsocketClient(application, f"/ws/chat/chatroom/{options['workspace_id']}/", user)
+        if not await communicator.connect(options['timeout']):
+            raise RuntimeError(f"Worker {index}: websocket connection was rejected")
+        communicators.append(communicator)
+
+    # Wait until every worker is connected
+    await loop.run_in_executor(None, barrier.wait, options['timeout'])
+
+    expected = options['workers'] * options['senders'] * options['messages']
+    deadline = time.time() + options['timeout']
+    per_client = [[] for _ in communicators]
+    receivers = [
+        asyncio.ensure_future(_receive_all(communicator, expected, latencies, deadline))
+        for communicator, latencies in zip(communicators, per_client)
+    ]
+
+    started = time.time()
+    await asyncio.gather(*[
+        _send_all(communicator, options['messages'], options['interval'])
+        for communicator in communicators[:options['senders']]
+    ])
+    await asyncio.gather(*receivers)
+    finished = time.time()
+
+    for communicator in communicators:
+        await communicator.disconnect()
+
+    latencies = [latency for client in per_client for latency in client]
+    return {
+        'worker': index,
+        'clients': len(communicators),
+        'expected': expected * len(communicators),
+        'received': len(latencies),
+        'started': started,
+        'finished': finished,
+        'latencies': latencies,
+    }
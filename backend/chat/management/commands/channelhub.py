@@ -0,0 +1,23 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chat.hub import ChannelHub
+
+
+class Command(BaseCommand):
+    help = "Run the Unix-socket relay used by chat.layers.UnixSocketChannelLayer"
+
+    def add_arguments(self, parser):
+        config = settings.CHANNEL_LAYERS.get('default', {}).get('CONFIG', {})
+        parser.add_argument('--path', default=config.get('path', 'channelhub.sock'),
+                            help='Socket path (defaults to the channel layer CONFIG path)')
+
+    def handle(self, *args, **options):
+        hub = ChannelHub(options['path'])
+        self.stdout.write(f"Channel hub listening on {options['path']} (Ctrl+C to stop)")
+        try:
+            asyncio.run(hub.serve())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,119 @@
+import multiprocessing
+import statistics
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Workspace, WorkspaceMember
+from chat.loadtest import run_worker
+from chat.models import ChatMessage
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Open many simulated websocket clients against ChatConsumer, spread over "
+        "--workers processes, and measure broadcast latency and throughput. "
+        "Use a cross-process channel layer (CHANNEL_LAYER_BACKEND=unix or redis) "
+        "with more than one worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000, help='Total websocket clients')
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes to spread clients over')
+        parser.add_argument('--senders', type=int, default=5, help='Sending clients per worker')
+        parser.add_argument('--messages', type=int, default=20, help='Messages per sending client')
+        parser.add_argument('--interval', type=float, default=0.0, help='Seconds between messages of one sender')
+        parser.add_argument('--timeout', type=float, default=60.0, help='Seconds to wait for deliveries')
+        parser.add_argument('--workspace', type=int, help='Workspace to chat in (default: a dedicated load-test workspace)')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the messages sent by the load test afterwards')
+
+    def get_target(self, workspace_id):
+        user, _ = User.objects.get_or_create(username='chat-loadtest', defaults={'email': 'chat-loadtest@localhost'})
+        if workspace_id:
+            workspace = Workspace.objects.filter(id=workspace_id).first()
+            if workspace is None:
+                raise CommandError(f"Workspace {workspace_id} does not exist")
+        else:
+            workspace, _ = Workspace.objects.get_or_create(name='Chat load test', owner=user)
+        WorkspaceMember.objects.get_or_create(workspace=workspace, user=user, defaults={'role': 'member'})
+        return user, workspace
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 1 or options['clients'] < workers:
+            raise CommandError("Need at least one client per worker")
+        backend = settings.CHANNEL_LAYERS['default']['BACKEND']
+        if workers > 1 and backend.endswith('InMemoryChannelLayer'):
+            self.stdout.write(self.style.WARNING(
+                "InMemoryChannelLayer does not cross processes; broadcasts will only reach clients of the same worker."
+            ))
+
+        user, workspace = self.get_target(options['workspace'])
+        senders = min(options['senders'], options['clients'] // workers)
+
+        context = multiprocessing.get_context('spawn')
+        barrier = context.Barrier(workers)
+        results = context.Queue()
+        processes = []
+        for index in range(workers):
+            share = options['clients'] // workers + (1 if index < options['clients'] % workers else 0)
+            worker_options = {
+                'clients': share,
+                'workers': workers,
+                'senders': senders,
+                'messages': options['messages'],
+                'interval': options['interval'],
+                'timeout': options['timeout'],
+                'workspace_id': workspace.id,
+                'user_id': user.id,
+            }
+            process = context.Process(target=run_worker, args=(index, worker_options, barrier, results))
+            process.start()
+            processes.append(process)
+
+        reports = []
+        for _ in processes:
+            reports.append(results.get(timeout=options['timeout'] * 3 + 60))
+        for process in processes:
+            process.join()
+
+        errors = [report for report in reports if 'error' in report]
+        if errors:
+            raise CommandError(f"Worker {errors[0]['worker']} failed:\n{errors[0]['error']}")
+
+        self.report(reports, backend, senders * workers * options['messages'])
+        if options['cleanup']:
+            ChatMessage.objects.filter(room__workspace=workspace, sender=user).delete()
+
+    def report(self, reports, backend, sent):
+        latencies = sorted(latency for report in reports for latency in report['latencies'])
+        expected = sum(report['expected'] for report in reports)
+        received = len(latencies)
+        duration = max(r['finished'] for r in reports) - min(r['started'] for r in reports)
+
+        self.stdout.write(f"Channel layer:   {backend}")
+        self.stdout.write(f"Workers:         {len(reports)}")
+        self.stdout.write(f"Clients:         {sum(r['clients'] for r in reports)}")
+        self.stdout.write(f"Messages sent:   {sent}")
+        self.stdout.write(f"Deliveries:      {received}/{expected} ({100.0 * received / max(expected, 1):.1f}%)")
+        self.stdout.write(f"Duration:        {duration:.2f}s")
+        self.stdout.write(f"Throughput:      {received / max(duration, 1e-9):.0f} deliveries/s")
+        if latencies:
+            self.stdout.write(
+                "Latency (ms):    "
+                f"mean {1000 * statistics.fmean(latencies):.1f}  "
+                f"p50 {1000 * percentile(latencies, 0.50):.1f}  "
+                f"p95 {1000 * percentile(latencies, 0.95):.1f}  "
+                f"p99 {1000 * percentile(latencies, 0.99):.1f}  "
+                f"max {1000 * latencies[-1]:.1f}"
+            )
+        for report in reports:
+            self.stdout.write(f"  worker {report['worker']}: {report['received']}/{report['expected']} deliveries")
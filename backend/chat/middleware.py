@@ -1,24 +1,31 @@
 #chat/middleware.py
+from channels.auth import AuthMiddlewareStack
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
-from rest_framework.authtoken.models import Token
 from channels.middleware import BaseMiddleware
 from urllib.parse import parse_qs
 import logging
 
+from api.authentication import get_token_user, token_expired
+
 logger = logging.getLogger(__name__)
 
 @database_sync_to_async
 def get_user_from_token(token_key):
     """
-    Asynchronously fetches a user from the database given a DRF auth token.
+    Asynchronously fetches a user given a DRF auth token, through the token
+    cache shared with the REST API (api.authentication).
     """
     try:
-        token = Token.objects.select_related('user').get(key=token_key)
-        return token.user
-    except Token.DoesNotExist:
-        logger.warn(f"WebSocket connection failed: Token not found.")
-        return AnonymousUser()
+        found = get_token_user(token_key)
+        if found is None:
+            logger.warning("WebSocket connection failed: Token not found.")
+            return AnonymousUser()
+        user, created = found
+        if token_expired(created) or not user.is_active:
+            logger.warning("WebSocket connection failed: Token expired or user inactive.")
+            return AnonymousUser()
+        return user
     except Exception as e:
         logger.error(f"Error getting user from token: {e}")
         return AnonymousUser()
@@ -26,15 +33,21 @@ def get_user_from_token(token_key):
 class TokenAuthMiddleware(BaseMiddleware):
     """
     Custom Channels middleware to authenticate users via a token in the query string.
+    Connections without a token go to session_inner (session auth) when given,
+    so token connections skip the session lookup.
     """
+    def __init__(self, inner, session_inner=None):
+        super().__init__(inner)
+        self.session_inner = session_inner
+
     async def __call__(self, scope, receive, send):
         
         # Check if user is already authenticated by a preceding middleware (like session auth)
         if scope.get('user') and scope['user'].is_authenticated:
             return await super().__call__(scope, receive, send)
 
-        # User is not authenticated via session, so try token auth from query string.
         # The frontend client must send its token like: ws://.../ws/chat/1/?token=YOUR_TOKEN_KEY
+        scope = dict(scope)
         try:
             query_string = scope.get('query_string', b'').decode('utf-8')
             parsed_query = parse_qs(query_string)
@@ -42,6 +55,8 @@ class TokenAuthMiddleware(BaseMiddleware):
 
             if token_key:
                 scope['user'] = await get_user_from_token(token_key)
+            elif self.session_inner is not None:
+                return await self.session_inner(scope, receive, send)
             else:
                 # This ensures scope['user'] exists, even if it's AnonymousUser
                 scope['user'] = AnonymousUser()
@@ -51,3 +66,9 @@ class TokenAuthMiddleware(BaseMiddleware):
             scope['user'] = AnonymousUser()
 
         return await super().__call__(scope, receive, send)
+
+def TokenAuthMiddlewareStack(inner):
+    """
+    Token auth from the query string, falling back to session auth
+    """
+    return TokenAuthMiddleware(inner, session_inner=AuthMiddlewareStack(inner))
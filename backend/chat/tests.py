@@ -0,0 +1,321 @@
+import asyncio
+import os
+import re
+import tempfile
+from datetime import timedelta
+from unittest import IsolatedAsyncioTestCase, mock
+
+from channels.exceptions import ChannelFull
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.membership import membership_cache
+from api.models import Workspace, WorkspaceMember
+
+from .consumers import MessageBatcher
+from .hub import ChannelHub
+from .layers import UnixSocketChannelLayer, encode_frame
+from .models import ChatMessage
+from .views import ChatHistoryView
+
+
+class ChannelHubTests(IsolatedAsyncioTestCase):
+    """
+    UnixSocketChannelLayer instances stand in for worker processes, all
+    talking to one ChannelHub over a socket in a temporary directory
+    """
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'hub.sock')
+        self.hub = ChannelHub(self.path)
+        self.server = await asyncio.start_unix_server(self.hub.handle, path=self.path)
+        self.layers = []
+
+    async def asyncTearDown(self):
+        for layer in self.layers:
+            await layer.close()
+        await self.settle()  # let the hub see the workers go
+        self.server.close()
+        await self.server.wait_closed()
+        self.directory.cleanup()
+
+    def layer(self, **kwargs):
+        layer = UnixSocketChannelLayer(path=self.path, **kwargs)
+        self.layers.append(layer)
+        return layer
+
+    async def receive(self, layer, channel):
+        return await asyncio.wait_for(layer.receive(channel), 2)
+
+    async def assertNothingReceived(self, layer, channel):
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(layer.receive(channel), 0.1)
+
+    async def settle(self):
+        """
+        Let the hub process the frames written so far
+        """
+        await asyncio.sleep(0.05)
+
+    async def test_group_send_across_processes(self):
+        first, second = self.layer(), self.layer()
+        channels = [await first.new_channel() for _ in range(2)]
+        other = await second.new_channel()
+        for channel in channels:
+            await first.group_add('chat', channel)
+        await second.group_add('chat', other)
+        await self.settle()
+        await second.group_send('chat', {'type': 'chat.message', 'text': 'hi'})
+        for channel in channels:
+            self.assertEqual(await self.receive(first, channel), {'type': 'chat.message', 'text': 'hi'})
+        self.assertEqual((await self.receive(second, other))['text'], 'hi')
+
+        await first.group_discard('chat', channels[0])
+        await self.settle()
+        await second.group_send('chat', {'type': 'chat.message', 'text': 'again'})
+        self.assertEqual((await self.receive(first, channels[1]))['text'], 'again')
+        await self.assertNothingReceived(first, channels[0])
+
+    async def test_send_to_channel_and_named_channel(self):
+        first, second = self.layer(), self.layer()
+        channel = await first.new_channel()
+        await second.send(channel, {'type': 'direct'})
+        self.assertEqual(await self.receive(first, channel), {'type': 'direct'})
+
+        waiting = asyncio.ensure_future(first.receive('background-tasks'))
+        await self.settle()
+        await second.send('background-tasks', {'type': 'job'})
+        self.assertEqual(await asyncio.wait_for(waiting, 2), {'type': 'job'})
+
+    async def test_local_capacity(self):
+        layer = self.layer(capacity=1)
+        channel = await layer.new_channel()
+        await layer.send(channel, {'type': 'one'})
+        with self.assertRaises(ChannelFull):
+            await layer.send(channel, {'type': 'two'})
+
+    async def test_expired_group_members(self):
+        layer = self.layer()
+        self.hub.group_expiry = -1
+        channel = await layer.new_channel()
+        await layer.group_add('chat', channel)
+        await self.settle()
+        await layer.group_send('chat', {'type': 'late'})
+        await self.assertNothingReceived(layer, channel)
+        self.assertNotIn('chat', self.hub.groups)
+
+    async def test_reconnect_keeps_channels_and_groups(self):
+        first, second = self.layer(), self.layer()
+        channel = await first.new_channel()
+        await first.group_add('chat', channel)
+        waiting = asyncio.ensure_future(first.receive('background-tasks'))
+        pending = asyncio.ensure_future(first.receive(channel))
+        await self.settle()
+        old = await first.connection()
+
+        # The hub goes away for this worker: it forgets its groups and listeners
+        with self.assertLogs('chat.layers', 'ERROR'):
+            self.hub.clients[old.prefix].close()
+            await self.settle()
+        self.assertTrue(old.closed)
+        self.assertNotIn('chat', self.hub.groups)
+
+        new = await first.connection()
+        self.assertIsNot(new, old)
+        self.assertEqual(new.prefix, old.prefix)
+        await self.settle()
+        await second.group_send('chat', {'type': 'after reconnect'})
+        await second.send('background-tasks', {'type': 'job'})
+        await second.send(channel, {'type': 'direct'})
+        self.assertEqual(await asyncio.wait_for(pending, 2), {'type': 'after reconnect'})
+        self.assertEqual(await asyncio.wait_for(waiting, 2), {'type': 'job'})
+        self.assertEqual(await self.receive(first, channel), {'type': 'direct'})
+
+    async def test_old_connection_closing_late(self):
+        layer = self.layer()
+        channel = await layer.new_channel()
+        await layer.group_add('chat', channel)
+        old = await layer.connection()
+        # The worker reconnects before the hub has noticed the old connection is gone
+        _, writer = await asyncio.open_unix_connection(self.path)
+        writer.write(encode_frame({'op': 'hello', 'prefix': old.prefix}))
+        await writer.drain()
+        await self.settle()
+        with self.assertLogs('chat.layers', 'ERROR'):
+            old.writer.close()
+            await self.settle()
+        self.assertIn(old.prefix, self.hub.clients)
+        self.assertEqual(list(self.hub.groups['chat']), [channel])
+        writer.close()
+
+
+class MessageBatcherTests(TransactionTestCase):
+    """
+    database_sync_to_async closes connections it considers stale, which
+    TestCase's wrapping transaction doesn't survive
+    """
+    def setUp(self):
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        self.room = Workspace.objects.create(name='Workspace', owner=self.user).chat_room
+
+    def message(self, content):
+        return ChatMessage(room=self.room, sender=self.user, content=content)
+
+    def bulk_creates(self):
+        return mock.patch.object(ChatMessage.objects, 'bulk_create', wraps=ChatMessage.objects.bulk_create)
+
+    async def test_flush_on_batch_size(self):
+        batcher = MessageBatcher(delay=3600, max_size=2)
+        with self.bulk_creates() as bulk_create:
+            saved = await asyncio.wait_for(asyncio.gather(
+                batcher.save(self.message('one')), batcher.save(self.message('two')),
+            ), 2)
+        self.assertEqual(bulk_create.call_count, 1)
+        self.assertTrue(all(message.pk for message in saved))
+        self.assertIsNone(batcher.timer)
+        contents = [m async for m in ChatMessage.objects.order_by('id').values_list('content', flat=True)]
+        self.assertEqual(contents, ['one', 'two'])
+
+    async def test_flush_on_delay(self):
+        batcher = MessageBatcher(delay=0.1, max_size=100)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with self.bulk_creates() as bulk_create:
+            saved = await asyncio.wait_for(asyncio.gather(
+                batcher.save(self.message('one')), batcher.save(self.message('two')),
+                batcher.save(self.message('three')),
+            ), 2)
+        self.assertGreaterEqual(loop.time() - started, 0.1)
+        self.assertEqual(bulk_create.call_count, 1)
+        self.assertEqual([message.content for message in saved], ['one', 'two', 'three'])
+        self.assertEqual(await ChatMessage.objects.acount(), 3)
+
+        # The next message starts a new batch and timer
+        [saved] = await asyncio.wait_for(asyncio.gather(batcher.save(self.message('four'))), 2)
+        self.assertIsNotNone(saved.pk)
+        self.assertEqual(await ChatMessage.objects.acount(), 4)
+
+    async def test_failed_insert_logged(self):
+        batcher = MessageBatcher(delay=0.01, max_size=100)
+        with mock.patch.object(ChatMessage.objects, 'bulk_create', side_effect=RuntimeError('database gone')):
+            with self.assertLogs('chat.consumers', 'ERROR') as logs:
+                saved = await asyncio.wait_for(asyncio.gather(
+                    batcher.save(self.message('one')), batcher.save(self.message('two')),
+                ), 2)
+        self.assertEqual(saved, [None, None])
+        self.assertIn('Failed to save a batch of 2 chat messages: database gone', logs.output[0])
+        self.assertEqual(await ChatMessage.objects.acount(), 0)
+
+    async def test_failed_writer_logged(self):
+        batcher = MessageBatcher(delay=0.01, max_size=100)
+
+        async def broken(batch):
+            raise RuntimeError('writer bug')
+
+        batcher.write = broken
+        with self.assertLogs('chat.consumers', 'ERROR') as logs:
+            saved = await asyncio.wait_for(batcher.save(self.message('one')), 2)
+        # The sender isn't left waiting
+        self.assertIsNone(saved)
+        self.assertIn('Chat message batch writer failed', logs.output[0])
+        self.assertEqual(batcher.writes, set())
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ChatHistoryTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        membership_cache.clear_local()
+        self.user = User.objects.create(username='alice', email='alice@localhost')
+        self.workspace = Workspace.objects.create(name='Workspace', owner=self.user)
+        WorkspaceMember.objects.create(workspace=self.workspace, user=self.user, role='owner')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.start = timezone.now() - timedelta(hours=1)
+        # m[3] and m[4] share a timestamp, so windows must break ties on id
+        self.minutes = [0, 1, 2, 3, 3, 5, 6, 7, 8, 9]
+        self.m = []
+        for i, minute in enumerate(self.minutes):
+            message = ChatMessage.objects.create(room=self.workspace.chat_room, sender=self.user, content=f'm{i}')
+            ChatMessage.objects.filter(pk=message.pk).update(timestamp=self.start + timedelta(minutes=minute))
+            self.m.append(message.pk)
+        other = Workspace.objects.create(name='Other', owner=self.user)
+        ChatMessage.objects.create(room=other.chat_room, sender=self.user, content='elsewhere')
+
+    def history(self, status=200, **params):
+        response = self.client.get(f'/chat/history/{self.workspace.id}/messages/', params)
+        self.assertEqual(response.status_code, status, response.content)
+        return response
+
+    def window(self, **params):
+        """
+        Return ([message ids], (rel, {link params}) or None)
+        """
+        response = self.history(**params)
+        link = None
+        if response.has_header('Link'):
+            url, rel = re.fullmatch(r'<(.*)>; rel="(\w+)"', response['Link']).groups()
+            link = (rel, {key: value for key, value in re.findall(r'[?&](\w+)=([^&]*)', url)})
+        return [item['id'] for item in response.json()], link
+
+    def ids(self, *indexes):
+        return [self.m[i] for i in indexes]
+
+    def test_latest(self):
+        self.assertEqual(self.window(), (self.ids(*range(9, -1, -1)), None))
+        self.assertEqual(self.window(limit=3), (self.ids(9, 8, 7), ('prev', {'limit': '3', 'before': str(self.m[7])})))
+
+    def test_before(self):
+        self.assertEqual(self.window(before=self.m[7], limit=3),
+                         (self.ids(6, 5, 4), ('prev', {'before': str(self.m[4]), 'limit': '3'})))
+        # Same timestamp as m[4], lower id
+        self.assertEqual(self.window(before=self.m[4], limit=3),
+                         (self.ids(3, 2, 1), ('prev', {'before': str(self.m[1]), 'limit': '3'})))
+        self.assertEqual(self.window(before=self.m[1], limit=3), (self.ids(0), None))
+        self.assertEqual(self.window(before=self.m[3], limit=3), (self.ids(2, 1, 0), None))
+
+    def test_after(self):
+        self.assertEqual(self.window(after=self.m[0], limit=3),
+                         (self.ids(3, 2, 1), ('next', {'after': str(self.m[3]), 'limit': '3'})))
+        # Same timestamp as m[3], higher id
+        self.assertEqual(self.window(after=self.m[3], limit=3),
+                         (self.ids(6, 5, 4), ('next', {'after': str(self.m[6]), 'limit': '3'})))
+        self.assertEqual(self.window(after=self.m[6], limit=3), (self.ids(9, 8, 7), None))
+        self.assertEqual(self.window(after=self.m[9]), ([], None))
+
+    def test_since(self):
+        since = (self.start + timedelta(minutes=3)).isoformat()
+        self.assertEqual(self.window(since=since), (self.ids(9, 8, 7, 6, 5), None))
+        # The follow-up link pages on ids, not the timestamp
+        self.assertEqual(self.window(since=since, limit=2),
+                         (self.ids(6, 5), ('next', {'limit': '2', 'after': str(self.m[6])})))
+        self.assertEqual(self.window(after=self.m[6], limit=2),
+                         (self.ids(8, 7), ('next', {'limit': '2', 'after': str(self.m[8])})))
+        # after and since combined: both bounds apply
+        self.assertEqual(self.window(after=self.m[0], since=since, limit=10), (self.ids(9, 8, 7, 6, 5), None))
+        since = (self.start + timedelta(minutes=2, seconds=30)).isoformat()
+        self.assertEqual(self.window(after=self.m[8], since=since, limit=10), (self.ids(9), None))
+
+    def test_limit(self):
+        with mock.patch.object(ChatHistoryView, 'max_limit', 4):
+            self.assertEqual(self.window(limit=100)[0], self.ids(9, 8, 7, 6))
+        with mock.patch.object(ChatHistoryView, 'default_limit', 2):
+            self.assertEqual(self.window(after=self.m[0])[0], self.ids(2, 1))
+        self.history(400, limit=0)
+        self.history(400, limit='many')
+
+    def test_invalid_windows(self):
+        self.history(400, before=self.m[5], after=self.m[1])
+        self.history(400, before=self.m[5], since=self.start.isoformat())
+        self.history(400, before='latest')
+        self.history(400, since='yesterday')
+        self.history(404, before=ChatMessage.objects.get(content='elsewhere').pk)
+
+    def test_other_workspace(self):
+        outsider = User.objects.create(username='bob', email='bob@localhost')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.window(), ([], None))
+        self.history(404, after=self.m[0])
@@ -1,11 +1,16 @@
 # chat/views.py
 
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import generics, permissions
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from .models import ChatRoom, ChatMessage
 from .serializers import ChatRoomSerializer, ChatMessageSerializer
-from api.models import Workspace
+from api.membership import is_workspace_member
 
 
 # List all chat rooms 
@@ -17,21 +22,99 @@ class ChatRoomListView(generics.ListAPIView):
 
 # Gettingg chat messages for a workspace
 class ChatHistoryView(generics.ListAPIView):
+    """
+    Messages of a workspace's chat, newest first, keyset-paged on
+    (timestamp, id):
+
+    - no parameters: the latest `limit` messages
+    - ?before=<message id>: the `limit` messages preceding that message
+    - ?after=<message id>: the `limit` messages following that message
+    - ?since=<ISO timestamp>: messages posted after that time, so a client
+      reconnecting can fetch just what it missed
+
+    When a window was cut short by `limit`, the Link header points at the
+    adjacent one (rel="prev" for older messages, rel="next" for newer).
+    """
     serializer_class = ChatMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None  # windows are keyset-paged below
+    default_limit = 50
+    max_limit = getattr(settings, 'CHAT_HISTORY_MAX_LIMIT', 200)
 
     def get_queryset(self):
         workspace_id = self.kwargs['workspace_id']
-        workspace = get_object_or_404(Workspace, id=workspace_id)
 
-        # Check if user has access to this workspace
-        if not workspace.members.filter(id=self.request.user.id).exists():
+        # Check if user has access to this workspace (cached membership map)
+        if not is_workspace_member(self.request.user, workspace_id):
             return ChatMessage.objects.none()
 
-        chat_room, _ = ChatRoom.objects.get_or_create(
-            workspace=workspace,
-            defaults={'name': f"{workspace.name} Chat"}
-        )
+        return ChatMessage.objects.filter(room__workspace_id=workspace_id).select_related('sender')
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer.'})
+        if limit < 1:
+            raise ValidationError({'limit': 'Must be positive.'})
+        return min(limit, self.max_limit)
+
+    def get_anchor(self, queryset, param):
+        """
+        Return (timestamp, id) of the message named by a before/after parameter
+        """
+        try:
+            message_id = int(self.request.query_params[param])
+        except ValueError:
+            raise ValidationError({param: 'Must be a message id.'})
+        timestamp = queryset.filter(id=message_id).values_list('timestamp', flat=True).first()
+        if timestamp is None:
+            raise NotFound('Message not found.')
+        return timestamp, message_id
+
+    def get_since(self):
+        value = parse_datetime(self.request.query_params['since'].replace(' ', '+'))
+        if value is None:
+            raise ValidationError({'since': 'Must be an ISO 8601 timestamp.'})
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        params = request.query_params
+        if 'before' in params and ('after' in params or 'since' in params):
+            raise ValidationError('"before" cannot be combined with "after" or "since".')
+        limit = self.get_limit()
+        newer = 'after' in params or 'since' in params
+
+        if 'before' in params:
+            timestamp, message_id = self.get_anchor(queryset, 'before')
+            queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=message_id))
+        if 'after' in params:
+            timestamp, message_id = self.get_anchor(queryset, 'after')
+            queryset = queryset.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=message_id))
+        if 'since' in params:
+            queryset = queryset.filter(timestamp__gt=self.get_since())
+
+        # Walk the (room, timestamp, id) index away from the anchor
+        ordering = ('timestamp', 'id') if newer else ('-timestamp', '-id')
+        messages = list(queryset.order_by(*ordering)[:limit + 1])
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        if newer:
+            messages.reverse()
+
+        headers = None
+        if has_more:
+            url = remove_query_param(request.build_absolute_uri(), 'since')
+            if newer:
+                url = replace_query_param(remove_query_param(url, 'before'), 'after', messages[0].id)
+                rel = 'next'
+            else:
+                url = replace_query_param(remove_query_param(url, 'after'), 'before', messages[-1].id)
+                rel = 'prev'
+            headers = {'Link': f'<{url}>; rel="{rel}"'}
 
-        # return last 50 messages
-        return ChatMessage.objects.filter(room=chat_room).select_related('sender').order_by('-timestamp')[:50]
+        serializer = self.get_serializer(messages, many=True)
+        return Response(serializer.data, headers=headers)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import { useNavigate } from "react-router-dom";
 import NotificationsDemo from "./notitication"; 
 import ProfileSidebar from './ProfileSidebar';
@@ -30,14 +30,13 @@ const Navbar = () => {
         throw new Error('No authentication token found');
       }
 
-      const response = await axios.get('http://localhost:8000/api/notifications/?read=false', {
+      const response = await axios.get('http://localhost:8000/api/notifications/unread_count/', {
         headers: {
           'Authorization': `Token ${token}`
         }
       });
       
-      const count = response.data.length || 0;
-      setUnreadCount(count);
+      setUnreadCount(response.data.count || 0);
       setNotificationsError(null);
     } catch (err) {
       console.error('Error fetching unread notifications:', err);
@@ -87,10 +86,56 @@ const Navbar = () => {
     setInviteOpen(false);
   };
 
+  // The server pushes the unread count over a websocket; a slow poll corrects
+  // the badge when pushes are lost (socket down, worker without a shared layer)
+  const UNREAD_POLL_INTERVAL = 5 * 60 * 1000;
+  const notificationSocket = useRef(null);
+
   useEffect(() => {
     fetchUnreadCount();
-    const interval = setInterval(fetchUnreadCount, 60000);
-    return () => clearInterval(interval);
+    const interval = setInterval(fetchUnreadCount, UNREAD_POLL_INTERVAL);
+
+    const token = localStorage.getItem('token');
+    if (!token) return () => clearInterval(interval);
+
+    let reconnectTimer = null;
+    let closed = false;
+    let connected = false;
+
+    const connect = () => {
+      const socket = new WebSocket(`ws://localhost:8000/ws/notifications/?token=${token}`);
+      notificationSocket.current = socket;
+
+      // Pushes sent while disconnected are gone; catch up on reconnect
+      socket.onopen = () => {
+        if (connected) fetchUnreadCount();
+        connected = true;
+      };
+
+      socket.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.type === 'unread_count' && data.count !== null && data.count !== undefined) {
+          setUnreadCount(data.count);
+        }
+      };
+
+      socket.onclose = (event) => {
+        // 4001 = unauthenticated; don't retry with the same token
+        if (!closed && event.code !== 4001) {
+          reconnectTimer = setTimeout(connect, 5000);
+        }
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearInterval(interval);
+      clearTimeout(reconnectTimer);
+      if (notificationSocket.current) {
+        notificationSocket.current.close();
+      }
+    };
   }, []);
 
   return (
@@ -4,6 +4,7 @@ import {
   MessageSquare, AlertCircle, Calendar, Settings, ChevronDown 
 } from 'lucide-react';
 import axios from 'axios';
+import { getAllPages } from '../utils/pagination';
 
 const NotificationsPanel = ({ 
   isOpen = true, 
@@ -81,7 +82,7 @@ const NotificationsPanel = ({
     debugLog('FETCH', 'Starting fetch notifications');
     
     try {
-      const response = await axios.get(API_ENDPOINT, { headers });
+      const response = await getAllPages(API_ENDPOINT, { headers });
 
       debugLog('API RESPONSE', 'Received response', {
         status: response.status,
@@ -4,6 +4,7 @@ import { useState, useEffect } from "react"
 import { useNavigate, useParams } from "react-router-dom"
 import { X, User, Mail, Phone, MapPin, Clock } from "lucide-react"
 import axios from "axios"
+import { getAllPages } from "../utils/pagination"
 
 const Profile = () => {
   const navigate = useNavigate()
@@ -31,7 +32,7 @@ const Profile = () => {
 
     try {
       const token = localStorage.getItem("token")
-      const response = await axios.get(`http://localhost:8000/api/profiles/`, {
+      const response = await getAllPages(`http://localhost:8000/api/profiles/`, {
         headers: {
           Authorization: `Token ${token}`,
           "X-Object-ID": id || "4",
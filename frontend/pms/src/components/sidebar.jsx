@@ -1,6 +1,7 @@
 "use client"
 
 import axios from "axios"
+import { getAllPages } from "../utils/pagination"
 import { useState, useEffect, useCallback } from "react"
 import { useNavigate, useLocation } from "react-router-dom"
 import { useWorkspace } from "../contexts/WorkspaceContexts"
@@ -210,7 +211,7 @@ const [isResizing, setIsResizing] = useState(false)
   const projectAPI = {
     getAllProjects: async () => {
       try {
-        const response = await axios.get("http://localhost:8000/api/projects/", {
+        const response = await getAllPages("http://localhost:8000/api/projects/", {
           headers: {
             Authorization: `Token ${token}`,
           },
@@ -232,7 +233,7 @@ const [isResizing, setIsResizing] = useState(false)
 
     getProjectsByWorkspace: async (workspaceId) => {
       try {
-        const response = await axios.get("http://localhost:8000/api/projects/", {
+        const response = await getAllPages("http://localhost:8000/api/projects/", {
           headers: {
             Authorization: `Token ${token}`,
             "X-Workspace-ID": workspaceId,
@@ -1,6 +1,6 @@
 // UserContext.js
 import React, { createContext, useState, useEffect } from "react";
-import axios from "axios";
+import { getAllPages } from "../utils/pagination";
 
 export const UserContext = createContext();
 
@@ -19,7 +19,7 @@ export const UserProvider = ({ children }) => {
       if (!token) {
         throw new Error("No authentication token found");
       }
-      const response = await axios.get("http://localhost:8000/api/users/", {
+      const response = await getAllPages("http://localhost:8000/api/users/", {
         headers: {
           Authorization: `Token ${token}`,
         },
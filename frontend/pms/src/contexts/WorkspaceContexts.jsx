@@ -3,6 +3,7 @@
 import { createContext, useContext, useEffect, useState, useCallback, useRef } from "react"
 import { useLocation } from "react-router-dom"
 import axios from "axios"
+import { getAllPages } from "../utils/pagination"
 
 // Creating the context
 const WorkspaceContext = createContext({
@@ -64,7 +65,7 @@ export const WorkspaceProvider = ({ children }) => {
       console.log(">>>>Fetching project-workspace mappings...")
 
       // ADDED: Fetch projects to get workspace relationships
-      const response = await axios.get("http://localhost:8000/api/projects/", {
+      const response = await getAllPages("http://localhost:8000/api/projects/", {
         headers: {
           Authorization: `Token ${token}`,
         },
@@ -191,7 +192,7 @@ export const WorkspaceProvider = ({ children }) => {
 
       console.log(">>>Fetching workspaces from API...")
 
-      const response = await axios.get("http://localhost:8000/api/workspaces/", {
+      const response = await getAllPages("http://localhost:8000/api/workspaces/", {
         headers: {
           Authorization: `Token ${token}`,
         },
@@ -2,6 +2,7 @@ import React, { useState, useMemo, useEffect} from 'react';
 import { ChevronLeft, User, ChevronRight, Lock, Search, ChevronDown, MoreHorizontal,MoreVertical, Plus, Edit2, Trash2 } from 'lucide-react';
 import { FileText, Wallet, Bug, CheckSquare, PlusCircle, AlertTriangle } from "lucide-react";
 import axios from 'axios';
+import { getAllPages } from '../utils/pagination';
 import Lottie from "lottie-react";
 import bughunting from '../assets/Bug_Hunting.json';
 import Navbar from '../components/navbar';
@@ -36,7 +37,7 @@ useEffect(() => {
       const token = localStorage.getItem("token");
       setLoading(true);
       
-      const response = await axios.get("http://localhost:8000/api/bugs/", {
+      const response = await getAllPages("http://localhost:8000/api/bugs/", {
         headers: {
           Authorization: `Token ${token}`,
           'X-Project-ID': projectId || '1'
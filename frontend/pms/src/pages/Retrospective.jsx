@@ -18,6 +18,7 @@ import {
 import Lottie from "lottie-react";
 import glass from '../assets/search_retro.json';
 import axios from "axios";
+import { getAllPages } from "../utils/pagination";
 import { useParams } from "react-router-dom";
 
 import Navbar from "../components/navbar"
@@ -49,7 +50,7 @@ const Retrospectivesmain = () => {
         const token = localStorage.getItem("token");
         setLoading(true);
         
-        const response = await axios.get("http://localhost:8000/api/retrospectives/", {
+        const response = await getAllPages("http://localhost:8000/api/retrospectives/", {
           headers: {
             Authorization: `Token ${token}`,
             'X-Project-ID': projectId || '1'
@@ -5,6 +5,7 @@ import { Search, Filter, ArrowDownUp, EyeOff, Plus, Edit, Trash2, User, Calendar
 import { useParams } from "react-router-dom"
 import Navbar from "../components/navbar"
 import Sidebar from "../components/sidebar"
+import { fetchAllPages } from "../utils/pagination"
 import Lottie from "lottie-react";
 import sprint from "../assets/sprint_ani.json"
 
@@ -70,7 +71,7 @@ const SprintMain = () => {
       }
 
       console.log("Fetching sprints for project:", projectId)
-      const response = await fetch(`http://localhost:8000/api/sprints/`, {
+      const response = await fetchAllPages(`http://localhost:8000/api/sprints/`, {
         headers: {
           Authorization: `Token ${token}`,
           "Content-Type": "application/json",
@@ -126,7 +127,7 @@ const SprintMain = () => {
       }
 
       console.log("Fetching users...")
-      const response = await fetch(`http://localhost:8000/api/users/`, {
+      const response = await fetchAllPages(`http://localhost:8000/api/users/`, {
         headers: {
           Authorization: `Token ${token}`,
           "Content-Type": "application/json",
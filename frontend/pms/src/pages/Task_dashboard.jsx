@@ -5,6 +5,7 @@ import { Search, ChevronDown, Plus, X, Settings, Trash2, Edit, Calendar, Users,
 import Navbar from "../components/navbar"
 import Sidebar from "../components/sidebar"
 import axios from "axios"
+import { fetchAllPages, getAllPages } from "../utils/pagination"
 import Lottie from "lottie-react"
 import { useParams } from "react-router-dom"
 import man from "../assets/man_with_task_list.json"
@@ -106,7 +107,7 @@ const PMSDashboardSprints = () => {
         return
       }
       console.log("Fetching users...")
-      const response = await fetch(`http://localhost:8000/api/users/`, {
+      const response = await fetchAllPages(`http://localhost:8000/api/users/`, {
         headers: {
           Authorization: `Token ${token}`,
           "Content-Type": "application/json",
@@ -708,8 +709,7 @@ const PMSDashboardSprints = () => {
       "X-Project-ID": projectId,
     }
 
-    axios
-      .get(`${BASE_URL}/api/sprints/`, { headers: sprintHeaders })
+    getAllPages(`${BASE_URL}/api/sprints/`, { headers: sprintHeaders })
       .then((res) => {
         const mySprints = res.data.results || res.data
         setSprints(mySprints)
@@ -719,7 +719,7 @@ const PMSDashboardSprints = () => {
               Authorization: `Token ${token}`,
               "X-Sprint-ID": s.id,
             }
-            return axios.get(`${BASE_URL}/api/tasks/`, { headers: taskHeaders }).then((r) => ({
+            return getAllPages(`${BASE_URL}/api/tasks/`, { headers: taskHeaders }).then((r) => ({
               sprintName: s.name,
               sprintData: s,
               tasks: r.data.results || r.data,
@@ -0,0 +1,53 @@
+import axios from "axios";
+
+// List endpoints return one page (a plain array) and put the URL of the next
+// page in the Link header as rel="next". These helpers walk every page and
+// hand back the concatenated rows, so callers keep treating lists as arrays.
+
+export const PAGE_SIZE = 200;
+
+const nextLink = (header) => {
+  if (!header) return null;
+  const match = header.split(",").map((part) => part.match(/<([^>]+)>;\s*rel="next"/)).find(Boolean);
+  return match ? match[1] : null;
+};
+
+const withPageSize = (url) => {
+  const parsed = new URL(url);
+  if (!parsed.searchParams.has("page_size")) {
+    parsed.searchParams.set("page_size", PAGE_SIZE);
+  }
+  return parsed.toString();
+};
+
+// axios: resolves to the first page's response with `data` holding every row.
+export const getAllPages = async (url, config = {}) => {
+  const first = await axios.get(withPageSize(url), config);
+  if (!Array.isArray(first.data)) return first;
+  const rows = [...first.data];
+  let next = nextLink(first.headers.link);
+  while (next) {
+    const page = await axios.get(next, config);
+    rows.push(...page.data);
+    next = nextLink(page.headers.link);
+  }
+  return { ...first, data: rows };
+};
+
+// fetch: resolves to a Response whose body is every row; errors pass through.
+export const fetchAllPages = async (url, init = {}) => {
+  const first = await fetch(withPageSize(url), init);
+  if (!first.ok) return first;
+  const rows = await first.json();
+  if (!Array.isArray(rows)) {
+    return new Response(JSON.stringify(rows), { status: first.status, headers: first.headers });
+  }
+  let next = nextLink(first.headers.get("link"));
+  while (next) {
+    const page = await fetch(next, init);
+    if (!page.ok) return page;
+    rows.push(...(await page.json()));
+    next = nextLink(page.headers.get("link"));
+  }
+  return new Response(JSON.stringify(rows), { status: first.status, headers: first.headers });
+};